@@ -2,15 +2,22 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from dashboard_cube import FilterCube
+from map_grid import precompute_cells, filter_cells, aggregate_cells
+from dashboard_data import query_filtered, query_cube, query_map_cells, CACHE_TTL_S
+
+# Points envoyés aux nuages de points (nombre borné, indépendant de la taille des données)
+SAMPLE_SIZE = 5000
+# Colonnes lues en base pour les nuages de points
+POINT_COLUMNS = ('speed_kmh', 'traffic_density', 'air_quality_index', 'hour')
 
 # Configuration de la page
 st.set_page_config(page_title="Dashboard Mobilité Urbaine", layout="wide")
 
 # --- CHARGEMENT DES DONNÉES ---
-# Remplacer par : df = pd.read_csv("votre_fichier.csv")
-@st.cache_data
-def load_data():
-    # Simulation de données pour l'exemple
+# Lecture de mobility_processed (URL dans MOBILITY_DB_URL), filtres poussés dans le SQL
+def simulate_data():
+    # Simulation de données si la base est injoignable
     import numpy as np
     data = {
         'route_id': np.random.randint(1, 10, 1000),
@@ -18,7 +25,8 @@ def load_data():
         'latitude': np.random.uniform(48.85, 48.86, 1000),
         'longitude': np.random.uniform(2.33, 2.35, 1000),
         'speed_kmh': np.random.uniform(10, 50, 1000),
-        'traffic_density': np.random.uniform(0, 100, 1000),
+        # Même échelle que mobility_processed (0 à 1)
+        'traffic_density': np.random.uniform(0, 1, 1000),
         'air_quality_index': np.random.uniform(20, 150, 1000),
         'weather': np.random.choice(['Dégagé', 'Pluie', 'Brouillard'], 1000),
         'hour': np.random.randint(0, 24, 1000),
@@ -26,20 +34,55 @@ def load_data():
     }
     return pd.DataFrame(data)
 
-df = load_data()
+@st.cache_data
+def load_simulated_data():
+    return simulate_data()
+
+@st.cache_data(ttl=CACHE_TTL_S)
+def database_error():
+    # Vérifiée une fois par TTL, pas à chaque interaction
+    try:
+        query_filtered(columns=('hour',), limit=1)
+        return None
+    except Exception as e:
+        return str(e)
+
+USE_DATABASE = database_error() is None
+if not USE_DATABASE:
+    st.sidebar.warning(f"⚠️ Base indisponible ({database_error()}), données simulées")
+
+@st.cache_data(ttl=CACHE_TTL_S)
+def load_cube():
+    # Agrégats heure × jour × météo × route et cellules de la carte, calculés par la base
+    # (GROUP BY) : chaque filtre se résout ensuite sur le cube
+    if USE_DATABASE:
+        return query_cube(), query_map_cells()
+    df = load_simulated_data()
+    return FilterCube.from_frame(df), precompute_cells(df)
+
+def load_points(filters):
+    # Points des nuages de points : WHERE paramétré, échantillon stable et LIMIT côté base
+    if USE_DATABASE:
+        return query_filtered(filters, columns=POINT_COLUMNS, limit=SAMPLE_SIZE, sample=True)
+    df = load_simulated_data()
+    df = df[
+        (df['hour'].between(*filters['hour'])) &
+        (df['day_of_week'].isin(filters['day_of_week'])) &
+        (df['weather'].isin(filters['weather']))
+    ]
+    return df.sample(min(SAMPLE_SIZE, len(df)), random_state=0)
+
+cube, map_cells = load_cube()
 
 # --- SIDEBAR (FILTRES) ---
 st.sidebar.header("🔍 Filtres Interactifs")
 selected_hour = st.sidebar.slider("Heure de la journée", 0, 23, (0, 23))
-selected_day = st.sidebar.multiselect("Jour de la semaine", df['day_of_week'].unique(), default=df['day_of_week'].unique())
-selected_weather = st.sidebar.multiselect("Météo", df['weather'].unique(), default=df['weather'].unique())
+selected_day = st.sidebar.multiselect("Jour de la semaine", cube.labels['day_of_week'], default=cube.labels['day_of_week'])
+selected_weather = st.sidebar.multiselect("Météo", cube.labels['weather'], default=cube.labels['weather'])
+
+filters = {'hour': tuple(selected_hour), 'day_of_week': selected_day, 'weather': selected_weather}
 
-# Filtrage du dataset
-filtered_df = df[
-    (df['hour'].between(selected_hour[0], selected_hour[1])) &
-    (df['day_of_week'].isin(selected_day)) &
-    (df['weather'].isin(selected_weather))
-]
+filtered_df = load_points(filters)
 
 # --- TITRE DU DASHBOARD ---
 st.title("🚦 Analyse de la Mobilité Urbaine et Environnementale")
@@ -50,7 +93,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("🔗 Corrélations Variables Clés")
-    corr = filtered_df[['speed_kmh', 'traffic_density', 'air_quality_index']].corr()
+    corr = cube.corr(filters)
     fig_corr = px.imshow(corr, text_auto=True, color_continuous_scale='RdBu_r', aspect="auto")
     st.plotly_chart(fig_corr, use_container_width=True)
 
@@ -68,27 +111,28 @@ col3, col4 = st.columns(2)
 
 with col3:
     st.subheader("🕒 Vitesse Moyenne par Heure")
-    hourly_speed = filtered_df.groupby('hour')['speed_kmh'].mean().reset_index()
+    hourly_speed = cube.group_mean('hour', 'speed_kmh', filters).reset_index()
     fig_line = px.line(hourly_speed, x='hour', y='speed_kmh', markers=True)
     st.plotly_chart(fig_line, use_container_width=True)
 
 with col4:
     st.subheader("📅 Densité Trafic par Jour")
-    day_order = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
-    daily_traffic = filtered_df.groupby('day_of_week')['traffic_density'].mean().reindex(day_order).reset_index()
+    daily_traffic = cube.group_mean('day_of_week', 'traffic_density', filters).reset_index()
     fig_bar = px.bar(daily_traffic, x='day_of_week', y='traffic_density', color='traffic_density')
     st.plotly_chart(fig_bar, use_container_width=True)
 
 # --- SECTION 3 : CARTOGRAPHIE ---
 st.markdown("---")
 st.subheader("🗺️ Cartographie des Zones Critiques")
-# Création d'une colonne de statut pour la carte
-filtered_df['status'] = filtered_df.apply(lambda row: 'Dense/Lent' if (row['traffic_density'] > 70 and row['speed_kmh'] < 20) else 'Normal', axis=1)
+map_zoom = st.slider("Niveau de zoom de la carte", 10, 18, 13)
+# Points agrégés côté serveur en cellules adaptées au zoom (nombre de points borné)
+map_df = aggregate_cells(filter_cells(map_cells, filters), zoom=map_zoom)
 
-fig_map = px.scatter_mapbox(filtered_df, lat="latitude", lon="longitude", 
+fig_map = px.scatter_mapbox(map_df, lat="latitude", lon="longitude",
                             color="traffic_density", size="air_quality_index",
-                            color_continuous_scale=px.colors.cyclical.IceFire, 
-                            size_max=15, zoom=13,
+                            hover_data=['count', 'critical_share', 'status'],
+                            color_continuous_scale=px.colors.cyclical.IceFire,
+                            size_max=15, zoom=map_zoom,
                             mapbox_style="carto-positron",
                             title="Densité (Couleur) et Pollution (Taille)")
-st.plotly_chart(fig_map, use_container_width=True)
\ No newline at end of file
+st.plotly_chart(fig_map, use_container_width=True)
@@ -0,0 +1,378 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pipeline import (load_data, validate_data_types, detailed_outlier_analysis, clean_data,
+                      transform_data, create_features, export_results, iter_chunks,
+                      compute_global_stats)
+from instrumentation import StageRecorder, max_rss_mb, current_rss_mb
+from db_connector import get_engine, save_to_existing_table
+from db_schema import drop_table
+from synthetic_data import write_synthetic
+from schema import encode_flags
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# Au-delà : pipeline par lots sur un fichier Parquet généré (mémoire bornée)
+MAX_IN_MEMORY_ROWS = 2_000_000
+DEFAULT_CHUNK_SIZE = 500_000
+# L'étape load_data lit de l'Excel (parsing openpyxl, ~1 ms/ligne) jusqu'à cette
+# taille ; au-delà, le jeu est lu depuis un fichier Parquet (ou CSV) généré
+EXCEL_MAX_ROWS = 20_000
+# Chargement SQLite (upsert : les clés synthétiques peuvent se répéter) : étape sautée au-delà
+DB_MAX_ROWS = 1_000_000
+# Seuils de régression : +25 % et au moins 50 ms (ou 5 Mo) d'écart absolu
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_SECONDS = 0.05
+DEFAULT_MIN_MB = 5.0
+BENCH_TABLE = 'mobility_processed_bench'
+
+
+class StageProfiler:
+    """Mesures par étape (StageRecorder) aux sorties masquées, cumulées sur les lots"""
+
+    def __init__(self, memory=True):
+        self.recorder = StageRecorder(trace_memory=memory)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows):
+        """Mesure le bloc comme une exécution de l'étape name sur rows lignes"""
+        with contextlib.redirect_stdout(io.StringIO()), \
+                self.recorder.stage(name, rows_in=rows) as record:
+            yield record
+
+    def report(self):
+        """Résultats par étape : secondes, lignes/s, pic alloué (Mo) et nombre d'appels"""
+        result = {}
+        for name, stage in self.recorder.summary().iterrows():
+            seconds, rows = stage['wall_s'], stage['rows_in']
+            peak_mb = stage.get('traced_peak_mb')
+            result[name] = {
+                'seconds': round(seconds, 6),
+                'rows_per_s': round(rows / seconds) if seconds and pd.notna(rows) else None,
+                'peak_mb': None if peak_mb is None else round(peak_mb, 3),
+                'calls': int(stage['calls'])
+            }
+        return result
+
+
+def _columnar_format():
+    """Format des fichiers générés au-delà d'Excel : Parquet si pyarrow est installé"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'csv'
+    return 'parquet'
+
+
+def _run_in_memory(n_rows, work_dir, profiler, outlier_method, db_url, seed):
+    """Étapes de run_full_pipeline, export et chargement en base sur un DataFrame entier"""
+    if n_rows <= EXCEL_MAX_ROWS:
+        input_format = 'xlsx'
+        input_path = write_synthetic(os.path.join(work_dir, 'input.xlsx'), n_rows, seed=seed)
+        cache_dir = os.path.join(work_dir, 'cache')
+        # Premier appel : parsing Excel + écriture du cache ; second : lecture du cache
+        with profiler.stage('load_data', n_rows):
+            df = load_data(input_path, cache_dir=cache_dir)
+        with profiler.stage('load_data_cached', n_rows):
+            df = load_data(input_path, cache_dir=cache_dir)
+    else:
+        input_format = _columnar_format()
+        input_path = write_synthetic(os.path.join(work_dir, f"input.{input_format}"), n_rows,
+                                     seed=seed)
+        with profiler.stage('load_data', n_rows):
+            df = pd.read_parquet(input_path) if input_format == 'parquet' \
+                else pd.read_csv(input_path)
+
+    with profiler.stage('validate_data_types', n_rows):
+        df = validate_data_types(df)
+    with profiler.stage('detailed_outlier_analysis', n_rows):
+        detailed_outlier_analysis(df)
+    with profiler.stage('clean_data', n_rows):
+        df = clean_data(df, outlier_method=outlier_method)
+    with profiler.stage('transform_data', len(df)):
+        df = transform_data(df)
+    with profiler.stage('create_features', len(df)):
+        df = create_features(df)
+    with profiler.stage('export_results', len(df)):
+        export_results(df, os.path.join(work_dir, 'output.csv'))
+
+    if db_url is not None and n_rows <= DB_MAX_ROWS:
+        engine = get_engine(db_url)
+        drop_table(engine, BENCH_TABLE)
+        with profiler.stage('save_to_existing_table', len(df)):
+            save_to_existing_table(df, BENCH_TABLE, engine=engine, mode='upsert', verbose=False)
+        drop_table(engine, BENCH_TABLE)
+    return input_format
+
+
+def _run_chunked(n_rows, work_dir, profiler, outlier_method, db_url, seed, chunk_size):
+    """Mêmes étapes lot par lot (comme run_chunked_pipeline) sur un fichier généré"""
+    input_format = _columnar_format()
+    input_path = os.path.join(work_dir, f"input.{input_format}")
+    with profiler.stage('generate', n_rows):
+        write_synthetic(input_path, n_rows, chunk_size=chunk_size, seed=seed)
+
+    with profiler.stage('compute_global_stats', n_rows):
+        global_stats = compute_global_stats(input_path, outlier_method=outlier_method,
+                                            chunk_size=chunk_size)
+
+    engine = None
+    if db_url is not None and n_rows <= DB_MAX_ROWS:
+        engine = get_engine(db_url)
+        drop_table(engine, BENCH_TABLE)
+
+    output_path = os.path.join(work_dir, 'output.csv')
+    chunks = iter_chunks(input_path, chunk_size=chunk_size)
+    n_chunks = 0
+    while True:
+        # La lecture d'un lot est mesurée à part : c'est le next() du générateur
+        with profiler.stage('load_data', 0) as record:
+            chunk = next(chunks, None)
+            record['rows_in'] = None if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        with profiler.stage('validate_data_types', len(chunk)):
+            chunk = validate_data_types(chunk, verbose=False)
+        with profiler.stage('clean_data', len(chunk)):
+            chunk = clean_data(chunk, outlier_method=outlier_method,
+                               fill_values=global_stats['fill_values'],
+                               outlier_bounds=global_stats['outlier_bounds'],
+                               outlier_cols=global_stats['outlier_cols'], verbose=False,
+                               inplace=True)
+        with profiler.stage('transform_data', len(chunk)):
+            chunk = transform_data(chunk, weather_classes=global_stats['weather_classes'],
+                                   inplace=True)
+        with profiler.stage('create_features', len(chunk)):
+            chunk = create_features(chunk, inplace=True)
+        with profiler.stage('export_results', len(chunk)):
+            encode_flags(chunk).to_csv(output_path, mode='a', header=(n_chunks == 0), index=False)
+        if engine is not None:
+            with profiler.stage('save_to_existing_table', len(chunk)):
+                save_to_existing_table(chunk, BENCH_TABLE, engine=engine, mode='upsert',
+                                       verbose=False)
+        n_chunks += 1
+
+    if engine is not None:
+        drop_table(engine, BENCH_TABLE)
+    return input_format
+
+
+def _run_size(n_rows, mode, work_dir, profiler, outlier_method, db_url, seed, chunk_size):
+    """Une exécution complète des étapes pour une taille, dans un répertoire vidé ensuite"""
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        if mode == 'memory':
+            return _run_in_memory(n_rows, work_dir, profiler, outlier_method, db_url, seed)
+        return _run_chunked(n_rows, work_dir, profiler, outlier_method, db_url, seed, chunk_size)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, outlier_method='winsorize', memory=True,
+                  db_url='sqlite://', max_in_memory_rows=MAX_IN_MEMORY_ROWS,
+                  chunk_size=DEFAULT_CHUNK_SIZE, seed=0, work_dir=None):
+    """Mesure chaque étape du pipeline sur des jeux synthétiques de tailles croissantes
+
+    Jusqu'à max_in_memory_rows lignes, les étapes de run_full_pipeline tournent
+    sur le DataFrame entier (load_data sur un .xlsx généré tant que la taille
+    le permet, lecture Parquet au-delà) ; au-delà, le jeu est écrit en Parquet
+    puis traité par lots comme run_chunked_pipeline, les mesures étant cumulées
+    sur les lots. tracemalloc ralentissant fortement pandas, les durées viennent
+    d'un premier passage non instrumenté et les pics mémoire d'un second
+    (memory=False le supprime). db_url=None saute le chargement en base.
+    Retourne un dict sérialisable en JSON (voir write_report).
+    """
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='mobility_bench_')
+    runs = []
+    try:
+        for n_rows in sizes:
+            run_dir = os.path.join(work_dir, str(n_rows))
+            mode = 'memory' if n_rows <= max_in_memory_rows else 'chunked'
+            print(f"⏱️  {n_rows:,} lignes ({mode})...")
+
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            profiler = StageProfiler(memory=False)
+            input_format = _run_size(n_rows, mode, run_dir, profiler, outlier_method, db_url,
+                                     seed, chunk_size)
+            wall_seconds = time.perf_counter() - start
+            stages = profiler.report()
+            rss_after = current_rss_mb()
+            # Pic du processus : cumulé sur les tailles déjà mesurées, pas propre à celle-ci
+            process_peak_rss_mb = max_rss_mb()
+
+            if memory:
+                print("🧠 passage mémoire (tracemalloc)...")
+                memory_profiler = StageProfiler(memory=True)
+                tracemalloc.start()
+                try:
+                    _run_size(n_rows, mode, run_dir, memory_profiler, outlier_method, db_url,
+                              seed, chunk_size)
+                finally:
+                    tracemalloc.stop()
+                for name, stage in memory_profiler.report().items():
+                    stages[name]['peak_mb'] = stage['peak_mb']
+
+            runs.append({
+                'n_rows': n_rows,
+                'mode': mode,
+                'input_format': input_format,
+                'total_seconds': round(sum(stage['seconds'] for name, stage in stages.items()
+                                           if name != 'generate'), 6),
+                'wall_seconds': round(wall_seconds, 6),
+                'rss_delta_mb': (None if rss_before is None or rss_after is None
+                                 else rss_after - rss_before),
+                'process_peak_rss_mb': process_peak_rss_mb,
+                'stages': stages
+            })
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'outlier_method': outlier_method,
+            'memory_profiling': memory,
+            'db_url': db_url,
+            'max_in_memory_rows': max_in_memory_rows,
+            'chunk_size': chunk_size,
+            'seed': seed
+        },
+        'runs': runs
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE,
+                        min_seconds=DEFAULT_MIN_SECONDS, min_mb=DEFAULT_MIN_MB):
+    """Étapes plus lentes (ou plus gourmandes) que la référence au-delà des seuils
+
+    Une étape régresse si sa durée dépasse celle de la référence de plus de
+    tolerance (relatif) ET de min_seconds (absolu, pour ignorer le bruit des
+    petites étapes) ; idem pour le pic mémoire avec min_mb. Seules les tailles
+    et étapes présentes des deux côtés sont comparées.
+    """
+    baseline_runs = {run['n_rows']: run for run in baseline['runs']}
+    regressions = []
+    for run in results['runs']:
+        reference = baseline_runs.get(run['n_rows'])
+        if reference is None:
+            continue
+        for name, stage in run['stages'].items():
+            ref_stage = reference['stages'].get(name)
+            if ref_stage is None or name == 'generate':
+                continue
+            checks = [('seconds', min_seconds)]
+            if stage['peak_mb'] is not None and ref_stage.get('peak_mb') is not None:
+                checks.append(('peak_mb', min_mb))
+            for metric, min_delta in checks:
+                value, ref_value = stage[metric], ref_stage[metric]
+                if value > ref_value * (1 + tolerance) and value - ref_value > min_delta:
+                    regressions.append({
+                        'n_rows': run['n_rows'],
+                        'stage': name,
+                        'metric': metric,
+                        'value': value,
+                        'baseline': ref_value,
+                        'ratio': round(value / ref_value, 3) if ref_value else None
+                    })
+    return regressions
+
+
+def print_report(results):
+    """Tableau des étapes par taille"""
+    for run in results['runs']:
+        print(f"\n📊 {run['n_rows']:,} lignes ({run['mode']}, entrée {run['input_format']}) : "
+              f"{run['total_seconds']:.2f}s hors génération")
+        for name, stage in run['stages'].items():
+            rate = f"{stage['rows_per_s']:>12,} lignes/s" if stage['rows_per_s'] else " " * 20
+            memory = f"  pic {stage['peak_mb']:8.1f} Mo" if stage['peak_mb'] is not None else ''
+            print(f"  • {name:<26} {stage['seconds']:9.3f}s {rate}{memory}")
+
+
+def write_report(results, output_path):
+    """Écrit les résultats (et les régressions éventuelles) au format JSON"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Résultats écrits dans : {output_path}")
+
+
+def _parse_count(value):
+    """'1e6' -> 1000000"""
+    return int(float(value))
+
+
+def _parse_sizes(value):
+    """'1e3,1e4,1e5' -> [1000, 10000, 100000]"""
+    return [_parse_count(size) for size in value.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark étape par étape du pipeline "
+                                                 "sur données synthétiques")
+    parser.add_argument('--sizes', type=_parse_sizes, default=list(DEFAULT_SIZES),
+                        help="tailles séparées par des virgules, ex. 1e3,1e5,1e8")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="JSON de référence pour détecter les régressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument('--min-mb', type=float, default=DEFAULT_MIN_MB)
+    parser.add_argument('--method', default='winsorize')
+    parser.add_argument('--db-url', default='sqlite://')
+    parser.add_argument('--skip-db', action='store_true')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="sans le passage tracemalloc (pics mémoire non mesurés)")
+    parser.add_argument('--max-in-memory-rows', type=_parse_count, default=MAX_IN_MEMORY_ROWS)
+    parser.add_argument('--chunk-size', type=_parse_count, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, outlier_method=args.method, memory=not args.no_memory,
+                            db_url=None if args.skip_db else args.db_url,
+                            max_in_memory_rows=args.max_in_memory_rows,
+                            chunk_size=args.chunk_size, seed=args.seed)
+    print_report(results)
+
+    status = 0
+    results['thresholds'] = {'tolerance': args.tolerance, 'min_seconds': args.min_seconds,
+                             'min_mb': args.min_mb}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance,
+                                          args.min_seconds, args.min_mb)
+        results['baseline'] = args.baseline
+        results['regressions'] = regressions
+        if regressions:
+            status = 1
+            print(f"\n❌ {len(regressions)} régression(s) par rapport à {args.baseline} :")
+            for item in regressions:
+                print(f"  • {item['n_rows']:,} lignes, {item['stage']} ({item['metric']}) : "
+                      f"{item['value']} contre {item['baseline']} (x{item['ratio']})")
+        else:
+            print(f"\n✅ Aucune régression par rapport à {args.baseline}")
+
+    write_report(results, args.output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Définition déclarative des catégorisations : colonne produite -> règle
+#   source   : colonne d'entrée
+#   edges    : seuils triés
+#   closed   : 'right' -> x <= seuil reste dans la classe inférieure,
+#              'left'  -> x >= seuil passe dans la classe supérieure ;
+#              une liste permet de fixer le côté seuil par seuil
+#   labels   : une étiquette par intervalle (len(edges) + 1)
+#   categorical : False pour produire des entiers au lieu d'un Categorical
+# Une valeur manquante tombe dans le dernier intervalle, comme les anciennes
+# fonctions appliquées ligne à ligne (toutes les comparaisons y sont fausses).
+BINNINGS = {
+    'aqi_category': {
+        'source': 'air_quality_index',
+        'edges': [50, 100, 150],
+        'closed': 'right',
+        'labels': ['Bon', 'Modéré', 'Mauvais', 'Dangereux'],
+        'ordered': True
+    },
+    'speed_category': {
+        'source': 'speed_kmh',
+        'edges': [20, 35],
+        'closed': 'right',
+        'labels': ['Lente', 'Normale', 'Rapide'],
+        'ordered': True
+    },
+    'traffic_category': {
+        'source': 'traffic_density',
+        'edges': [0.25, 0.5],
+        'closed': 'right',
+        'labels': ['Fluide', 'Modéré', 'Dense'],
+        'ordered': True
+    },
+    'is_rush_hour': {
+        'source': 'hour',
+        # 7h-9h et 17h-19h inclus
+        'edges': [7, 9, 17, 19],
+        'closed': ['left', 'right', 'left', 'right'],
+        'labels': [0, 1, 0, 1, 0],
+        'categorical': False
+    },
+    'time_of_day': {
+        'source': 'hour',
+        'edges': [5, 12, 17, 22],
+        'closed': 'left',
+        'labels': ['Nuit', 'Matin', 'Après-midi', 'Soir', 'Nuit'],
+        'categories': ['Matin', 'Après-midi', 'Soir', 'Nuit']
+    }
+}
+
+
+def bin_indices(values, edges, closed='right'):
+    """Indice d'intervalle de chaque valeur (0 .. len(edges)), via searchsorted"""
+    values = np.asarray(values, dtype='float64')
+    edges = np.asarray(edges, dtype='float64')
+
+    if isinstance(closed, str):
+        closed = [closed] * len(edges)
+    closed = np.asarray(closed)
+
+    # Nombre de seuils franchis : x >= seuil pour 'left', x > seuil pour 'right'
+    left_edges = edges[closed == 'left']
+    right_edges = edges[closed == 'right']
+    return (np.searchsorted(left_edges, values, side='right')
+            + np.searchsorted(right_edges, values, side='left'))
+
+
+def apply_binning(series, spec):
+    """Évalue une règle de BINNINGS sur une Series (Categorical ou entiers)"""
+    idx = bin_indices(series.to_numpy(dtype='float64', na_value=np.nan),
+                      spec['edges'], spec.get('closed', 'right'))
+    labels = spec['labels']
+
+    if not spec.get('categorical', True):
+        return pd.Series(np.asarray(labels)[idx], index=series.index)
+
+    categories = spec.get('categories', labels)
+    label_codes = np.array([categories.index(label) for label in labels], dtype='int8')
+    values = pd.Categorical.from_codes(label_codes[idx], categories=categories,
+                                       ordered=spec.get('ordered', False))
+    return pd.Series(values, index=series.index)
+
+
+def add_binned_columns(df, names):
+    """Ajoute à df les colonnes catégorisées listées dans names"""
+    for name in names:
+        spec = BINNINGS[name]
+        df[name] = apply_binning(df[spec['source']], spec)
+    return df
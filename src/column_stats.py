@@ -0,0 +1,210 @@
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Quantiles servis par défaut : winsorize (1 %/99 %), IQR (Q1/Q3) et médiane
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+MAX_CACHE_ENTRIES = 256
+
+_cache = OrderedDict()
+# Version par buffer (id du propriétaire), incrémentée par invalidate_columns
+_versions = {}
+_cache_info = {'hits': 0, 'misses': 0}
+
+
+def _as_float(raw):
+    if raw.dtype == np.float64:
+        return raw
+    if raw.dtype.kind in 'iuf':
+        # Types compacts du schéma (float32, int8...) : conversion directe
+        return raw.astype('float64')
+    return pd.to_numeric(pd.Series(raw), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _buffer_owner(raw):
+    """Tableau numpy propriétaire du buffer de raw (fin de la chaîne des vues)"""
+    owner = raw
+    while isinstance(owner.base, np.ndarray):
+        owner = owner.base
+    return owner
+
+
+def _column_key(raw):
+    """Identifie une version de colonne par son buffer (propriétaire, adresse, taille, pas, type)"""
+    interface = raw.__array_interface__
+    return (id(_buffer_owner(raw)), interface['data'][0], raw.shape[0], raw.strides, raw.dtype.str)
+
+
+def _is_current(entry, raw):
+    """Vrai si l'entrée porte sur ce buffer encore vivant, dans sa version mise en cache
+
+    La référence faible au propriétaire écarte une adresse (ou un id) réutilisée
+    par un nouveau tableau ; la version écarte un buffer modifié en place et
+    signalé par invalidate_columns.
+    """
+    owner = _buffer_owner(raw)
+    return entry['owner']() is owner and entry['version'] == _versions.get(id(owner), 0)
+
+
+def invalidate_columns(df, columns=None):
+    """Signale une écriture en place dans les colonnes de df : leurs statistiques seront recalculées
+
+    Les affectations df[col] = ... créent un nouveau buffer et n'ont pas besoin
+    d'être signalées ; seules les écritures dans le buffer existant (df.loc[...] =
+    ..., inplace=True, to_numpy() modifié) le doivent.
+    """
+    for col in (df.columns if columns is None else columns):
+        if col in df.columns:
+            owner = _buffer_owner(df[col].to_numpy())
+            if id(owner) not in _versions:
+                # Le compteur vit tant que le buffer : un id réutilisé repart de zéro
+                weakref.finalize(owner, _versions.pop, id(owner), None)
+            _versions[id(owner)] = _versions.get(id(owner), 0) + 1
+
+
+def _moments(block):
+    """Moments par colonne d'un bloc 2D (NaN ignorés), comme pandas (skew/kurt non biaisés)"""
+    valid = ~np.isnan(block)
+    n = valid.sum(axis=0).astype('float64')
+    filled = np.where(valid, block, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / n
+        deviations = np.where(valid, block - mean, 0.0)
+        d2 = deviations ** 2
+        m2 = d2.sum(axis=0)
+        m3 = (d2 * deviations).sum(axis=0)
+        m4 = (d2 * d2).sum(axis=0)
+
+        std = np.sqrt(m2 / (n - 1))
+        skew = (np.sqrt(n * (n - 1)) / (n - 2)) * (m3 / n) / (m2 / n) ** 1.5
+        kurtosis = ((n + 1) * n * (n - 1) / ((n - 2) * (n - 3))) * (m4 / m2 ** 2) \
+            - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+
+        # Colonnes constantes : pandas renvoie 0 pour skew et kurtosis
+        constant = m2 == 0
+        skew = np.where(constant & (n > 2), 0.0, skew)
+        kurtosis = np.where(constant & (n > 3), 0.0, kurtosis)
+
+    minimum = np.where(n > 0, np.where(valid, block, np.inf).min(axis=0, initial=np.inf), np.nan)
+    maximum = np.where(n > 0, np.where(valid, block, -np.inf).max(axis=0, initial=-np.inf), np.nan)
+
+    return {
+        'count': n.astype('int64'),
+        'mean': mean,
+        'std': np.where(n > 1, std, np.nan),
+        'min': minimum,
+        'max': maximum,
+        'skew': np.where(n > 2, skew, np.nan),
+        'kurtosis': np.where(n > 3, kurtosis, np.nan)
+    }
+
+
+def _quantiles(block, quantiles):
+    """Quantiles (interpolation linéaire, comme Series.quantile) pour toutes les colonnes"""
+    if len(block) == 0:
+        return np.full((len(quantiles), block.shape[1]), np.nan)
+    if np.isnan(block).any():
+        return np.nanquantile(block, quantiles, axis=0)
+    return np.quantile(block, quantiles, axis=0)
+
+
+def column_stats(df, columns, quantiles=DEFAULT_QUANTILES):
+    """Statistiques descriptives par colonne, calculées en un passage et mises en cache
+
+    Retourne {colonne: {'count', 'mean', 'std', 'min', 'max', 'skew', 'kurtosis',
+    'quantiles': {q: valeur}}}. Les colonnes absentes de df sont ignorées. Le
+    cache est indexé par buffer (référence faible à son propriétaire) et par
+    version : une colonne remplacée ou filtrée est recalculée, une colonne
+    modifiée en place l'est après invalidate_columns.
+    """
+    quantiles = tuple(sorted(set(quantiles)))
+    result = {}
+    missing_moments = []
+    missing_quantiles = {}
+    raw_by_col = {}
+    values_by_col = {}
+
+    for col in columns:
+        if col not in df.columns or col in result:
+            continue
+        # to_numpy() renvoie une vue sur le bloc pandas : adresse stable tant
+        # que la colonne n'est pas remplacée
+        raw = df[col].to_numpy()
+        raw_by_col[col] = raw
+        key = (_column_key(raw), col)
+        entry = _cache.get(key)
+
+        if entry is not None and _is_current(entry, raw):
+            _cache.move_to_end(key)
+            result[col] = entry['stats']
+            missing = [q for q in quantiles if q not in entry['stats']['quantiles']]
+            if missing:
+                missing_quantiles[col] = missing
+            else:
+                _cache_info['hits'] += 1
+            continue
+
+        _cache_info['misses'] += 1
+        missing_moments.append(col)
+        missing_quantiles[col] = list(quantiles)
+
+    for col in set(missing_moments) | set(missing_quantiles):
+        values_by_col[col] = _as_float(raw_by_col[col])
+
+    # Un seul passage vectorisé pour les colonnes à (re)calculer
+    if missing_moments:
+        block = np.column_stack([values_by_col[col] for col in missing_moments])
+        moments = _moments(block)
+        for i, col in enumerate(missing_moments):
+            result[col] = {name: values[i].item() for name, values in moments.items()}
+            result[col]['quantiles'] = {}
+
+    if missing_quantiles:
+        # Regroupe les colonnes qui demandent le même jeu de quantiles
+        groups = {}
+        for col, qs in missing_quantiles.items():
+            groups.setdefault(tuple(qs), []).append(col)
+        for qs, cols in groups.items():
+            block = np.column_stack([values_by_col[col] for col in cols])
+            computed = _quantiles(block, list(qs))
+            for j, col in enumerate(cols):
+                for i, q in enumerate(qs):
+                    result[col]['quantiles'][q] = computed[i, j].item()
+
+    for col in set(missing_moments) | set(missing_quantiles):
+        raw = raw_by_col[col]
+        owner = _buffer_owner(raw)
+        _cache[(_column_key(raw), col)] = {'owner': weakref.ref(owner),
+                                           'version': _versions.get(id(owner), 0),
+                                           'stats': result[col]}
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+    return result
+
+
+def quantile(df, col, q):
+    """Quantile q d'une colonne, servi par le cache de statistiques"""
+    return column_stats(df, [col], quantiles=(q,))[col]['quantiles'][q]
+
+
+def iqr_bounds(df, col, threshold=1.5):
+    """Bornes IQR (Q1 - t*IQR, Q3 + t*IQR) d'une colonne"""
+    qs = column_stats(df, [col])[col]['quantiles']
+    IQR = qs[0.75] - qs[0.25]
+    return qs[0.25] - threshold * IQR, qs[0.75] + threshold * IQR
+
+
+def stats_cache_info():
+    """Compteurs de hits/misses et taille du cache"""
+    return dict(_cache_info, entries=len(_cache))
+
+
+def clear_stats_cache():
+    """Vide le cache de statistiques"""
+    _cache.clear()
+    _versions.clear()
+    _cache_info['hits'] = 0
+    _cache_info['misses'] = 0
@@ -0,0 +1,137 @@
+import os
+import json
+import shutil
+import pandas as pd
+from schema import enforce_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow est optionnel : sans lui, export CSV uniquement
+    pa = None
+
+# Extension -> format d'export ; un répertoire (sans extension) reçoit un jeu partitionné
+EXPORT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+DEFAULT_COMPRESSION = 'zstd'
+# Lignes par row group Parquet (et par lot Feather) : statistiques min/max par groupe
+DEFAULT_ROW_GROUP_SIZE = 64_000
+# Clés de partition calculées : la colonne month (1-12) mélangerait les années
+DERIVED_PARTITION_KEYS = {
+    'year_month': lambda df: df['timestamp'].dt.strftime('%Y-%m')
+}
+# Métadonnée de schéma : ordre des colonnes de df (les clés de partition sont déplacées en fin)
+COLUMNS_METADATA_KEY = b'mobility.columns'
+
+
+def export_format(path, partition_by=None, format=None):
+    """Format d'export : explicite, sinon déduit de l'extension (Parquet pour un répertoire)"""
+    if format is not None:
+        return format
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXPORT_FORMATS:
+        return EXPORT_FORMATS[ext]
+    if partition_by or ext == '':
+        return 'parquet'
+    raise ValueError(f"Extension d'export inconnue : {ext} (attendu : {list(EXPORT_FORMATS)})")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow est requis pour l'export Parquet/Feather (pip install pyarrow)")
+
+
+def _is_previous_export(path):
+    """Vrai si le répertoire ne contient que des partitions Hive (clé=valeur) d'un export"""
+    return all('=' in name or name.startswith('_') for name in os.listdir(path))
+
+
+def _dataset_files(path):
+    return [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+
+
+def write_columnar(df, path, format='parquet', partition_by=None,
+                   compression=DEFAULT_COMPRESSION, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                   sort_by='timestamp', use_threads=True):
+    """Écrit df en Parquet ou Feather compressé, partitionné à la Hive si partition_by
+
+    partition_by : colonnes de df ou clés de DERIVED_PARTITION_KEYS ('year_month'),
+    écrites en répertoires clé=valeur (retirées des fichiers ; read_results
+    restaure les colonnes de df dans leur ordre et écarte les clés calculées). Les lignes sont triées par sort_by dans chaque partition :
+    les statistiques min/max des row groups de row_group_size lignes
+    permettent alors d'ignorer des groupes entiers à la lecture. Les
+    partitions sont écrites en parallèle par le pool de threads d'Arrow.
+    Retourne {'format', 'path', 'rows', 'files', 'bytes'}.
+    """
+    _require_pyarrow()
+    partition_by = list(partition_by or [])
+    frame = df.assign(**{key: DERIVED_PARTITION_KEYS[key](df) for key in partition_by
+                         if key in DERIVED_PARTITION_KEYS and key not in df.columns})
+    sort_keys = partition_by + ([sort_by] if sort_by in frame.columns else [])
+    if sort_keys:
+        frame = frame.sort_values(sort_keys, kind='stable')
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           COLUMNS_METADATA_KEY: json.dumps(list(df.columns)).encode()})
+
+    if not partition_by:
+        if format == 'parquet':
+            pq.write_table(table, path, compression=compression, row_group_size=row_group_size,
+                           write_statistics=True)
+        else:
+            feather.write_feather(table, path, compression=compression, chunksize=row_group_size)
+        return {'format': format, 'path': path, 'rows': table.num_rows, 'files': 1,
+                'bytes': os.path.getsize(path)}
+
+    # Un export précédent est remplacé entièrement (pas de partitions périmées)
+    if os.path.isdir(path):
+        if not _is_previous_export(path):
+            raise ValueError(f"{path} existe et ne contient pas un export partitionné")
+        shutil.rmtree(path)
+
+    if format == 'parquet':
+        file_format = ds.ParquetFileFormat()
+        file_options = file_format.make_write_options(compression=compression,
+                                                      write_statistics=True)
+    else:
+        file_format = ds.IpcFileFormat()
+        file_options = file_format.make_write_options(compression=compression)
+    ds.write_dataset(table, path, format=file_format, file_options=file_options,
+                     partitioning=partition_by, partitioning_flavor='hive',
+                     basename_template=f"part-{{i}}.{format}", max_rows_per_group=row_group_size,
+                     use_threads=use_threads, preserve_order=True)
+    files = _dataset_files(path)
+    return {'format': format, 'path': path, 'rows': table.num_rows, 'files': len(files),
+            'bytes': sum(os.path.getsize(name) for name in files)}
+
+
+def read_results(path, columns=None, filters=None, format=None):
+    """Relit un export Parquet/Feather (partitionné ou non) avec les types du schéma
+
+    columns : colonnes à lire (les autres ne sont pas décodées) ; filters :
+    prédicats au format pyarrow, ex. [('route_id', '=', 'R1'),
+    ('timestamp', '>=', pd.Timestamp('2024-01-15'))]. Les partitions et row
+    groups exclus par les filtres ne sont pas lus. Sans columns, un export
+    partitionné est relu avec les colonnes de df dans leur ordre d'origine (une
+    clé calculée comme year_month n'est retournée que si columns la demande).
+    """
+    _require_pyarrow()
+    format = export_format(path, format=format)
+    if format == 'csv':
+        df = pd.read_csv(path, usecols=columns)
+        enforce_schema(df)
+        return df
+
+    partitioning = None
+    if os.path.isdir(path):
+        partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    dataset = ds.dataset(path, format='ipc' if format == 'feather' else 'parquet',
+                         partitioning=partitioning)
+    expression = pq.filters_to_expression(filters) if filters else None
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    stored = (dataset.schema.metadata or {}).get(COLUMNS_METADATA_KEY)
+    if columns is None and stored is not None:
+        df = df[[col for col in json.loads(stored) if col in df.columns]]
+    enforce_schema(df)
+    return df
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_DIMENSIONS = ('hour', 'day_of_week', 'weather', 'route_id')
+DEFAULT_MEASURES = ('speed_kmh', 'traffic_density', 'air_quality_index')
+DAY_NAMES = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+
+def _factorize(values, dim):
+    """Codes et modalités triées ; les jours nommés gardent l'ordre de la semaine"""
+    if dim == 'day_of_week' and not pd.api.types.is_numeric_dtype(values):
+        values = pd.Categorical(values, categories=DAY_NAMES, ordered=True)
+    return pd.factorize(values, sort=True)
+
+
+class FilterCube:
+    """Cube pré-agrégé (effectifs, sommes, sommes des carrés et des produits) par dimensions
+
+    Chaque cellule correspond à une combinaison heure × jour × météo × route.
+    Une combinaison de filtres se résout en sommant une tranche du cube : le
+    coût dépend du nombre de modalités, pas du nombre de lignes. Seules les
+    lignes dont toutes les mesures sont renseignées sont agrégées.
+    """
+
+    def __init__(self, dimensions, labels, measures, offsets, count, sums, products):
+        self.dimensions = list(dimensions)
+        self.labels = labels
+        self.measures = list(measures)
+        # Mesures centrées sur leur moyenne globale : évite la perte de précision
+        # de sum(x²) - sum(x)²/n sur de gros effectifs
+        self.offsets = offsets
+        self.count = count
+        self.sums = sums
+        # products[i, j] : somme de x_i * x_j (carrés sur la diagonale)
+        self.products = products
+
+    @classmethod
+    def from_frame(cls, df, dimensions=DEFAULT_DIMENSIONS, measures=DEFAULT_MEASURES):
+        """Construit le cube en un passage (bincount sur l'indice de cellule)"""
+        dimensions = [dim for dim in dimensions if dim in df.columns]
+        measures = [col for col in measures if col in df.columns]
+
+        values = df[measures].to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(values).any(axis=1)
+        codes, labels = [], {}
+        for dim in dimensions:
+            dim_codes, uniques = _factorize(df[dim], dim)
+            valid &= dim_codes >= 0
+            codes.append(dim_codes)
+            labels[dim] = list(uniques)
+
+        shape = tuple(max(len(labels[dim]), 1) for dim in dimensions)
+        values = values[valid]
+        offsets = values.mean(axis=0) if len(values) else np.zeros(len(measures))
+        values = values - offsets
+        cell = np.ravel_multi_index([c[valid] for c in codes], shape) if dimensions \
+            else np.zeros(len(values), dtype='int64')
+        n_cells = int(np.prod(shape))
+
+        count = np.bincount(cell, minlength=n_cells).reshape(shape)
+        sums = np.stack([np.bincount(cell, weights=values[:, i], minlength=n_cells)
+                         for i in range(len(measures))]).reshape((len(measures),) + shape)
+        products = np.empty((len(measures), len(measures)) + shape)
+        for i in range(len(measures)):
+            for j in range(i, len(measures)):
+                products[i, j] = np.bincount(cell, weights=values[:, i] * values[:, j],
+                                             minlength=n_cells).reshape(shape)
+                products[j, i] = products[i, j]
+        return cls(dimensions, labels, measures, offsets, count, sums, products)
+
+    @classmethod
+    def from_aggregates(cls, groups, dimensions=DEFAULT_DIMENSIONS, measures=DEFAULT_MEASURES):
+        """Construit le cube depuis des agrégats par cellule (GROUP BY calculé en base)
+
+        groups a une ligne par combinaison des dimensions et les colonnes count,
+        sum_<mesure> et prod_<mesure>_<mesure> (paires i <= j de measures), comme
+        la requête de dashboard_data.query_cube.
+        """
+        dimensions = [dim for dim in dimensions if dim in groups.columns]
+        measures = list(measures)
+        groups = groups.dropna(subset=dimensions)
+        codes, labels = [], {}
+        for dim in dimensions:
+            dim_codes, uniques = _factorize(groups[dim], dim)
+            codes.append(dim_codes)
+            labels[dim] = list(uniques)
+
+        shape = tuple(max(len(labels[dim]), 1) for dim in dimensions)
+        n_cells = int(np.prod(shape))
+        cell = np.ravel_multi_index(codes, shape) if dimensions \
+            else np.zeros(len(groups), dtype='int64')
+
+        def per_cell(column):
+            return np.bincount(cell, weights=groups[column].to_numpy(dtype='float64'),
+                               minlength=n_cells).reshape(shape)
+
+        count = per_cell('count')
+        raw_sums = np.stack([per_cell(f'sum_{m}') for m in measures])
+        total = count.sum()
+        offsets = raw_sums.reshape(len(measures), -1).sum(axis=1) / total if total \
+            else np.zeros(len(measures))
+        # Recentrage sur la moyenne globale : sum((x-a)(y-b)) = Sxy - b.Sx - a.Sy + n.a.b
+        sums = raw_sums - offsets.reshape((-1,) + (1,) * len(shape)) * count
+        products = np.empty((len(measures), len(measures)) + shape)
+        for i, a in enumerate(measures):
+            for j in range(i, len(measures)):
+                b = measures[j]
+                products[i, j] = (per_cell(f'prod_{a}_{b}') - offsets[j] * raw_sums[i]
+                                  - offsets[i] * raw_sums[j] + count * offsets[i] * offsets[j])
+                products[j, i] = products[i, j]
+        return cls(dimensions, labels, measures, offsets, count.astype('int64'), sums, products)
+
+    def _selector(self, filters):
+        """Masques booléens par dimension ; filters = {dim: liste de valeurs ou (min, max)}"""
+        selector = []
+        for dim in self.dimensions:
+            labels = self.labels[dim]
+            wanted = (filters or {}).get(dim)
+            if wanted is None:
+                mask = np.ones(len(labels), dtype=bool)
+            elif isinstance(wanted, tuple) and len(wanted) == 2:
+                low, high = wanted
+                mask = np.array([low <= label <= high for label in labels], dtype=bool)
+            else:
+                mask = np.isin(np.asarray(labels, dtype=object), list(wanted))
+            selector.append(mask)
+        return selector
+
+    def _slice(self, array, selector, lead=0):
+        """Sous-cube correspondant aux filtres (les lead premiers axes sont conservés)"""
+        for axis, mask in enumerate(selector):
+            array = np.compress(mask, array, axis=lead + axis)
+        return array
+
+    def summary(self, filters=None):
+        """Effectif et moyennes des mesures pour une combinaison de filtres"""
+        selector = self._selector(filters)
+        n = self._slice(self.count, selector).sum()
+        sums = self._slice(self.sums, selector, lead=1).reshape(len(self.measures), -1).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.offsets + sums / n
+        return {'count': int(n), 'mean': dict(zip(self.measures, means))}
+
+    def group_mean(self, dim, measure, filters=None):
+        """Moyenne de measure par modalité de dim (équivalent de groupby(dim)[measure].mean())"""
+        selector = self._selector(filters)
+        axis = self.dimensions.index(dim)
+        others = tuple(a for a in range(len(self.dimensions)) if a != axis)
+        i = self.measures.index(measure)
+        n = self._slice(self.count, selector).sum(axis=others)
+        sums = self._slice(self.sums[i], selector).sum(axis=others)
+        labels = np.asarray(self.labels[dim], dtype=object)[selector[axis]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.offsets[i] + sums / n
+        # Comme groupby : les modalités sans ligne n'apparaissent pas
+        result = pd.Series(means, index=pd.Index(labels, name=dim), name=measure)
+        return result[n > 0]
+
+    def corr(self, filters=None):
+        """Matrice de corrélation de Pearson des mesures (comme DataFrame.corr())"""
+        selector = self._selector(filters)
+        k = len(self.measures)
+        n = self._slice(self.count, selector).sum()
+        sums = self._slice(self.sums, selector, lead=1).reshape(k, -1).sum(axis=1)
+        products = self._slice(self.products, selector, lead=2).reshape(k, k, -1).sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = products - np.outer(sums, sums) / n
+            std = np.sqrt(np.diag(covariance))
+            corr = covariance / np.outer(std, std)
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.measures, columns=self.measures)
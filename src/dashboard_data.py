@@ -0,0 +1,224 @@
+import time
+import threading
+from collections import OrderedDict
+import pandas as pd
+from sqlalchemy import text, bindparam
+from db_connector import get_engine
+from dashboard_cube import (FilterCube, DAY_NAMES, DEFAULT_DIMENSIONS as CUBE_DIMENSIONS,
+                            DEFAULT_MEASURES)
+from map_grid import (BASE_CELL_DEG, DENSITY_THRESHOLD, SPEED_THRESHOLD,
+                      DEFAULT_DIMENSIONS as MAP_DIMENSIONS)
+
+DASHBOARD_COLUMNS = ('route_id', 'timestamp', 'latitude', 'longitude', 'speed_kmh',
+                     'traffic_density', 'air_quality_index', 'weather', 'hour', 'day_of_week')
+CACHE_TTL_S = 300
+CACHE_MAX_ENTRIES = 128
+# Hash multiplicatif de l'id : ordre pseudo-aléatoire stable, réparti sur toute la table
+SAMPLE_ORDER = '(id * 2654435761) % 4294967296'
+
+
+class TTLCache:
+    """Cache LRU à expiration, partagé entre sessions (threads) du dashboard
+
+    Une clé absente n'est calculée qu'une fois : les requêtes concurrentes sur
+    la même clé attendent le résultat du premier appelant au lieu de relancer
+    la même requête SQL.
+    """
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache pour key, sinon compute() (un seul calcul par clé à la fois)"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+            if not owner:
+                # Un autre thread calcule cette clé : on attend puis on relit le cache
+                event.wait()
+                continue
+
+            try:
+                value = compute()
+                with self._lock:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key).set()
+
+    def info(self):
+        """Compteurs de hits/misses et taille du cache"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_query_cache = TTLCache()
+
+
+def normalize_filters(filters):
+    """Tuple hashable et canonique des filtres (clé de cache)"""
+    key = []
+    for dim, wanted in sorted((filters or {}).items()):
+        if wanted is None:
+            continue
+        if isinstance(wanted, tuple) and len(wanted) == 2:
+            key.append((dim, 'range', tuple(wanted)))
+        else:
+            key.append((dim, 'in', tuple(sorted(wanted, key=str))))
+    return tuple(key)
+
+
+def build_filter_query(filters, columns=DASHBOARD_COLUMNS, table_name='mobility_processed',
+                       limit=None, sample=False):
+    """Requête SQL paramétrée : colonnes utiles et filtres du dashboard dans le WHERE
+
+    sample=True trie les lignes par SAMPLE_ORDER : avec limit, l'échantillon est
+    le même d'un appel à l'autre et ne se limite pas aux premières lignes insérées.
+    """
+    clauses, params, expanding = [], {}, []
+    for dim, kind, wanted in normalize_filters(filters):
+        if kind == 'range':
+            clauses.append(f"{dim} BETWEEN :{dim}_min AND :{dim}_max")
+            params[f"{dim}_min"], params[f"{dim}_max"] = wanted
+        else:
+            clauses.append(f"{dim} IN :{dim}_values")
+            params[f"{dim}_values"] = list(wanted)
+            expanding.append(bindparam(f"{dim}_values", expanding=True))
+
+    sql = f"SELECT {', '.join(columns)} FROM {table_name}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if sample:
+        sql += f" ORDER BY {SAMPLE_ORDER}"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return text(sql).bindparams(*expanding), params
+
+
+def _to_db_filters(filters):
+    """Jours affichés (Lundi..Dimanche) -> codes 0..6 stockés en base"""
+    filters = dict(filters or {})
+    if filters.get('day_of_week') is not None:
+        filters['day_of_week'] = [DAY_NAMES.index(day) for day in filters['day_of_week']]
+    return filters
+
+
+def _from_db(df):
+    """Types d'affichage : timestamps, codes de jour 0..6 -> Lundi..Dimanche"""
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if 'day_of_week' in df.columns:
+        df['day_of_week'] = df['day_of_week'].map(dict(enumerate(DAY_NAMES)))
+    return df
+
+
+def query_filtered(filters=None, columns=DASHBOARD_COLUMNS, engine=None,
+                   table_name='mobility_processed', limit=None, sample=False):
+    """Lignes de table_name correspondant aux filtres, filtrées côté base et mises en cache
+
+    Les filtres ({'hour': (min, max), 'day_of_week': [...], 'weather': [...]})
+    sont traduits en WHERE paramétré ; seules les colonnes demandées sont lues,
+    via le pool de connexions de db_connector. Le résultat est partagé dans un
+    cache TTL/LRU indexé par le tuple de filtres (à ne pas modifier en place).
+    sample=True (avec limit) lit un échantillon stable, voir build_filter_query.
+    """
+    engine = engine or get_engine()
+    db_filters = _to_db_filters(filters)
+    key = (str(engine.url), table_name, tuple(columns), normalize_filters(db_filters), limit,
+           sample)
+
+    def run_query():
+        query, params = build_filter_query(db_filters, columns, table_name, limit, sample)
+        with engine.connect() as connection:
+            return _from_db(pd.read_sql(query, connection, params=params))
+
+    return _query_cache.get_or_compute(key, run_query)
+
+
+def build_group_query(keys, aggregates, table_name='mobility_processed', not_null=()):
+    """Requête GROUP BY : clés et agrégats donnés en {alias: expression SQL}"""
+    selected = [f"{expr} AS {alias}" for alias, expr in {**keys, **aggregates}.items()]
+    sql = f"SELECT {', '.join(selected)} FROM {table_name}"
+    if not_null:
+        sql += " WHERE " + " AND ".join(f"{col} IS NOT NULL" for col in not_null)
+    return text(sql + " GROUP BY " + ", ".join(keys.values()))
+
+
+def query_grouped(keys, aggregates, not_null=(), engine=None, table_name='mobility_processed'):
+    """Agrégats calculés par la base : une ligne par groupe, sans lire les lignes brutes
+
+    Le résultat, borné par le nombre de groupes, n'entre pas dans le cache de
+    requêtes : l'appelant le garde (st.cache_data dans le dashboard). Les
+    groupes dont une clé est NULL sont écartés.
+    """
+    engine = engine or get_engine()
+    with engine.connect() as connection:
+        df = pd.read_sql(build_group_query(keys, aggregates, table_name, not_null), connection)
+    return _from_db(df.dropna(subset=list(keys)).reset_index(drop=True))
+
+
+def query_cube(engine=None, table_name='mobility_processed', dimensions=CUBE_DIMENSIONS,
+               measures=DEFAULT_MEASURES):
+    """FilterCube construit sur les effectifs, sommes et sommes des produits calculés en SQL"""
+    aggregates = {'count': 'COUNT(*)'}
+    aggregates.update({f'sum_{m}': f'SUM({m})' for m in measures})
+    aggregates.update({f'prod_{a}_{b}': f'SUM({a} * {b})'
+                       for i, a in enumerate(measures) for b in measures[i:]})
+    groups = query_grouped({dim: dim for dim in dimensions}, aggregates, not_null=measures,
+                           engine=engine, table_name=table_name)
+    return FilterCube.from_aggregates(groups, dimensions, measures)
+
+
+def query_map_cells(engine=None, table_name='mobility_processed', base_cell_deg=BASE_CELL_DEG,
+                    dimensions=MAP_DIMENSIONS, density_threshold=DENSITY_THRESHOLD,
+                    speed_threshold=SPEED_THRESHOLD):
+    """Cellules de base de la carte calculées en SQL (mêmes colonnes que precompute_cells)"""
+    keys = {'lat_idx': f'FLOOR(latitude / {base_cell_deg!r})',
+            'lon_idx': f'FLOOR(longitude / {base_cell_deg!r})'}
+    keys.update({dim: dim for dim in dimensions})
+    aggregates = {
+        'count': 'COUNT(*)',
+        'lat_sum': 'SUM(latitude)',
+        'lon_sum': 'SUM(longitude)',
+        'traffic_sum': 'SUM(traffic_density)',
+        'aqi_sum': 'SUM(air_quality_index)',
+        'critical': (f'SUM(CASE WHEN traffic_density > {float(density_threshold)!r} '
+                     f'AND speed_kmh < {float(speed_threshold)!r} THEN 1 ELSE 0 END)')
+    }
+    cells = query_grouped(keys, aggregates,
+                          not_null=('latitude', 'longitude', 'traffic_density', 'air_quality_index'),
+                          engine=engine, table_name=table_name)
+    return cells.astype({'lat_idx': 'int64', 'lon_idx': 'int64'})
+
+
+def query_cache_info():
+    """Statistiques du cache de requêtes du dashboard"""
+    return _query_cache.info()
+
+
+def clear_query_cache():
+    """Vide le cache de requêtes du dashboard"""
+    _query_cache.clear()
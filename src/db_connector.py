@@ -1,12 +1,83 @@
 # Connexion à MySQL local
-!pip install pymysql
-
+# Dépendance : pymysql (voir requirements.txt)
+import os
+import time
+import tempfile
+import pandas as pd
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import StaticPool
+from db_schema import apply_migrations, ensure_month_partitions, drop_table
+from schema import sql_scale, encode_flags
+from instrumentation import stage_context
+
+DEFAULT_DATABASE_URL = "mysql+pymysql://root@localhost/mobility_db"
+# Lignes par INSERT multi-lignes
+DEFAULT_CHUNK_SIZE = 1000
+# Limite de paramètres liés par requête sous SQLite (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MAX_VARIABLES = 32766
+# Clé naturelle d'une lecture : une route à un instant donné
+NATURAL_KEY = ('route_id', 'timestamp')
+# Caractères à échapper dans un champ LOAD DATA (ESCAPED BY '\\')
+LOAD_DATA_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n'})
+
+# Mapping entre les colonnes du pipeline et la table
+COLUMN_MAPPING = {
+    'route_id': 'route_id',
+    'timestamp': 'timestamp',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'speed_kmh': 'speed_kmh',
+    'traffic_density': 'traffic_density',
+    'air_quality_index': 'air_quality_index',
+    'weather': 'weather',
+    'hour': 'hour',
+    'day_of_week': 'day_of_week',
+    'month': 'month',
+    'is_weekend': 'is_weekend',
+    'aqi_category': 'aqi_category',
+    'speed_category': 'speed_category',
+    'traffic_category': 'traffic_category',
+    'weather_encoded': 'weather_encoded',
+    'speed_traffic_product': 'speed_traffic_product',
+    'traffic_aqi_flag': 'traffic_aqi_flag',
+    'is_rush_hour': 'is_rush_hour',
+    'time_of_day': 'time_of_day'
+    # 'created_at' sera auto-généré
+}
+
+# Un moteur (et son pool de connexions) par URL, réutilisé d'un appel à l'autre
+_engines = {}
+
+
+def get_engine(url=None):
+    """Retourne le moteur SQLAlchemy mutualisé pour url (MySQL par défaut, ou SQLite)"""
+    url = url or os.environ.get('MOBILITY_DB_URL', DEFAULT_DATABASE_URL)
+    engine = _engines.get(url)
+    if engine is None:
+        if url.startswith('sqlite'):
+            # SQLite en mémoire : une seule connexion partagée, sinon chaque
+            # connexion du pool verrait une base vide
+            kwargs = {'poolclass': StaticPool} if url in ('sqlite://', 'sqlite:///:memory:') else {}
+            engine = create_engine(url, connect_args={'check_same_thread': False}, **kwargs)
+        else:
+            engine = create_engine(url, pool_size=5, pool_recycle=3600, pool_pre_ping=True,
+                                   connect_args={'local_infile': True})
+        _engines[url] = engine
+    return engine
 
-def connect_to_mysql():
+
+def dispose_engines():
+    """Ferme les pools de connexions ouverts"""
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
+
+
+def connect_to_mysql(url=None):
     """Établit la connexion à MySQL"""
     try:
-        engine = create_engine("mysql+pymysql://root@localhost/mobility_db")
+        engine = get_engine(url)
         connection = engine.connect()
         print("✅ Connecté à MySQL avec succès")
         return engine, connection
@@ -14,60 +85,258 @@ def connect_to_mysql():
         print(f"❌ Erreur de connexion: {e}")
         return None, None
 
-# Tester la connexion
-engine, conn = connect_to_mysql()
-
-def save_to_existing_table(df, table_name='mobility_processed'):
-    """Insère dans la table existante avec mapping des colonnes"""
-    
-    # Vérifier les colonnes
-    print("📋 Colonnes disponibles dans vos données:")
-    print(df.columns.tolist())
-    
-    # Mapping entre vos colonnes et la table
-    column_mapping = {
-        'route_id': 'route_id',
-        'timestamp': 'timestamp',
-        'latitude': 'latitude',
-        'longitude': 'longitude',
-        'speed_kmh': 'speed_kmh',
-        'traffic_density': 'traffic_density',
-        'air_quality_index': 'air_quality_index',
-        'weather': 'weather',
-        'hour': 'hour',
-        'day_of_week': 'day_of_week',
-        'month': 'month',
-        'is_weekend': 'is_weekend',
-        'aqi_category': 'aqi_category',
-        'speed_category': 'speed_category',
-        'traffic_category': 'traffic_category',
-        'weather_encoded': 'weather_encoded',
-        'speed_traffic_product': 'speed_traffic_product',
-        'traffic_aqi_flag': 'traffic_aqi_flag',
-        'is_rush_hour': 'is_rush_hour',
-        'time_of_day': 'time_of_day'
-        # 'created_at' sera auto-généré
-    }
-    
-    # Sélectionner et renommer les colonnes
-    df_to_insert = df[list(column_mapping.keys())].rename(columns=column_mapping)
-    
-    # Connexion MySQL
-    engine = create_engine("mysql+pymysql://root@localhost/mobility_db")
-    
-    # Insérer avec append (ne pas remplacer la table)
-    df_to_insert.to_sql(table_name, 
-                       engine, 
-                       if_exists='append',  # ← CRUCIAL: 'append' pas 'replace'
-                       index=False)
-    
-    # Vérifier
-    count = pd.read_sql(f"SELECT COUNT(*) as count FROM {table_name}", engine)
-    print(f"✅ {len(df_to_insert)} lignes insérées")
-    print(f"📊 Total dans la table: {count['count'][0]} lignes")
-    
-    engine.dispose()
-    return True
+
+def prepare_rows(df):
+    """Sélectionne et renomme les colonnes de la table"""
+    df_to_insert = df[list(COLUMN_MAPPING.keys())].rename(columns=COLUMN_MAPPING)
+    # Booléens -> 1/0 : LOAD DATA lirait 'True'/'False' comme 0 (simple avertissement)
+    df_to_insert = encode_flags(df_to_insert)
+    for col in df_to_insert.columns:
+        scale = sql_scale(col)
+        # float32 -> float64 arrondi à l'échelle SQL : 2.1 et non 2.0999999046
+        if df_to_insert[col].dtype == 'float32' and scale is not None:
+            df_to_insert[col] = df_to_insert[col].astype('float64').round(scale)
+    return df_to_insert
+
+
+def _column_values(series):
+    """Valeurs Python d'une colonne (types natifs pour le pilote), None pour les manquants"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+    else:
+        values = series.astype(object).to_numpy()
+    mask = pd.isna(values)
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+    return values.tolist()
+
+
+def _insert_multirow(connection, table_name, df_to_insert, chunk_size):
+    """INSERT multi-lignes par lots de chunk_size, dans une seule transaction"""
+    columns = list(df_to_insert.columns)
+    if connection.dialect.name == 'sqlite':
+        chunk_size = min(chunk_size, SQLITE_MAX_VARIABLES // len(columns))
+    quoted = ', '.join(connection.dialect.identifier_preparer.quote(col) for col in columns)
+    placeholder = '(' + ', '.join(['%s' if connection.dialect.paramstyle in ('format', 'pyformat')
+                                   else '?'] * len(columns)) + ')'
+
+    rows = list(zip(*[_column_values(df_to_insert[col]) for col in columns]))
+    statements = {}
+    inserted = 0
+    cursor = connection.connection.cursor()
+    try:
+        for start in range(0, len(rows), chunk_size):
+            batch = rows[start:start + chunk_size]
+            statement = statements.get(len(batch))
+            if statement is None:
+                statement = f"INSERT INTO {table_name} ({quoted}) VALUES " \
+                            + ', '.join([placeholder] * len(batch))
+                statements[len(batch)] = statement
+            cursor.execute(statement, [value for row in batch for value in row])
+            inserted += cursor.rowcount
+    finally:
+        cursor.close()
+    return inserted
+
+
+def _write_load_data_file(df_to_insert, f):
+    """Écrit les lignes au format TSV attendu par LOAD DATA (\\N pour NULL)"""
+    # \N non échappé : csv.writer écrirait \\N, chargé comme la chaîne '\N'
+    for row in zip(*[_column_values(df_to_insert[col]) for col in df_to_insert.columns]):
+        f.write('\t'.join('\\N' if value is None else str(value).translate(LOAD_DATA_ESCAPES)
+                          for value in row) + '\n')
+
+
+def _load_data_infile(connection, table_name, df_to_insert):
+    """Chemin rapide MySQL : LOAD DATA LOCAL INFILE depuis un CSV temporaire"""
+    columns = list(df_to_insert.columns)
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, newline='',
+                                     encoding='utf-8') as f:
+        tmp_path = f.name
+        _write_load_data_file(df_to_insert, f)
+    try:
+        statement = f"LOAD DATA LOCAL INFILE '{tmp_path.replace(os.sep, '/')}' " \
+                    f"INTO TABLE {table_name} CHARACTER SET utf8mb4 " \
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' " \
+                    f"({', '.join(f'`{col}`' for col in columns)})"
+        result = connection.exec_driver_sql(statement)
+        return result.rowcount
+    finally:
+        os.remove(tmp_path)
+
+
+def _bulk_insert(connection, table_name, df_to_insert, method, chunk_size, verbose):
+    """Charge df_to_insert dans table_name ; retourne (lignes insérées, méthode utilisée)"""
+    if method == 'load_data':
+        try:
+            return _load_data_infile(connection, table_name, df_to_insert), method
+        except DBAPIError as e:
+            # local_infile désactivé côté serveur : repli sur les INSERT multi-lignes
+            if verbose:
+                print(f"⚠️  LOAD DATA LOCAL INFILE indisponible ({e.orig}), repli sur INSERT multi-lignes")
+    return _insert_multirow(connection, table_name, df_to_insert, chunk_size), 'multi'
+
+
+def _merge_staging(connection, table_name, staging_name, columns, key):
+    """Fusion ensembliste staging -> table : compte puis applique insertions et mises à jour"""
+    quote = connection.dialect.identifier_preparer.quote
+    is_mysql = connection.dialect.name == 'mysql'
+    # Comparaison tolérante aux NULL : <=> (MySQL), IS (SQLite)
+    same = (lambda col: f"t.{quote(col)} <=> s.{quote(col)}") if is_mysql \
+        else (lambda col: f"t.{quote(col)} IS s.{quote(col)}")
+    join = ' AND '.join(f"t.{quote(col)} = s.{quote(col)}" for col in key)
+    values = [col for col in columns if col not in key]
+    changed = ' OR '.join(f"NOT ({same(col)})" for col in values) or '0'
+
+    counts = connection.exec_driver_sql(
+        f"SELECT SUM(CASE WHEN t.{quote(key[0])} IS NULL THEN 1 ELSE 0 END), "
+        f"SUM(CASE WHEN t.{quote(key[0])} IS NOT NULL AND ({changed}) THEN 1 ELSE 0 END), "
+        f"COUNT(*) FROM {staging_name} s LEFT JOIN {table_name} t ON {join}"
+    ).fetchone()
+    inserted, updated, total = (int(value or 0) for value in counts)
+
+    # Seules les lignes nouvelles ou modifiées sont réécrites
+    quoted = ', '.join(quote(col) for col in columns)
+    select = f"SELECT {', '.join(f's.{quote(col)}' for col in columns)} FROM {staging_name} s " \
+             f"LEFT JOIN {table_name} t ON {join} " \
+             f"WHERE t.{quote(key[0])} IS NULL OR ({changed})"
+    if is_mysql:
+        assignments = ', '.join(f"{quote(col)} = new.{quote(col)}" for col in values)
+        connection.exec_driver_sql(f"INSERT INTO {table_name} ({quoted}) "
+                                   f"SELECT * FROM ({select}) AS new "
+                                   f"ON DUPLICATE KEY UPDATE {assignments}")
+    else:
+        assignments = ', '.join(f"{quote(col)} = excluded.{quote(col)}" for col in values)
+        connection.exec_driver_sql(f"INSERT INTO {table_name} ({quoted}) {select} "
+                                   f"ON CONFLICT ({', '.join(quote(col) for col in key)}) "
+                                   f"DO UPDATE SET {assignments}")
+    return inserted, updated, total - inserted - updated
+
+
+def save_to_existing_table(df, table_name='mobility_processed', engine=None, method='auto',
+                           chunk_size=DEFAULT_CHUNK_SIZE, mode='append', key=NATURAL_KEY,
+                           verbose=True, instrumentation=None):
+    """Insère dans la table existante avec mapping des colonnes
+
+    method : 'multi' (INSERT multi-lignes par lots de chunk_size), 'load_data'
+    (LOAD DATA LOCAL INFILE, MySQL uniquement), 'to_sql' (ancien chemin pandas)
+    ou 'auto' (load_data sur MySQL avec repli sur multi, multi ailleurs). Le
+    moteur est mutualisé entre les appels ; le nombre de lignes insérées vient
+    du résultat de l'insertion.
+
+    mode='upsert' rend le chargement idempotent sur la clé naturelle key
+    (route_id, timestamp) : les lignes passent par une table de staging
+    temporaire puis une fusion ensembliste (ON DUPLICATE KEY UPDATE sous MySQL,
+    ON CONFLICT sous SQLite) insère les nouvelles clés, met à jour les lignes
+    modifiées et ignore les lignes identiques. mode='append' (par défaut)
+    insère directement : une clé déjà présente lève une IntegrityError.
+    Retourne un rapport {'rows', 'inserted', 'updated', 'skipped', 'method', 'mode', 'elapsed_s'}.
+    instrumentation (StageRecorder) enregistre le chargement comme étape 'db_load'.
+    """
+    with stage_context(instrumentation, 'db_load', rows_in=len(df), mode=mode) as record:
+        report = _save_rows(df, table_name, engine, method, chunk_size, mode, key, verbose)
+        record['rows_out'] = report['rows']
+    return report
+
+
+def _save_rows(df, table_name, engine, method, chunk_size, mode, key, verbose):
+    """Corps de save_to_existing_table (migrations, insertion ou upsert, rapport)"""
+    engine = engine or get_engine()
+    df_to_insert = prepare_rows(df)
+
+    if verbose:
+        print("📋 Colonnes disponibles dans vos données:")
+        print(df.columns.tolist())
+
+    if method == 'auto':
+        method = 'load_data' if engine.dialect.name == 'mysql' else 'multi'
+    if method not in ('multi', 'load_data', 'to_sql'):
+        raise ValueError(f"Méthode de chargement inconnue : {method}")
+    if mode not in ('append', 'upsert'):
+        raise ValueError(f"Mode de chargement inconnu : {mode}")
+
+    start = time.perf_counter()
+    # Le schéma géré (index, partitions) est en place avant toute insertion
+    apply_migrations(engine, table_name, verbose=verbose)
+    ensure_month_partitions(engine, table_name, df_to_insert['timestamp'].max())
+
+    # Clé naturelle NOT NULL : une lecture sans route ni date est rejetée
+    missing_key = df_to_insert[list(key)].isna().any(axis=1)
+    skipped = int(missing_key.sum())
+    if skipped:
+        df_to_insert = df_to_insert[~missing_key]
+        if verbose:
+            print(f"⚠️  {skipped} lignes sans {' ni '.join(key)} ignorées")
+    updated = 0
+
+    if mode == 'upsert':
+        # Doublons de clé dans le lot : la dernière occurrence l'emporte
+        deduplicated = df_to_insert.drop_duplicates(subset=list(key), keep='last')
+        skipped += len(df_to_insert) - len(deduplicated)
+        staging_name = f"{table_name}_staging"
+        columns = ', '.join(engine.dialect.identifier_preparer.quote(col)
+                            for col in deduplicated.columns)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"DROP TEMPORARY TABLE IF EXISTS {staging_name}"
+                                       if engine.dialect.name == 'mysql'
+                                       else f"DROP TABLE IF EXISTS temp.{staging_name}")
+            # Staging typé comme la cible, visible de cette seule connexion
+            connection.exec_driver_sql(f"CREATE TEMPORARY TABLE {staging_name} AS "
+                                       f"SELECT {columns} FROM {table_name} LIMIT 0")
+            _, method = _bulk_insert(connection, staging_name, deduplicated,
+                                     'multi' if method == 'to_sql' else method, chunk_size, verbose)
+            inserted, updated, unchanged = _merge_staging(connection, table_name, staging_name,
+                                                          list(deduplicated.columns), key)
+            skipped += unchanged
+            connection.exec_driver_sql(f"DROP TABLE {staging_name}")
+    elif method == 'to_sql':
+        # Insérer avec append (ne pas remplacer la table)
+        inserted = df_to_insert.to_sql(table_name, engine, if_exists='append', index=False)
+    else:
+        with engine.begin() as connection:
+            inserted, method = _bulk_insert(connection, table_name, df_to_insert, method,
+                                            chunk_size, verbose)
+
+    elapsed_s = time.perf_counter() - start
+    if verbose:
+        if mode == 'upsert':
+            print(f"✅ {inserted} lignes insérées, {updated} mises à jour, {skipped} ignorées "
+                  f"en {elapsed_s:.2f}s ({method}, upsert)")
+        else:
+            print(f"✅ {inserted} lignes insérées en {elapsed_s:.2f}s ({method})")
+    return {'rows': inserted + updated, 'inserted': inserted, 'updated': updated,
+            'skipped': skipped, 'method': method, 'mode': mode, 'elapsed_s': elapsed_s}
+
+
+def benchmark_bulk_load(df, url='sqlite://', chunk_sizes=(100, 1000, 5000),
+                        table_name='mobility_processed_bench'):
+    """Compare to_sql et INSERT multi-lignes (lignes/s) sur une base locale, SQLite par défaut"""
+    engine = get_engine(url)
+    runs = [('to_sql', None)] + [('multi', size) for size in chunk_sizes]
+    if engine.dialect.name == 'mysql':
+        runs.append(('load_data', None))
+
+    results = []
+    for method, size in runs:
+        drop_table(engine, table_name)
+        report = save_to_existing_table(df, table_name, engine=engine, method=method,
+                                        chunk_size=size or DEFAULT_CHUNK_SIZE, verbose=False)
+        report['chunk_size'] = size
+        report['rows_per_s'] = report['rows'] / report['elapsed_s'] if report['elapsed_s'] else None
+        results.append(report)
+        print(f"⏱️  {method:<9} chunk={str(size):<5} {report['rows']} lignes "
+              f"en {report['elapsed_s']:.2f}s ({report['rows_per_s']:,.0f} lignes/s)")
+
+    drop_table(engine, table_name)
+    return pd.DataFrame(results)
+
 
 # Utilisation
-save_to_existing_table(processed_data)
\ No newline at end of file
+if __name__ == "__main__":
+    # Tester la connexion
+    engine, conn = connect_to_mysql()
+    if conn is not None:
+        conn.close()
+        processed_data = pd.read_csv("mobility_data_processed_winsorize.csv", parse_dates=['timestamp'])
+        save_to_existing_table(processed_data, engine=engine, mode='upsert')
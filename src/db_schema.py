@@ -0,0 +1,200 @@
+import pandas as pd
+from sqlalchemy import inspect
+from schema import sql_columns
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+# Colonnes de mobility_processed (hors id et created_at), issues du schéma commun
+COLUMNS = sql_columns()
+
+# Index secondaires : clé naturelle (unique, sert aussi aux filtres par route) et plages de dates
+INDEXES = {
+    'uq_{table}_route_id_timestamp': (('route_id', 'timestamp'), True),
+    'ix_{table}_timestamp': (('timestamp',), False)
+}
+
+PARTITION_MAX = 'pmax'
+
+# (url, table) déjà migrés dans ce processus
+_migrated = set()
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def create_table_ddl(engine, table_name='mobility_processed'):
+    """CREATE TABLE de la table gérée, adapté au dialecte (MySQL ou SQLite)"""
+    if engine.dialect.name == 'sqlite':
+        id_column = 'id INTEGER PRIMARY KEY AUTOINCREMENT'
+    else:
+        id_column = 'id INT AUTO_INCREMENT PRIMARY KEY'
+    columns = [id_column] + [f"{_quote(engine, name)} {sql_type}" for name, sql_type in COLUMNS]
+    columns.append('created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n    " + ',\n    '.join(columns) + '\n)'
+
+
+def _month_partitions(start, end):
+    """[(nom, borne exclusive)] des partitions mensuelles couvrant [start, end]"""
+    months = pd.period_range(pd.Timestamp(start).to_period('M'), pd.Timestamp(end).to_period('M'),
+                             freq='M')
+    return [(f"p{month.strftime('%Y%m')}", (month + 1).start_time.strftime('%Y-%m-%d'))
+            for month in months]
+
+
+def _partition_clause(partitions):
+    parts = [f"PARTITION {name} VALUES LESS THAN ('{bound}')" for name, bound in partitions]
+    parts.append(f"PARTITION {PARTITION_MAX} VALUES LESS THAN (MAXVALUE)")
+    return '(' + ', '.join(parts) + ')'
+
+
+def _existing_partitions(connection, table_name):
+    rows = connection.exec_driver_sql(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+        (table_name,)).fetchall()
+    return {row[0] for row in rows}
+
+
+# Migrations : (version, description, fonction(connection, table_name) -> note éventuelle)
+def _create_table(connection, table_name):
+    connection.exec_driver_sql(create_table_ddl(connection.engine, table_name))
+
+
+def _drop_duplicate_rows(connection, table_name, columns):
+    """Supprime les doublons de clé (hors clés NULL), en gardant la dernière ligne insérée"""
+    quoted = ', '.join(_quote(connection.engine, col) for col in columns)
+    not_null = ' AND '.join(f"{_quote(connection.engine, col)} IS NOT NULL" for col in columns)
+    # Table dérivée : MySQL refuse une sous-requête sur la table modifiée
+    result = connection.exec_driver_sql(
+        f"DELETE FROM {table_name} WHERE {not_null} AND id NOT IN ("
+        f"SELECT id FROM (SELECT MAX(id) AS id FROM {table_name} GROUP BY {quoted}) AS keep)")
+    return result.rowcount
+
+
+def _create_indexes(connection, table_name):
+    existing = {index['name'] for index in inspect(connection).get_indexes(table_name)}
+    removed = 0
+    for name, (columns, unique) in INDEXES.items():
+        name = name.format(table=table_name)
+        if name in existing:
+            continue
+        # Une table antérieure à la clé naturelle peut contenir des lectures en double
+        if unique:
+            removed += _drop_duplicate_rows(connection, table_name, columns)
+        quoted = ', '.join(_quote(connection.engine, col) for col in columns)
+        connection.exec_driver_sql(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} "
+                                   f"ON {table_name} ({quoted})")
+    if removed:
+        return f"{removed} lignes en double supprimées, dernière insertion conservée"
+
+
+def _partition_by_month(connection, table_name):
+    # SQLite n'a pas de partitionnement : les index suffisent à la base locale
+    if connection.dialect.name != 'mysql':
+        return
+    if _existing_partitions(connection, table_name):
+        return
+    bounds = connection.exec_driver_sql(
+        f"SELECT MIN(`timestamp`), MAX(`timestamp`) FROM {table_name}").fetchone()
+    start = bounds[0] or pd.Timestamp.now()
+    end = bounds[1] or start
+    # Toute clé unique doit contenir la colonne de partitionnement
+    connection.exec_driver_sql(f"ALTER TABLE {table_name} MODIFY `route_id` VARCHAR(10) NOT NULL, "
+                               f"MODIFY `timestamp` DATETIME NOT NULL, "
+                               f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, `timestamp`)")
+    connection.exec_driver_sql(f"ALTER TABLE {table_name} PARTITION BY RANGE COLUMNS(`timestamp`) "
+                               f"{_partition_clause(_month_partitions(start, end))}")
+
+
+MIGRATIONS = [
+    (1, 'création de la table', _create_table),
+    (2, 'index (route_id, timestamp) et (timestamp)', _create_indexes),
+    (3, 'partitionnement mensuel (MySQL)', _partition_by_month)
+]
+
+
+def schema_version(engine, table_name='mobility_processed'):
+    """Dernière version de migration appliquée à table_name (0 si aucune)"""
+    if not inspect(engine).has_table(MIGRATIONS_TABLE):
+        return 0
+    with engine.connect() as connection:
+        version = connection.exec_driver_sql(
+            f"SELECT MAX(version) FROM {MIGRATIONS_TABLE} WHERE table_name = "
+            f"{'%s' if engine.dialect.paramstyle in ('format', 'pyformat') else '?'}",
+            (table_name,)).scalar()
+    return version or 0
+
+
+def apply_migrations(engine, table_name='mobility_processed', verbose=False):
+    """Applique les migrations manquantes (table, index, partitions) ; retourne la version"""
+    key = (str(engine.url), table_name)
+    if key in _migrated:
+        return MIGRATIONS[-1][0]
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+                                   f"table_name VARCHAR(64) NOT NULL, version INT NOT NULL, "
+                                   f"applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+                                   f"PRIMARY KEY (table_name, version))")
+
+    current = schema_version(engine, table_name)
+    placeholder = '%s' if engine.dialect.paramstyle in ('format', 'pyformat') else '?'
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        # Une transaction par migration (le DDL MySQL valide implicitement)
+        with engine.begin() as connection:
+            note = migrate(connection, table_name)
+            connection.exec_driver_sql(f"INSERT INTO {MIGRATIONS_TABLE} (table_name, version) "
+                                       f"VALUES ({placeholder}, {placeholder})", (table_name, version))
+        if verbose:
+            print(f"🛠️ Migration {version} appliquée à {table_name} : {description}"
+                  + (f" ({note})" if note else ""))
+
+    _migrated.add(key)
+    return MIGRATIONS[-1][0]
+
+
+def ensure_month_partitions(engine, table_name, end):
+    """Ajoute les partitions mensuelles manquantes jusqu'à end (MySQL ; sans effet ailleurs)
+
+    Retourne les noms des partitions créées ([] si aucune ne manque).
+    """
+    if engine.dialect.name != 'mysql' or pd.isna(end):
+        return []
+    end = pd.Timestamp(end)
+    with engine.begin() as connection:
+        existing = _existing_partitions(connection, table_name)
+        if not existing:
+            return []
+        monthly = sorted(name for name in existing if name != PARTITION_MAX)
+        if monthly:
+            # Les partitions sont contiguës : seuls les mois après la dernière manquent
+            # (les mois antérieurs à la première partition y sont déjà rangés)
+            last = monthly[-1]
+            last_month = pd.Timestamp(f"{last[1:5]}-{last[5:7]}-01")
+            missing = [(name, bound) for name, bound in _month_partitions(last_month, max(end, last_month))
+                       if name > last]
+        else:
+            # Seule pmax existe : elle est découpée en mois depuis la plus ancienne lecture
+            first = connection.exec_driver_sql(f"SELECT MIN(`timestamp`) FROM {table_name}").scalar()
+            start = min(pd.Timestamp(first), end) if first is not None else end
+            missing = _month_partitions(start, end)
+        if not missing:
+            return []
+        # Les nouvelles partitions sont découpées dans pmax
+        connection.exec_driver_sql(f"ALTER TABLE {table_name} REORGANIZE PARTITION {PARTITION_MAX} "
+                                   f"INTO {_partition_clause(missing)}")
+    return [name for name, _ in missing]
+
+
+def drop_table(engine, table_name):
+    """Supprime une table gérée et son historique de migrations"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table_name}")
+        if inspect(connection).has_table(MIGRATIONS_TABLE):
+            placeholder = '%s' if engine.dialect.paramstyle in ('format', 'pyformat') else '?'
+            connection.exec_driver_sql(f"DELETE FROM {MIGRATIONS_TABLE} WHERE table_name = {placeholder}",
+                                       (table_name,))
+    _migrated.discard((str(engine.url), table_name))
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from column_stats import column_stats
+
+DIAGNOSTICS_MODES = ('off', 'sampled', 'full')
+DEFAULT_COLUMNS = ('speed_kmh', 'traffic_density', 'air_quality_index', 'speed_traffic_product')
+DEFAULT_SAMPLE_SIZE = 10_000
+DEFAULT_CONFIDENCE = 0.95
+N_EXAMPLES = 5
+
+
+def stratified_sample(df, sample_size=DEFAULT_SAMPLE_SIZE, strata='route_id', seed=0):
+    """Échantillon stratifié à allocation proportionnelle (au moins une ligne par strate)
+
+    Sans colonne strata, échantillon aléatoire simple. Retourne df entier si
+    sample_size >= len(df).
+    """
+    if sample_size >= len(df):
+        return df
+    rng = np.random.default_rng(seed)
+    if strata not in df.columns:
+        return df.iloc[np.sort(rng.choice(len(df), sample_size, replace=False))]
+
+    codes, _ = pd.factorize(df[strata], use_na_sentinel=False)
+    sizes = np.bincount(codes)
+    quotas = np.maximum(1, np.round(sizes * sample_size / len(df))).astype('int64')
+    # Ordre aléatoire à l'intérieur de chaque strate, puis les quota premières lignes
+    order = np.lexsort((rng.random(len(df)), codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(df)) - starts[codes[order]]
+    keep = order[rank < quotas[codes[order]]]
+    return df.iloc[np.sort(keep)]
+
+
+def _wilson_interval(successes, n, z):
+    """Intervalle de Wilson d'une proportion (en %)"""
+    if n == 0:
+        return (np.nan, np.nan)
+    p = successes / n
+    center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return (100 * max(0.0, center - half), 100 * min(1.0, center + half))
+
+
+def outlier_report(df, numerical_cols=DEFAULT_COLUMNS, n_rows=None, confidence=DEFAULT_CONFIDENCE):
+    """Statistiques et outliers IQR par colonne, une ligne par colonne
+
+    df peut être un échantillon de n_rows lignes : la part d'outliers et la
+    moyenne sont alors accompagnées d'intervalles de confiance au niveau
+    confidence (Wilson pour la part, loi normale pour la moyenne).
+    """
+    n_rows = len(df) if n_rows is None else n_rows
+    sampled = len(df) < n_rows
+    z = stats.norm.ppf(0.5 + confidence / 2)
+    columns = [col for col in numerical_cols if col in df.columns]
+    # Toutes les statistiques en un passage vectorisé (cache partagé)
+    col_stats = column_stats(df, columns)
+
+    rows = []
+    for col in columns:
+        col_summary = col_stats[col]
+        quantiles = col_summary['quantiles']
+        q1, q3 = quantiles[0.25], quantiles[0.75]
+        iqr = q3 - q1
+        lower_bound, upper_bound = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+        values = df[col]
+        outliers = values[(values < lower_bound) | (values > upper_bound)]
+        row = {
+            'column': col,
+            'Moyenne': col_summary['mean'],
+            'Médiane': quantiles[0.5],
+            'Std': col_summary['std'],
+            'Min': col_summary['min'],
+            'Max': col_summary['max'],
+            'Q1': q1,
+            'Q3': q3,
+            'IQR': iqr,
+            'Skewness': col_summary['skew'],
+            'Kurtosis': col_summary['kurtosis'],
+            'lower_bound': lower_bound,
+            'upper_bound': upper_bound,
+            'outliers': len(outliers),
+            'outlier_pct': len(outliers) / len(df) * 100 if len(df) else np.nan,
+            'examples': outliers.head(N_EXAMPLES).to_numpy(),
+            'rows_analyzed': len(df),
+            'n_rows': n_rows
+        }
+        if sampled:
+            count = col_summary['count']
+            half = z * col_summary['std'] / np.sqrt(count) if count > 1 else np.nan
+            row['mean_ci'] = (col_summary['mean'] - half, col_summary['mean'] + half)
+            row['outlier_pct_ci'] = _wilson_interval(len(outliers), len(df), z)
+            # Effectif estimé sur la population complète
+            row['outliers'] = round(row['outlier_pct'] / 100 * n_rows)
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('column')
+
+
+def print_outlier_report(report, title="ANALYSE DÉTAILLÉE DES VALEURS ABERRANTES"):
+    """Affiche un rapport outlier_report (format historique de detailed_outlier_analysis)"""
+    print(f"\n📊 {title}")
+    print("=" * 60)
+    if len(report) == 0:
+        return
+    sampled = 'mean_ci' in report.columns
+    if sampled:
+        first = report.iloc[0]
+        print(f"🎲 Échantillon stratifié : {first['rows_analyzed']} lignes sur {first['n_rows']}")
+
+    stat_names = ['Moyenne', 'Médiane', 'Std', 'Min', 'Max', 'Q1', 'Q3', 'IQR',
+                  'Skewness', 'Kurtosis']
+    for col, row in report.iterrows():
+        print(f"\n📈 {col}:")
+        for key in stat_names:
+            print(f"  {key}: {row[key]:.4f}")
+        if sampled:
+            low, high = row['mean_ci']
+            print(f"  IC moyenne: [{low:.4f}, {high:.4f}]")
+
+        line = f"  Outliers (IQR): {row['outliers']} ({row['outlier_pct']:.2f}%)"
+        if sampled:
+            low, high = row['outlier_pct_ci']
+            line = (f"  Outliers (IQR, estimés): ~{row['outliers']} ({row['outlier_pct']:.2f}%, "
+                    f"IC [{low:.2f}%, {high:.2f}%])")
+        print(line)
+        print(f"  Plage normale: [{row['lower_bound']:.4f}, {row['upper_bound']:.4f}]")
+
+        # Visualisation textuelle
+        if len(row['examples']) > 0:
+            print(f"  Exemples d'outliers: {row['examples']}")
+
+
+class OutlierDiagnostics:
+    """Rapports d'outliers du pipeline, calculés seulement quand on les demande
+
+    mode : 'off' (aucun travail), 'sampled' (échantillon stratifié de
+    sample_size lignes par strata, avec intervalles de confiance) ou 'full'
+    (toutes les lignes). capture() ne garde qu'une sélection des colonnes
+    analysées, sans copie avec le copy-on-write de pandas 3 (copie sous
+    pandas 2) ; échantillonnage et statistiques n'ont lieu qu'au premier
+    report(), dont le résultat est gardé.
+    """
+
+    def __init__(self, mode='full', sample_size=DEFAULT_SAMPLE_SIZE, strata='route_id',
+                 confidence=DEFAULT_CONFIDENCE, numerical_cols=DEFAULT_COLUMNS, seed=0):
+        if mode not in DIAGNOSTICS_MODES:
+            raise ValueError(f"Mode de diagnostic inconnu : {mode} (attendu : {DIAGNOSTICS_MODES})")
+        self.mode = mode
+        self.sample_size = sample_size
+        self.strata = strata
+        self.confidence = confidence
+        self.numerical_cols = numerical_cols
+        self.seed = seed
+        self._snapshots = {}
+        self._reports = {}
+
+    def capture(self, name, df):
+        """Mémorise l'état de df sous le nom name ('before', 'after'...) sans rien calculer"""
+        if self.mode == 'off':
+            return
+        columns = [col for col in self.numerical_cols if col in df.columns]
+        if self.mode == 'sampled' and self.strata in df.columns:
+            columns.append(self.strata)
+        self._snapshots[name] = df[columns]
+        self._reports.pop(name, None)
+
+    def names(self):
+        """Noms des instantanés disponibles"""
+        return list(self._snapshots)
+
+    def report(self, name='after'):
+        """Rapport outlier_report de l'instantané name (calculé au premier appel)"""
+        if self.mode == 'off':
+            raise RuntimeError("Diagnostics désactivés (mode='off')")
+        if name not in self._reports:
+            frame = self._snapshots[name]
+            if self.mode == 'sampled':
+                frame = stratified_sample(frame, self.sample_size, self.strata, self.seed)
+            self._reports[name] = outlier_report(frame, self.numerical_cols,
+                                                 n_rows=len(self._snapshots[name]),
+                                                 confidence=self.confidence)
+        return self._reports[name]
+
+    def show(self, name='after', title="ANALYSE DÉTAILLÉE DES VALEURS ABERRANTES"):
+        """Affiche le rapport de l'instantané name"""
+        if self.mode != 'off':
+            print_outlier_report(self.report(name), title)
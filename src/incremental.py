@@ -0,0 +1,199 @@
+import os
+import io
+import json
+import time
+import pandas as pd
+from ingestion_cache import file_content_hash
+from schema import enforce_schema, encode_flags
+from quantile_sketch import DEFAULT_K
+from pipeline import (load_data, validate_data_types, add_time_features, clean_data,
+                      transform_data, create_features, new_stats_accumulator,
+                      accumulate_stats, finalize_stats, stats_accumulator_to_dict,
+                      stats_accumulator_from_dict)
+
+STATE_FILENAME = '.pipeline_state.json'
+STATE_VERSION = 1
+# Octets conservés avant l'offset CSV pour vérifier que le fichier n'a été que complété
+TAIL_BYTES = 64
+
+
+def default_state_path(file_path):
+    """Fichier d'état par défaut, à côté du fichier source"""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), STATE_FILENAME)
+
+
+def load_state(state_path):
+    """Charge l'état incrémental (watermarks et statistiques cumulées par source)"""
+    if not os.path.exists(state_path):
+        return {'version': STATE_VERSION, 'sources': {}}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"Version d'état incompatible : {state.get('version')}")
+    return state
+
+
+def save_state(state, state_path):
+    """Écrit l'état de façon atomique"""
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _read_csv_delta(file_path, entry):
+    """Lit uniquement les lignes ajoutées au CSV depuis l'offset mémorisé
+
+    Retourne (df, nouvel offset, octets de fin, append_only). Si le fichier a
+    été réécrit (taille réduite ou octets de fin différents), il est relu en
+    entier et append_only vaut False.
+    """
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        offset = entry.get('byte_offset') if entry else None
+        append_only = False
+
+        if offset and os.path.getsize(file_path) >= offset:
+            tail = bytes.fromhex(entry.get('tail', ''))
+            f.seek(offset - len(tail))
+            append_only = f.read(len(tail)) == tail
+        if not append_only:
+            offset = len(header)
+
+        f.seek(offset)
+        data = f.read()
+
+    # Une dernière ligne incomplète (fichier en cours d'écriture) attendra le prochain run
+    complete = data[:data.rfind(b'\n') + 1]
+    new_offset = offset + len(complete)
+    new_tail = (header + complete)[-TAIL_BYTES:] if offset == len(header) \
+        else (bytes.fromhex(entry.get('tail', '')) + complete)[-TAIL_BYTES:]
+
+    if complete:
+        df = pd.read_csv(io.BytesIO(header + complete))
+    else:
+        df = pd.read_csv(io.BytesIO(header))
+    return df, new_offset, new_tail.hex(), append_only
+
+
+def run_incremental_pipeline(file_path, state_path=None, outlier_method='winsorize',
+                             output_path=None, use_cache=True, cache_dir=None, sketch_k=DEFAULT_K,
+                             spatial_index=None, rollup_store=None, verbose=True):
+    """Ne traite que les lectures postérieures au watermark mémorisé pour cette source
+
+    L'état (JSON) garde par source : watermark (timestamp max traité), empreinte
+    ou offset du fichier, et statistiques cumulées (sketches KLL, effectifs)
+    d'où sont tirées médianes d'imputation et bornes d'outliers. Le coût d'un
+    run suit la taille du delta : pour un CSV complété en fin de fichier, seuls
+    les octets ajoutés sont lus ; pour un classeur Excel inchangé, seule son
+    empreinte est recalculée.
+
+    Retourne (delta traité, rapport). Le delta (à ajouter au CSV output_path s'il
+    est fourni) est ce que save_to_existing_table doit charger. Les lignes
+    ajoutées en fin de CSV sont toutes nouvelles (l'offset suffit, lectures en
+    retard comprises) ; le watermark ne filtre que les relectures complètes
+    (fichier réécrit, classeur Excel modifié), où les lignes sans timestamp ne
+    passent qu'au premier run. Un spatial_index (SpatialIndex) et un
+    rollup_store (RollupStore) reçoivent le delta de chaque run ; verbose=False
+    supprime tous les affichages.
+    """
+    start = time.perf_counter()
+    state_path = state_path or default_state_path(file_path)
+    state = load_state(state_path)
+    source = os.path.abspath(file_path)
+    entry = state['sources'].get(source, {})
+    watermark = pd.Timestamp(entry['watermark']) if entry.get('watermark') else None
+
+    if verbose:
+        print("🚀 PIPELINE INCRÉMENTAL")
+        print("=" * 70)
+        print(f"📌 Watermark actuel: {watermark if watermark is not None else 'aucun (premier run)'}")
+
+    # Étape 1: lecture du delta
+    new_entry = dict(entry)
+    append_only = False
+    if os.path.splitext(file_path)[1].lower() == '.csv':
+        df, byte_offset, tail, append_only = _read_csv_delta(file_path, entry)
+        new_entry.update({'byte_offset': byte_offset, 'tail': tail})
+        if entry and not append_only and verbose:
+            print("⚠️  Fichier réécrit depuis le dernier run : relecture complète filtrée par watermark")
+    else:
+        sha256 = file_content_hash(file_path)
+        if entry.get('sha256') == sha256:
+            if verbose:
+                print("✅ Source inchangée depuis le dernier run : rien à traiter")
+            return pd.DataFrame(), {'status': 'unchanged', 'rows': 0, 'watermark': entry.get('watermark'),
+                                    'elapsed_s': time.perf_counter() - start}
+        df = load_data(file_path, use_cache=use_cache, cache_dir=cache_dir, verbose=verbose)
+        new_entry['sha256'] = sha256
+
+    df = validate_data_types(df, verbose=False)
+    # L'offset d'un CSV complété désigne déjà les lignes nouvelles : filtrer par
+    # watermark y perdrait les lectures en retard et les autres routes au même
+    # timestamp. Seule une relecture complète est filtrée.
+    if watermark is not None and not append_only:
+        df = df[df['timestamp'] > watermark]
+
+    rows_read = len(df)
+    if verbose:
+        print(f"📊 {rows_read} nouvelles lectures à traiter")
+
+    # Étape 2: statistiques cumulées (historique + delta)
+    if entry.get('stats'):
+        acc = stats_accumulator_from_dict(entry['stats'])
+    else:
+        acc = new_stats_accumulator('sketch', sketch_k)
+
+    if rows_read > 0:
+        accumulate_stats(acc, add_time_features(df.copy()))
+    global_stats = finalize_stats(acc, outlier_method=outlier_method)
+
+    # Classes météo stables d'un run à l'autre : les nouvelles sont ajoutées en fin
+    weather_classes = list(entry.get('weather_classes', []))
+    for weather in global_stats['weather_classes'] or []:
+        if weather not in weather_classes:
+            weather_classes.append(weather)
+
+    # Étape 3: nettoyage, transformation et features du delta seul
+    if rows_read > 0:
+        df = clean_data(df, outlier_method=outlier_method,
+                        fill_values=global_stats['fill_values'],
+                        outlier_bounds=global_stats['outlier_bounds'],
+                        outlier_cols=global_stats['outlier_cols'], verbose=False)
+        df = transform_data(df, weather_classes=weather_classes, inplace=True)
+        df = create_features(df, inplace=True)
+        # Mêmes types que run_full_pipeline (drapeaux bool, écrits 0/1 dans le CSV)
+        enforce_schema(df)
+
+        if output_path is not None:
+            encode_flags(df).to_csv(output_path, mode='a', header=not os.path.exists(output_path), index=False)
+        if spatial_index is not None:
+            spatial_index.add(df)
+        if rollup_store is not None:
+            # Le delta ne contient que des lectures nouvelles : les retardataires sont fusionnés
+            rollup_store.update(df, late='merge')
+
+        max_timestamp = df['timestamp'].max()
+        if pd.notna(max_timestamp) and (watermark is None or max_timestamp > watermark):
+            watermark = max_timestamp
+
+    # Étape 4: persistance de l'état
+    new_entry.update({
+        'watermark': watermark.isoformat() if watermark is not None else None,
+        'rows_processed': entry.get('rows_processed', 0) + len(df),
+        'stats': stats_accumulator_to_dict(acc),
+        'weather_classes': weather_classes
+    })
+    state['sources'][source] = new_entry
+    save_state(state, state_path)
+
+    elapsed_s = time.perf_counter() - start
+    if verbose:
+        print(f"✅ {len(df)} lignes traitées en {elapsed_s:.2f}s, nouveau watermark: {new_entry['watermark']}")
+
+    return df, {
+        'status': 'processed' if rows_read else 'empty',
+        'rows': len(df),
+        'watermark': new_entry['watermark'],
+        'elapsed_s': elapsed_s
+    }
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow est optionnel : sans lui, on relit l'Excel à chaque fois
+    pa = None
+    feather = None
+
+CACHE_DIRNAME = '.ingestion_cache'
+MANIFEST_NAME = 'manifest.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def default_cache_dir(file_path):
+    """Dossier de cache par défaut, à côté du fichier source"""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRNAME)
+
+
+def file_content_hash(file_path):
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _lookup(file_path, cache_dir, manifest):
+    """Retourne (sha256, chemin du cache valide ou None)"""
+    source = os.path.abspath(file_path)
+    stat = os.stat(source)
+    entry = manifest.get(source)
+
+    # mtime et taille inchangés : on évite de relire tout le fichier
+    if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        cache_file = os.path.join(cache_dir, entry['cache_file'])
+        if os.path.exists(cache_file):
+            return entry['sha256'], cache_file
+
+    # Fichier touché : le contenu fait foi
+    sha256 = file_content_hash(source)
+    cache_file = os.path.join(cache_dir, f"{sha256[:32]}.feather")
+    if os.path.exists(cache_file):
+        manifest[source] = {
+            'sha256': sha256,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'cache_file': os.path.basename(cache_file)
+        }
+        _write_manifest(cache_dir, manifest)
+        return sha256, cache_file
+    return sha256, None
+
+
+def load_excel_cached(file_path, cache_dir=None, read_func=None):
+    """Charge un classeur Excel via un cache columnaire Feather (Arrow IPC)
+
+    Le premier chargement parse l'Excel puis écrit une copie typée non
+    compressée ; les chargements suivants la lisent en memory-map. La clé
+    est l'empreinte du contenu, vérifiée dès que mtime ou taille changent.
+    Retourne (df, rapport) où rapport contient le statut hit/miss et les durées.
+    """
+    if read_func is None:
+        read_func = pd.read_excel
+
+    start = time.perf_counter()
+    if feather is None:
+        df = read_func(file_path)
+        return df, {'status': 'disabled', 'parse_s': time.perf_counter() - start}
+
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+
+    sha256, cache_file = _lookup(file_path, cache_dir, manifest)
+    lookup_s = time.perf_counter() - start
+
+    if cache_file is not None:
+        read_start = time.perf_counter()
+        table = feather.read_table(cache_file, memory_map=True)
+        df = table.to_pandas()
+        return df, {
+            'status': 'hit',
+            'sha256': sha256,
+            'cache_file': cache_file,
+            'lookup_s': lookup_s,
+            'read_s': time.perf_counter() - read_start
+        }
+
+    parse_start = time.perf_counter()
+    df = read_func(file_path)
+    parse_s = time.perf_counter() - parse_start
+
+    write_start = time.perf_counter()
+    cache_file = os.path.join(cache_dir, f"{sha256[:32]}.feather")
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_file = cache_file + '.tmp'
+        feather.write_feather(table, tmp_file, compression='uncompressed')
+        os.replace(tmp_file, cache_file)
+    except (pa.ArrowException, OSError) as e:
+        # Colonnes hétérogènes non typables : on garde le DataFrame sans cache
+        return df, {'status': 'error', 'sha256': sha256, 'error': str(e),
+                    'lookup_s': lookup_s, 'parse_s': parse_s}
+
+    # Une seule entrée par fichier source : l'ancien cache devient obsolète
+    source = os.path.abspath(file_path)
+    previous = manifest.get(source)
+    if previous and previous['cache_file'] != os.path.basename(cache_file):
+        still_used = any(e['cache_file'] == previous['cache_file']
+                         for key, e in manifest.items() if key != source)
+        old_file = os.path.join(cache_dir, previous['cache_file'])
+        if not still_used and os.path.exists(old_file):
+            os.remove(old_file)
+
+    stat = os.stat(source)
+    manifest[source] = {
+        'sha256': sha256,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'cache_file': os.path.basename(cache_file)
+    }
+    _write_manifest(cache_dir, manifest)
+
+    return df, {
+        'status': 'miss',
+        'sha256': sha256,
+        'cache_file': cache_file,
+        'lookup_s': lookup_s,
+        'parse_s': parse_s,
+        'write_s': time.perf_counter() - write_start
+    }
+
+
+def find_cached_table(file_path, cache_dir=None):
+    """Retourne le chemin du cache Feather valide pour file_path, sinon None"""
+    if feather is None:
+        return None
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    if not os.path.isdir(cache_dir):
+        return None
+    _, cache_file = _lookup(file_path, cache_dir, _read_manifest(cache_dir))
+    return cache_file
+
+
+def clear_cache(cache_dir):
+    """Supprime tous les fichiers du cache d'ingestion"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith('.feather') or name == MANIFEST_NAME:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
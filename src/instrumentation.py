@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import logging
+import contextlib
+import functools
+import tracemalloc
+from datetime import datetime
+import pandas as pd
+
+try:
+    import resource  # indisponible sous Windows : pic RSS non rapporté
+except ImportError:
+    resource = None
+
+
+def max_rss_mb():
+    """Pic RSS du processus depuis son démarrage (Mo), ou None sans le module resource
+
+    Ce pic ne redescend jamais : il ne mesure pas une étape, mais tout ce qui
+    l'a précédée dans le processus.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return max_rss / 2**20 if sys.platform == 'darwin' else max_rss / 2**10
+
+
+def current_rss_mb():
+    """RSS courant du processus (Mo), lu dans /proc/self/statm, ou None hors Linux"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def _frame_rows(value):
+    """Nombre de lignes d'un résultat d'étape (DataFrame, tuple (df, ...)), sinon None"""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+class StageRecorder:
+    """Mesures structurées par étape : durée, temps CPU, lignes en entrée/sortie, mémoire
+
+    Chaque étape exécutée dans stage() produit un enregistrement (dict) conservé
+    dans records et transmis aux callbacks (log structuré, JSON lines,
+    métriques...). rss_delta_mb est la variation du RSS courant pendant l'étape ;
+    process_peak_rss_mb est le pic RSS du processus à la fin de l'étape (cumulé
+    depuis son démarrage, pas propre à l'étape). Avec trace_memory, tracemalloc
+    donne le pic alloué pendant l'étape (plus précis mais ralentit pandas).
+    """
+
+    def __init__(self, callbacks=None, trace_memory=False, run_id=None):
+        self.callbacks = list(callbacks or [])
+        self.trace_memory = trace_memory
+        self.run_id = run_id or datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None, **tags):
+        """Mesure le bloc ; l'appelant peut renseigner record['rows_out'] (et d'autres champs)"""
+        record = {'run_id': self.run_id, 'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        record.update(tags)
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            traced_before, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = 'ok'
+        try:
+            yield record
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+            rss_after = current_rss_mb()
+            record['rss_delta_mb'] = (None if rss_before is None or rss_after is None
+                                      else rss_after - rss_before)
+            record['process_peak_rss_mb'] = max_rss_mb()
+            if self.trace_memory:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                record['traced_peak_mb'] = (traced_peak - traced_before) / 2**20
+                if started_tracing:
+                    tracemalloc.stop()
+            record['status'] = status
+            record['finished_at'] = datetime.now().isoformat(timespec='milliseconds')
+            self.records.append(record)
+            for callback in self.callbacks:
+                callback(record)
+
+    def wrap(self, name=None):
+        """Décorateur : instrumente chaque appel de la fonction (lignes déduites des DataFrames)"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rows_in = _frame_rows(args[0]) if args else None
+                with self.stage(name or func.__name__, rows_in=rows_in) as record:
+                    result = func(*args, **kwargs)
+                    record['rows_out'] = _frame_rows(result)
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Mesures cumulées par étape (plusieurs enregistrements en mode par lots)"""
+        if not self.records:
+            return pd.DataFrame()
+        frame = pd.DataFrame(self.records)
+        # Valeurs non renseignées (None) : total vide plutôt que 0
+        total = functools.partial(pd.Series.sum, min_count=1)
+        aggregations = {'calls': ('stage', 'size'), 'wall_s': ('wall_s', 'sum'),
+                        'cpu_s': ('cpu_s', 'sum'), 'rows_in': ('rows_in', total),
+                        'rows_out': ('rows_out', total), 'rss_delta_mb': ('rss_delta_mb', total),
+                        'process_peak_rss_mb': ('process_peak_rss_mb', 'max')}
+        if 'traced_peak_mb' in frame:
+            aggregations['traced_peak_mb'] = ('traced_peak_mb', 'max')
+        return frame.groupby('stage', sort=False).agg(**aggregations)
+
+    def to_json(self, path):
+        """Écrit tous les enregistrements dans un fichier JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=2, default=str)
+
+
+def jsonl_sink(path):
+    """Callback qui ajoute chaque enregistrement au fichier JSON lines path"""
+    def write(record):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+    return write
+
+
+def logging_sink(logger=None, level=logging.INFO):
+    """Callback qui émet chaque enregistrement sur un logger (champs dans extra['stage_metrics'])"""
+    logger = logger or logging.getLogger('mobility.pipeline')
+
+    def log(record):
+        logger.log(level, "stage=%s wall_s=%.4f cpu_s=%.4f rows_in=%s rows_out=%s",
+                   record['stage'], record['wall_s'], record['cpu_s'], record['rows_in'],
+                   record['rows_out'], extra={'stage_metrics': record})
+    return log
+
+
+def stage_context(recorder, name, rows_in=None, **tags):
+    """recorder.stage(...) si un recorder est fourni, sinon un contexte sans mesure"""
+    if recorder is None:
+        return contextlib.nullcontext({})
+    return recorder.stage(name, rows_in=rows_in, **tags)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+STATUS_CRITICAL = 'Dense/Lent'
+STATUS_NORMAL = 'Normal'
+# Cellule de base (~50 m) et taille visée d'une cellule à l'écran
+BASE_CELL_DEG = 0.0005
+CELL_PIXELS = 24
+MAX_CELLS = 2000
+DEFAULT_DIMENSIONS = ('hour', 'day_of_week', 'weather')
+# Seuils du statut critique, à l'échelle du pipeline (traffic_density entre 0 et 1)
+DENSITY_THRESHOLD = 0.7
+SPEED_THRESHOLD = 20
+
+
+def flag_status(df, density_threshold=DENSITY_THRESHOLD, speed_threshold=SPEED_THRESHOLD):
+    """Statut 'Dense/Lent' ou 'Normal' de chaque point, calculé en vectorisé"""
+    critical = (df['traffic_density'] > density_threshold) & (df['speed_kmh'] < speed_threshold)
+    return pd.Series(np.where(critical, STATUS_CRITICAL, STATUS_NORMAL), index=df.index)
+
+
+def cell_size_for_zoom(zoom, cell_pixels=CELL_PIXELS):
+    """Côté de cellule (degrés) couvrant cell_pixels pixels au niveau de zoom donné"""
+    return 360 / (256 * 2 ** zoom) * cell_pixels
+
+
+def precompute_cells(df, base_cell_deg=BASE_CELL_DEG, dimensions=DEFAULT_DIMENSIONS, **status_kwargs):
+    """Agrège les points en cellules de base par dimension de filtre (sommes et effectifs)
+
+    Le résultat est borné par le nombre de cellules occupées × modalités des
+    filtres, pas par le nombre de points : il sert ensuite à toutes les vues
+    de la carte via filter_cells et aggregate_cells.
+    """
+    dimensions = [dim for dim in dimensions if dim in df.columns]
+    points = df[['latitude', 'longitude', 'traffic_density', 'air_quality_index'] + dimensions]
+    points = points.dropna(subset=['latitude', 'longitude', 'traffic_density', 'air_quality_index'])
+    grouped = pd.DataFrame({
+        'lat_idx': np.floor(points['latitude'].to_numpy() / base_cell_deg).astype('int64'),
+        'lon_idx': np.floor(points['longitude'].to_numpy() / base_cell_deg).astype('int64'),
+        'count': 1,
+        'lat_sum': points['latitude'].to_numpy(),
+        'lon_sum': points['longitude'].to_numpy(),
+        'traffic_sum': points['traffic_density'].to_numpy(),
+        'aqi_sum': points['air_quality_index'].to_numpy(),
+        'critical': (flag_status(df.loc[points.index], **status_kwargs) == STATUS_CRITICAL).to_numpy()
+    })
+    for dim in dimensions:
+        grouped[dim] = points[dim].to_numpy()
+
+    cells = grouped.groupby(['lat_idx', 'lon_idx'] + dimensions, sort=False, observed=True).sum()
+    return cells.reset_index()
+
+
+def filter_cells(cells, filters=None):
+    """Cellules correspondant aux filtres ({dim: liste de valeurs ou (min, max)})"""
+    mask = np.ones(len(cells), dtype=bool)
+    for dim, wanted in (filters or {}).items():
+        if dim not in cells.columns or wanted is None:
+            continue
+        if isinstance(wanted, tuple) and len(wanted) == 2:
+            mask &= cells[dim].between(*wanted).to_numpy()
+        else:
+            mask &= cells[dim].isin(list(wanted)).to_numpy()
+    return cells[mask]
+
+
+def aggregate_cells(cells, zoom=13, base_cell_deg=BASE_CELL_DEG, max_cells=MAX_CELLS):
+    """Regroupe les cellules de base à la résolution du zoom (au plus max_cells cellules)
+
+    Retourne un point par cellule : centroïde, effectif, moyennes de densité et
+    d'AQI, part de points critiques et statut majoritaire.
+    """
+    factor = max(1, int(round(cell_size_for_zoom(zoom) / base_cell_deg)))
+    while True:
+        keys = [cells['lat_idx'].to_numpy() // factor, cells['lon_idx'].to_numpy() // factor]
+        sums = cells[['count', 'lat_sum', 'lon_sum', 'traffic_sum', 'aqi_sum', 'critical']] \
+            .groupby(keys, sort=False).sum()
+        # Trop de cellules pour ce zoom : on double leur côté
+        if len(sums) <= max_cells:
+            break
+        factor *= 2
+
+    count = sums['count'].to_numpy()
+    critical_share = sums['critical'].to_numpy() / count
+    return pd.DataFrame({
+        'latitude': sums['lat_sum'].to_numpy() / count,
+        'longitude': sums['lon_sum'].to_numpy() / count,
+        'count': count,
+        'traffic_density': sums['traffic_sum'].to_numpy() / count,
+        'air_quality_index': sums['aqi_sum'].to_numpy() / count,
+        'critical_share': critical_share,
+        'status': np.where(critical_share >= 0.5, STATUS_CRITICAL, STATUS_NORMAL),
+        'cell_deg': factor * base_cell_deg
+    })
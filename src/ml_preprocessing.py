@@ -0,0 +1,259 @@
+import json
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler, RobustScaler, OneHotEncoder, OrdinalEncoder
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+
+NUMERIC_FEATURES = ['speed_kmh', 'traffic_density', 'air_quality_index',
+                    'latitude', 'longitude', 'hour', 'speed_traffic_product']
+CATEGORICAL_FEATURES = ['weather', 'aqi_category', 'speed_category',
+                        'traffic_category', 'time_of_day']
+ENCODINGS = ('onehot', 'ordinal')
+ARTIFACT_VERSION = 1
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+# Durée minimale de mesure par taille de lot (petits lots répétés)
+DEFAULT_MIN_SECONDS = 0.2
+
+
+def create_ml_pipeline(outlier_robust=True, encoding='onehot', sparse_output=True):
+    """Crée un pipeline ML robuste aux outliers (non entraîné)
+
+    encoding : 'onehot' (une colonne par modalité, matrice creuse CSR si
+    sparse_output) ou 'ordinal' (un code par variable, -1 pour une modalité
+    inconnue). Les deux tournent dans un Pipeline, contrairement à LabelEncoder.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Encodage inconnu : {encoding} (attendu : {ENCODINGS})")
+
+    # Utilisation de RobustScaler pour les outliers
+    if outlier_robust:
+        numeric_transformer = Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='median')),  # Median plus robuste
+            ('scaler', RobustScaler())  # Meilleur pour les outliers que StandardScaler
+        ])
+    else:
+        numeric_transformer = Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='median')),
+            ('scaler', StandardScaler())
+        ])
+
+    if encoding == 'onehot':
+        encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=sparse_output)
+    else:
+        encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('encoder', encoder)
+    ])
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, NUMERIC_FEATURES),
+            ('cat', categorical_transformer, CATEGORICAL_FEATURES)
+        ],
+        # One-hot creux : sortie CSR quelle que soit la densité
+        sparse_threshold=1.0 if encoding == 'onehot' and sparse_output else 0.0)
+
+    return preprocessor
+
+
+class FittedPreprocessor:
+    """Préprocesseur entraîné, sérialisable en JSON, avec un transform par lots vectorisé
+
+    Ne garde que les paramètres appris par create_ml_pipeline (valeurs
+    d'imputation, centre et échelle, modalités) : le fichier pèse quelques Ko
+    et se relit sans sklearn. transform() applique les mêmes calculs en numpy
+    (résultat identique à celui du ColumnTransformer, en float32), sans le coût
+    fixe de sklearn par appel. transformer est le ColumnTransformer entraîné
+    (None après load()).
+    """
+
+    def __init__(self, params, transformer=None):
+        self.params = params
+        self.transformer = transformer
+        self.numeric_features = params['numeric_features']
+        self.categorical_features = params['categorical_features']
+        self._numeric_fill = np.asarray(params['numeric_fill'], dtype='float64')
+        self._center = np.asarray(params['center'], dtype='float64')
+        self._scale = np.asarray(params['scale'], dtype='float64')
+        self._categories = [pd.Index(categories) for categories in params['categories']]
+        self._offsets = np.cumsum([0] + [len(c) for c in self._categories[:-1]])
+        self._lookups = {}
+
+    @classmethod
+    def fit(cls, df, outlier_robust=True, encoding='onehot', sparse_output=True):
+        """Entraîne create_ml_pipeline sur df et en extrait les paramètres"""
+        transformer = create_ml_pipeline(outlier_robust, encoding, sparse_output)
+        # Catégories pandas -> objets : les imputeurs sklearn n'acceptent pas Categorical
+        frame = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES].astype(
+            {col: object for col in CATEGORICAL_FEATURES})
+        transformer.fit(frame)
+
+        numeric = transformer.named_transformers_['num']
+        scaler = numeric.named_steps['scaler']
+        categorical = transformer.named_transformers_['cat']
+        params = {
+            'version': ARTIFACT_VERSION,
+            'encoding': encoding,
+            'sparse_output': sparse_output,
+            'outlier_robust': outlier_robust,
+            'numeric_features': list(NUMERIC_FEATURES),
+            'categorical_features': list(CATEGORICAL_FEATURES),
+            'numeric_fill': numeric.named_steps['imputer'].statistics_.tolist(),
+            'center': (scaler.center_ if outlier_robust else scaler.mean_).tolist(),
+            'scale': scaler.scale_.tolist(),
+            'categorical_fill': [str(v) for v in categorical.named_steps['imputer'].statistics_],
+            'categories': [[str(v) for v in c] for c in categorical.named_steps['encoder'].categories_],
+            'fitted_rows': len(df),
+            'fitted_at': datetime.now().isoformat(timespec='seconds'),
+            'sklearn_version': sklearn.__version__
+        }
+        return cls(params, transformer)
+
+    @property
+    def feature_names(self):
+        """Noms des colonnes de sortie (numériques puis catégorielles)"""
+        if self.params['encoding'] == 'ordinal':
+            return self.numeric_features + self.categorical_features
+        return self.numeric_features + [f"{col}_{value}"
+                                        for col, categories in zip(self.categorical_features,
+                                                                   self._categories)
+                                        for value in categories]
+
+    def _codes(self, df):
+        """Code de modalité par variable catégorielle (n, k), -1 si inconnue"""
+        codes = np.empty((len(df), len(self.categorical_features)), dtype='int64')
+        for j, (col, categories, fill) in enumerate(zip(self.categorical_features,
+                                                        self._categories,
+                                                        self.params['categorical_fill'])):
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Catégorie pandas (schéma) : table de correspondance sur les seules
+                # modalités, mémorisée par type ; le code -1 (manquant) pointe en
+                # fin de table sur fill
+                lookup = self._lookups.get((j, values.dtype))
+                if lookup is None:
+                    lookup = categories.get_indexer(
+                        values.dtype.categories.append(pd.Index([fill])))
+                    self._lookups[(j, values.dtype)] = lookup
+                codes[:, j] = lookup[values.array.codes]
+            else:
+                values = values.to_numpy(dtype=object)
+                missing = pd.isna(values)
+                if missing.any():
+                    values = np.where(missing, fill, values)
+                codes[:, j] = categories.get_indexer(values)
+        return codes
+
+    def transform(self, df, dtype='float32'):
+        """Transforme un lot : ndarray (ordinal, one-hot dense) ou CSR (one-hot creux)"""
+        numeric = np.column_stack([df[col].to_numpy(dtype='float64', na_value=np.nan)
+                                   for col in self.numeric_features])
+        missing = np.isnan(numeric)
+        if missing.any():
+            numeric = np.where(missing, self._numeric_fill, numeric)
+        numeric = ((numeric - self._center) / self._scale).astype(dtype)
+        codes = self._codes(df)
+
+        if self.params['encoding'] == 'ordinal':
+            return np.hstack([numeric, codes.astype(dtype)])
+
+        # One-hot : colonne = nombre de numériques + décalage de la variable + code
+        n_numeric = len(self.numeric_features)
+        n_columns = n_numeric + sum(len(c) for c in self._categories)
+        if not self.params['sparse_output']:
+            out = np.zeros((len(df), n_columns), dtype=dtype)
+            out[:, :n_numeric] = numeric
+            rows, cols = np.nonzero(codes >= 0)
+            out[rows, n_numeric + self._offsets[cols] + codes[rows, cols]] = 1
+            return out
+
+        # CSR construit directement : par ligne, les numériques puis un 1 par
+        # variable dont la modalité est connue (les inconnues n'ont pas d'entrée)
+        known = codes >= 0
+        indices = np.hstack([np.broadcast_to(np.arange(n_numeric), numeric.shape),
+                             codes + n_numeric + self._offsets])
+        data = np.hstack([numeric, np.ones(codes.shape, dtype=dtype)])
+        if known.all():
+            indptr = np.arange(len(df) + 1) * indices.shape[1]
+            indices, data = indices.ravel(), data.ravel()
+        else:
+            keep = np.hstack([np.ones(numeric.shape, dtype=bool), known])
+            indptr = np.concatenate([[0], np.cumsum(keep.sum(axis=1))])
+            indices, data = indices[keep], data[keep]
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(df), n_columns))
+
+    def save(self, path):
+        """Écrit les paramètres en JSON ; retourne self"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.params, f, ensure_ascii=False, indent=2)
+        return self
+
+    @classmethod
+    def load(cls, path):
+        """Relit un préprocesseur écrit par save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        if params.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Version de préprocesseur non supportée : {params.get('version')}")
+        return cls(params)
+
+
+def benchmark_transform(preprocessor, df, batch_sizes=DEFAULT_BATCH_SIZES,
+                        min_seconds=DEFAULT_MIN_SECONDS):
+    """Débit de transform (lignes/s) par taille de lot, comparé au ColumnTransformer entraîné
+
+    Les lots plus grands que df sont obtenus en répétant ses lignes.
+    """
+    results = []
+    for batch_size in batch_sizes:
+        batch_size = int(batch_size)
+        repeats = -(-batch_size // len(df))
+        batch = (pd.concat([df] * repeats) if repeats > 1 else df).iloc[:batch_size]
+        runs = [('fast', preprocessor.transform)]
+        if preprocessor.transformer is not None:
+            sklearn_batch = batch[preprocessor.numeric_features
+                                  + preprocessor.categorical_features].astype(
+                {col: object for col in preprocessor.categorical_features})
+            runs.append(('sklearn', lambda _: preprocessor.transformer.transform(sklearn_batch)))
+
+        row = {'batch_size': batch_size}
+        for name, transform in runs:
+            calls = 0
+            start = time.perf_counter()
+            while True:
+                transform(batch)
+                calls += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= min_seconds:
+                    break
+            row[f'{name}_rows_per_s'] = batch_size * calls / elapsed
+            row[f'{name}_latency_ms'] = elapsed / calls * 1000
+        results.append(row)
+
+        line = f"⏱️  lot {batch_size:>9,} : {row['fast_rows_per_s']:>14,.0f} lignes/s"
+        if 'sklearn_rows_per_s' in row:
+            line += (f" (sklearn {row['sklearn_rows_per_s']:,.0f} lignes/s, "
+                     f"x{row['fast_rows_per_s'] / row['sklearn_rows_per_s']:.1f})")
+        print(line)
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    # Débit de scoring sur des lectures synthétiques traitées par le pipeline
+    from synthetic_data import generate_mobility_data
+    from pipeline import clean_data, transform_data, create_features, validate_data_types
+
+    data = generate_mobility_data(100_000)
+    data = validate_data_types(create_features(transform_data(clean_data(data, verbose=False))),
+                               verbose=False)
+    for encoding in ENCODINGS:
+        print(f"\n🛠️ Encodage {encoding}")
+        fitted = FittedPreprocessor.fit(data, encoding=encoding).save(f"preprocessor_{encoding}.json")
+        benchmark_transform(fitted, data)
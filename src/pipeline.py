@@ -1,21 +1,106 @@
+import os
+import io
+import contextlib
+import tracemalloc
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from sklearn.preprocessing import StandardScaler, LabelEncoder, RobustScaler
-from sklearn.impute import SimpleImputer
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from sklearn.preprocessing import LabelEncoder
 from scipy import stats
+from ingestion_cache import load_excel_cached, find_cached_table
+from column_stats import column_stats, iqr_bounds, DEFAULT_QUANTILES
+from binning import add_binned_columns, apply_binning, BINNINGS
+from quantile_sketch import KLLSketch, DEFAULT_K
+from instrumentation import max_rss_mb, stage_context
+from diagnostics import OutlierDiagnostics, outlier_report, print_outlier_report, DEFAULT_SAMPLE_SIZE
+from schema import enforce_schema, encode_flags, memory_per_row
+from columnar_export import (write_columnar, export_format, DEFAULT_COMPRESSION,
+                             DEFAULT_ROW_GROUP_SIZE)
+from ml_preprocessing import create_ml_pipeline, FittedPreprocessor
 import warnings
 warnings.filterwarnings('ignore')
 
+def copy_on_write_context():
+    """Active le copy-on-write de pandas (toujours actif à partir de pandas 3)"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return contextlib.nullcontext()
+    return pd.option_context('mode.copy_on_write', True)
+
 # 1. CHARGEMENT DES DONNÉES
-def load_data(file_path):
-    """Charge les données depuis le fichier Excel"""
+def read_excel_typed(file_path):
+    """Parse le fichier Excel et applique les types compacts du schéma"""
     df = pd.read_excel(file_path)
+    enforce_schema(df)
+    return df
+
+def load_data(file_path, use_cache=True, cache_dir=None, verbose=True):
+    """Charge les données depuis le fichier Excel (cache columnaire si use_cache), types du schéma"""
+    if not use_cache:
+        df = read_excel_typed(file_path)
+        if verbose:
+            print(f"✅ Données chargées : {df.shape[0]} lignes, {df.shape[1]} colonnes")
+        return df
+
+    # Le cache conserve les types du schéma (dictionnaires Arrow pour les catégories) ;
+    # un cache écrit avant le schéma est converti à la lecture
+    df, report = load_excel_cached(file_path, cache_dir=cache_dir, read_func=read_excel_typed)
+    enforce_schema(df)
+    if not verbose:
+        return df
+    if report['status'] == 'hit':
+        print(f"⚡ Cache d'ingestion (hit) : lecture {report['read_s']:.3f}s "
+              f"(vérification {report['lookup_s']:.3f}s)")
+    elif report['status'] == 'miss':
+        print(f"🐢 Cache d'ingestion (miss) : parsing Excel {report['parse_s']:.3f}s, "
+              f"écriture cache {report['write_s']:.3f}s")
+    elif report['status'] == 'error':
+        print(f"⚠️  Cache d'ingestion indisponible : {report['error']}")
+    else:
+        print("⚠️  pyarrow absent : cache d'ingestion désactivé")
+
     print(f"✅ Données chargées : {df.shape[0]} lignes, {df.shape[1]} colonnes")
     return df
 
+# 1bis. VÉRIFICATION DES TYPES DE DONNÉES
+def validate_data_types(df, verbose=True):
+    """Vérifie et convertit les types selon le schéma (float32, int8, booléens, catégories)"""
+    if verbose:
+        print("\n🔍 VÉRIFICATION DES TYPES DE DONNÉES")
+        print("=" * 50)
+
+        # Affichage des types actuels
+        type_report = pd.DataFrame({
+            'Colonne': df.columns,
+            'Type Actuel': df.dtypes.values,
+            'Valeurs Uniques': [df[col].nunique() for col in df.columns],
+            'Exemple': [df[col].iloc[0] if not df[col].empty else 'N/A' for col in df.columns]
+        })
+        print("📋 Types avant conversion :")
+        print(type_report.to_string())
+
+    # Conversions vers le schéma (schema.SCHEMA), en un passage
+    memory_before = memory_per_row(df) if verbose else None
+    conversions = enforce_schema(df)
+
+    if not verbose:
+        return df
+
+    # Rapport des conversions
+    if conversions:
+        print("\n🔄 Conversions appliquées :")
+        for col, conversion in conversions:
+            print(f"  • {col} → {conversion}")
+    else:
+        print("\n✅ Tous les types sont corrects")
+
+    # Affichage final
+    print(f"\n📊 Types après conversion :")
+    print(df.dtypes.to_string())
+    print(f"\n🧮 Mémoire : {memory_before:.0f} → {memory_per_row(df):.0f} octets par ligne")
+
+    return df
+
 # 2. DÉTECTION DES VALEURS ABERRANTES
 def detect_outliers(df, numerical_cols=None, method='iqr', threshold=1.5):
     """Détecte les valeurs aberrantes dans les colonnes numériques"""
@@ -27,31 +112,30 @@ def detect_outliers(df, numerical_cols=None, method='iqr', threshold=1.5):
     outliers_info = {}
     outlier_indices = set()
 
+    # Quantiles de toutes les colonnes en un passage (cache partagé)
+    if method in ('iqr', 'percentile'):
+        col_stats = column_stats(df, numerical_cols)
+
     for col in numerical_cols:
         if col not in df.columns:
             continue
 
-        data = df[col].dropna()
-
         if method == 'iqr':
             # Méthode IQR (Interquartile Range)
-            Q1 = data.quantile(0.25)
-            Q3 = data.quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - threshold * IQR
-            upper_bound = Q3 + threshold * IQR
+            lower_bound, upper_bound = iqr_bounds(df, col, threshold)
 
             outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
 
         elif method == 'zscore':
             # Méthode Z-score
+            data = df[col].dropna()
             z_scores = np.abs(stats.zscore(data))
             outliers = df[z_scores > threshold]
 
         elif method == 'percentile':
             # Méthode des percentiles
-            lower_bound = data.quantile(0.01)
-            upper_bound = data.quantile(0.99)
+            lower_bound = col_stats[col]['quantiles'][0.01]
+            upper_bound = col_stats[col]['quantiles'][0.99]
             outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
 
         if len(outliers) > 0:
@@ -67,30 +151,47 @@ def detect_outliers(df, numerical_cols=None, method='iqr', threshold=1.5):
     return outliers_info, list(outlier_indices)
 
 # 3. TRAITEMENT DES VALEURS ABERRANTES
-def handle_outliers(df, numerical_cols=None, method='winsorize', winsorize_limits=(0.01, 0.01)):
-    """Traite les valeurs aberrantes selon différentes méthodes"""
+def handle_outliers(df, numerical_cols=None, method='winsorize', winsorize_limits=(0.01, 0.01),
+                    bounds=None, verbose=True, inplace=False):
+    """Traite les valeurs aberrantes selon différentes méthodes
+
+    bounds : bornes {colonne: (basse, haute)} pré-calculées (ex. sur tout le jeu
+    de données en mode par lots) ; à défaut, elles sont calculées sur df.
+    inplace : modifie df directement au lieu d'en faire une copie.
+    """
 
-    df_clean = df.copy()
+    df_clean = df if inplace else df.copy()
 
     if numerical_cols is None:
         numerical_cols = ['speed_kmh', 'traffic_density', 'air_quality_index']
 
-    print("\n🔍 TRAITEMENT DES VALEURS ABERRANTES")
-    print("=" * 50)
+    if bounds is None:
+        bounds = {}
 
-    # Détection initiale
-    outliers_info, outlier_indices = detect_outliers(df_clean, numerical_cols)
+    # Précalcul en un passage des quantiles utiles (détection, winsorize, IQR)
+    lower_limit = winsorize_limits[0]
+    upper_limit = 1 - winsorize_limits[1]
+    if method in ('winsorize', 'cap', 'remove'):
+        column_stats(df_clean, numerical_cols,
+                     quantiles=DEFAULT_QUANTILES + (lower_limit, upper_limit))
 
-    if outliers_info:
-        print(f"📊 {len(outlier_indices)} enregistrements avec valeurs aberrantes détectés")
+    if verbose:
+        print("\n🔍 TRAITEMENT DES VALEURS ABERRANTES")
+        print("=" * 50)
 
-        for col, info in outliers_info.items():
-            print(f"\n  {col}:")
-            print(f"    • {info['count']} outliers ({info['percentage']:.2f}%)")
-            print(f"    • Plage des outliers: [{info['min_value']:.2f}, {info['max_value']:.2f}]")
-            print(f"    • Plage normale: [{df_clean[col].min():.2f}, {df_clean[col].max():.2f}]")
-    else:
-        print("✅ Aucune valeur aberrante détectée")
+        # Détection initiale
+        outliers_info, outlier_indices = detect_outliers(df_clean, numerical_cols)
+
+        if outliers_info:
+            print(f"📊 {len(outlier_indices)} enregistrements avec valeurs aberrantes détectés")
+
+            for col, info in outliers_info.items():
+                print(f"\n  {col}:")
+                print(f"    • {info['count']} outliers ({info['percentage']:.2f}%)")
+                print(f"    • Plage des outliers: [{info['min_value']:.2f}, {info['max_value']:.2f}]")
+                print(f"    • Plage normale: [{df_clean[col].min():.2f}, {df_clean[col].max():.2f}]")
+        else:
+            print("✅ Aucune valeur aberrante détectée")
 
     # Application du traitement selon la méthode choisie
     for col in numerical_cols:
@@ -99,49 +200,56 @@ def handle_outliers(df, numerical_cols=None, method='winsorize', winsorize_limit
 
         if method == 'winsorize':
             # Winsorization : remplace les extrêmes par des percentiles
-            lower_limit = winsorize_limits[0]
-            upper_limit = 1 - winsorize_limits[1]
-
-            lower_bound = df_clean[col].quantile(lower_limit)
-            upper_bound = df_clean[col].quantile(upper_limit)
+            if col in bounds:
+                lower_bound, upper_bound = bounds[col]
+            else:
+                quantiles = column_stats(df_clean, [col],
+                                         quantiles=(lower_limit, upper_limit))[col]['quantiles']
+                lower_bound = quantiles[lower_limit]
+                upper_bound = quantiles[upper_limit]
 
             df_clean[col] = np.where(df_clean[col] < lower_bound, lower_bound, df_clean[col])
             df_clean[col] = np.where(df_clean[col] > upper_bound, upper_bound, df_clean[col])
 
-            print(f"\n✅ {col}: Winsorization appliquée (limites: {lower_limit}, {upper_limit})")
+            if verbose:
+                print(f"\n✅ {col}: Winsorization appliquée (limites: {lower_limit}, {upper_limit})")
 
         elif method == 'cap':
             # Capping avec IQR
-            Q1 = df_clean[col].quantile(0.25)
-            Q3 = df_clean[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
+            if col in bounds:
+                lower_bound, upper_bound = bounds[col]
+            else:
+                lower_bound, upper_bound = iqr_bounds(df_clean, col)
 
             df_clean[col] = np.where(df_clean[col] < lower_bound, lower_bound, df_clean[col])
             df_clean[col] = np.where(df_clean[col] > upper_bound, upper_bound, df_clean[col])
 
-            print(f"\n✅ {col}: Capping IQR appliqué")
+            if verbose:
+                print(f"\n✅ {col}: Capping IQR appliqué")
 
         elif method == 'log':
             # Transformation logarithmique (pour données asymétriques)
             if (df_clean[col] > 0).all():
                 df_clean[col] = np.log1p(df_clean[col])
-                print(f"\n✅ {col}: Transformation logarithmique appliquée")
-            else:
+                if verbose:
+                    print(f"\n✅ {col}: Transformation logarithmique appliquée")
+            elif verbose:
                 print(f"\n⚠️  {col}: Transformation log impossible (valeurs négatives)")
 
         elif method == 'remove':
             # Suppression des outliers (méthode agressive)
-            Q1 = df_clean[col].quantile(0.25)
-            Q3 = df_clean[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
+            if col in bounds:
+                lower_bound, upper_bound = bounds[col]
+            else:
+                lower_bound, upper_bound = iqr_bounds(df_clean, col)
 
             mask = (df_clean[col] >= lower_bound) & (df_clean[col] <= upper_bound)
             df_clean = df_clean[mask]
-            print(f"\n✅ {col}: Outliers supprimés")
+            if verbose:
+                print(f"\n✅ {col}: Outliers supprimés")
+
+    if not verbose:
+        return df_clean
 
     # Vérification après traitement
     outliers_info_after, _ = detect_outliers(df_clean, numerical_cols)
@@ -154,339 +262,1041 @@ def handle_outliers(df, numerical_cols=None, method='winsorize', winsorize_limit
     return df_clean
 
 # 4. NETTOYAGE DES DONNÉES
-def clean_data(df, outlier_method='winsorize'):
-    """Nettoie les données avec traitement des outliers"""
-    df_clean = df.copy()
-
-    # Conversion du timestamp
-    df_clean['timestamp'] = pd.to_datetime(df_clean['timestamp'])
-
-    # Extraction des caractéristiques temporelles
-    df_clean['hour'] = df_clean['timestamp'].dt.hour
-    df_clean['day_of_week'] = df_clean['timestamp'].dt.dayofweek
-    df_clean['month'] = df_clean['timestamp'].dt.month
-    df_clean['is_weekend'] = df_clean['day_of_week'].isin([5, 6]).astype(int)
+def add_time_features(df):
+    """Convertit le timestamp et extrait les caractéristiques temporelles"""
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+
+    df['hour'] = df['timestamp'].dt.hour
+    df['day_of_week'] = df['timestamp'].dt.dayofweek
+    df['month'] = df['timestamp'].dt.month
+    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    return df
 
-    # Vérification des valeurs manquantes
-    print("\n🔍 Valeurs manquantes par colonne :")
-    missing = df_clean.isnull().sum()
-    print(missing[missing > 0] if missing.sum() > 0 else "✅ Aucune valeur manquante")
+def impute_missing(df, fill_values=None, verbose=True):
+    """Impute les valeurs manquantes en place (médiane numérique, mode sinon, ou fill_values)"""
+    missing = df.isnull().sum()
+    if verbose:
+        print("\n🔍 Valeurs manquantes par colonne :")
+        print(missing[missing > 0] if missing.sum() > 0 else "✅ Aucune valeur manquante")
 
-    # Imputation des valeurs manquantes
     if missing.sum() > 0:
-        for col in df_clean.columns:
-            if df_clean[col].isnull().sum() > 0:
-                if df_clean[col].dtype in ['float64', 'int64']:
-                    df_clean[col].fillna(df_clean[col].median(), inplace=True)
+        for col in df.columns:
+            if missing[col] > 0:
+                if fill_values is not None and col in fill_values:
+                    value = fill_values[col]
+                elif pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+                    value = df[col].median()
                 else:
-                    df_clean[col].fillna(df_clean[col].mode()[0], inplace=True)
+                    value = df[col].mode()[0]
+                # Affectation explicite : fillna(inplace=True) sur une colonne
+                # extraite est sans effet avec le copy-on-write de pandas
+                df[col] = df[col].fillna(value)
+    return df
+
+def clean_data(df, outlier_method='winsorize', fill_values=None, outlier_bounds=None,
+               outlier_cols=None, verbose=True, inplace=False, time_features=True,
+               deduplicate=True):
+    """Nettoie les données avec traitement des outliers
+
+    fill_values / outlier_bounds : statistiques globales pré-calculées (mode par
+    lots) ; à défaut, médianes, modes et bornes sont calculés sur df.
+    inplace : modifie df directement au lieu d'en faire une copie.
+    time_features / deduplicate : étapes désactivables quand l'appelant n'en a
+    pas besoin (graphe de colonnes, compute_columns).
+    """
+    df_clean = df if inplace else df.copy()
+
+    # Conversion du timestamp et extraction des caractéristiques temporelles
+    if time_features:
+        df_clean = add_time_features(df_clean)
+
+    # Vérification et imputation des valeurs manquantes
+    df_clean = impute_missing(df_clean, fill_values=fill_values, verbose=verbose)
 
     # Traitement des valeurs aberrantes
-    df_clean = handle_outliers(df_clean, method=outlier_method)
+    # df_clean appartient déjà à cette fonction : pas de seconde copie
+    df_clean = handle_outliers(df_clean, numerical_cols=outlier_cols, method=outlier_method,
+                               bounds=outlier_bounds, verbose=verbose, inplace=True)
+
+    if not deduplicate:
+        return df_clean
 
     # Suppression des doublons
     initial_rows = len(df_clean)
     df_clean = df_clean.drop_duplicates()
     removed_duplicates = initial_rows - len(df_clean)
-    if removed_duplicates > 0:
+    if removed_duplicates > 0 and verbose:
         print(f"\n📊 {removed_duplicates} doublons supprimés")
 
     return df_clean
 
 # 5. TRANSFORMATION DES DONNÉES
-def transform_data(df):
-    """Transforme les données pour l'analyse"""
-    df_transformed = df.copy()
-
-    # Catégorisation des variables
-    def categorize_aqi(aqi):
-        if aqi <= 50:
-            return 'Bon'
-        elif aqi <= 100:
-            return 'Modéré'
-        elif aqi <= 150:
-            return 'Mauvais'
-        else:
-            return 'Dangereux'
-
-    df_transformed['aqi_category'] = df_transformed['air_quality_index'].apply(categorize_aqi)
-
-    def categorize_speed(speed):
-        if speed <= 20:
-            return 'Lente'
-        elif speed <= 35:
-            return 'Normale'
-        else:
-            return 'Rapide'
-
-    df_transformed['speed_category'] = df_transformed['speed_kmh'].apply(categorize_speed)
-
-    def categorize_traffic(density):
-        if density <= 0.25:
-            return 'Fluide'
-        elif density <= 0.5:
-            return 'Modéré'
-        else:
-            return 'Dense'
-
-    df_transformed['traffic_category'] = df_transformed['traffic_density'].apply(categorize_traffic)
-
-    # Encodage
-    le = LabelEncoder()
-    df_transformed['weather_encoded'] = le.fit_transform(df_transformed['weather'])
+def encode_weather(weather, weather_classes=None):
+    """Code de la météo : position dans weather_classes, sinon classes observées triées"""
+    if weather_classes is None and isinstance(weather.dtype, pd.CategoricalDtype):
+        # Catégorie (schéma) : mêmes classes que LabelEncoder, sans tableau de chaînes
+        weather_classes = sorted(weather.cat.remove_unused_categories().cat.categories)
+    if weather_classes is not None:
+        # Le code est la position dans la liste, identique à LabelEncoder quand
+        # elle est triée
+        return pd.Categorical(weather, categories=weather_classes).codes.astype('int64')
+    return LabelEncoder().fit_transform(weather)
+
+def transform_data(df, weather_classes=None, inplace=False):
+    """Transforme les données pour l'analyse (weather_classes : encodage global fixé)"""
+    df_transformed = df if inplace else df.copy()
+
+    # Catégorisation des variables (seuils déclarés dans binning.BINNINGS)
+    df_transformed = add_binned_columns(df_transformed,
+                                        ['aqi_category', 'speed_category', 'traffic_category'])
+
+    # Encodage (classes fixées : globales ou persistées)
+    df_transformed['weather_encoded'] = encode_weather(df_transformed['weather'], weather_classes)
 
     return df_transformed
 
 # 6. CRÉATION DE FEATURES
-def create_features(df):
+def create_features(df, inplace=False):
     """Crée de nouvelles features"""
-    df_features = df.copy()
+    df_features = df if inplace else df.copy()
 
     df_features['speed_traffic_product'] = df_features['speed_kmh'] * df_features['traffic_density']
     df_features['traffic_aqi_flag'] = ((df_features['traffic_density'] < 0.2) & 
                                       (df_features['air_quality_index'] > 70)).astype(int)
 
-    # Heures de pointe
-    def is_rush_hour(hour):
-        return 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0
-
-    df_features['is_rush_hour'] = df_features['hour'].apply(is_rush_hour)
-
-    # Moment de la journée
-    def time_of_day(hour):
-        if 5 <= hour < 12:
-            return 'Matin'
-        elif 12 <= hour < 17:
-            return 'Après-midi'
-        elif 17 <= hour < 22:
-            return 'Soir'
-        else:
-            return 'Nuit'
-
-    df_features['time_of_day'] = df_features['hour'].apply(time_of_day)
-
-
+    # Heures de pointe et moment de la journée (seuils déclarés dans binning.BINNINGS)
+    df_features = add_binned_columns(df_features, ['is_rush_hour', 'time_of_day'])
 
     return df_features
 
 # 7. PIPELINE ML AVEC ROBUSTSCALER POUR OUTLIERS
-def create_ml_pipeline(outlier_robust=True):
-    """Crée un pipeline ML robuste aux outliers"""
-
-    numeric_features = ['speed_kmh', 'traffic_density', 'air_quality_index',
-                       'latitude', 'longitude', 'hour', 'speed_traffic_product']
-    categorical_features = ['weather', 'aqi_category', 'speed_category',
-                           'traffic_category', 'time_of_day']
-
-    # Utilisation de RobustScaler pour les outliers
-    if outlier_robust:
-        numeric_transformer = Pipeline(steps=[
-            ('imputer', SimpleImputer(strategy='median')),  # Median plus robuste
-            ('scaler', RobustScaler())  # Meilleur pour les outliers que StandardScaler
-        ])
-    else:
-        numeric_transformer = Pipeline(steps=[
-            ('imputer', SimpleImputer(strategy='median')),
-            ('scaler', StandardScaler())
-        ])
-
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='most_frequent')),
-        ('encoder', LabelEncoder())
-    ])
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, numeric_features),
-            ('cat', categorical_transformer, categorical_features)
-        ])
-
-    return preprocessor
+# create_ml_pipeline et le préprocesseur entraîné (FittedPreprocessor) vivent
+# dans ml_preprocessing.py
 
 # 8. ANALYSE DES OUTLIERS DÉTAILLÉE
 def detailed_outlier_analysis(df):
-    """Analyse détaillée des valeurs aberrantes"""
-
-    numerical_cols = ['speed_kmh', 'traffic_density', 'air_quality_index', 'speed_traffic_product']
+    """Analyse détaillée des valeurs aberrantes (toutes les lignes, affichage immédiat)"""
+    print_outlier_report(outlier_report(df))
 
-    print("\n📊 ANALYSE DÉTAILLÉE DES VALEURS ABERRANTES")
-    print("=" * 60)
+# 9. PIPELINE COMPLET
+def _run_stage(name, compute, stage_cache, key, instrumentation, verbose, rows_in=None):
+    """Exécute (ou relit depuis le cache d'étapes) une étape du pipeline, instrumentée
+
+    Sans compute, relecture seule : None si la sortie n'est pas dans le cache.
+    """
+    with stage_context(instrumentation, name, rows_in=rows_in) as record:
+        if stage_cache is None:
+            df = compute()
+        else:
+            df = stage_cache.get(key)
+            record['cache'] = 'miss' if df is None else 'hit'
+            if df is not None and verbose:
+                print(f"♻️  Étape {name} : sortie relue depuis le cache d'étapes")
+            elif df is None and compute is not None:
+                df = compute()
+                stage_cache.put(key, df, stage=name)
+        record['rows_out'] = None if df is None else len(df)
+    return df
 
-    for col in numerical_cols:
-        if col in df.columns:
-            data = df[col].dropna()
+def run_full_pipeline(file_path, outlier_method='winsorize', outlier_robust=True,
+                      use_cache=True, cache_dir=None, chunk_size=None, output_path=None,
+                      inplace=False, quantile_backend='exact', n_workers=1,
+                      partition_by='route_id', spatial_index=None, rollup_store=None,
+                      instrumentation=None, verbose=True, diagnostics='full',
+                      diagnostics_sample_size=DEFAULT_SAMPLE_SIZE, stage_cache=None,
+                      export_partition_by=None, preprocessor_path=None,
+                      encoding='onehot'):
+    """Exécute le pipeline complet avec traitement des outliers
+
+    Avec chunk_size, délègue à run_chunked_pipeline (mémoire bornée) : la sortie
+    est écrite au fil de l'eau dans output_path, retourné à la place du DataFrame ;
+    quantile_backend='sketch' y remplace les quantiles exacts par des sketches KLL.
+    Sinon, output_path (optionnel) reçoit l'export des données traitées (format
+    selon l'extension, partitions Hive export_partition_by : voir export_results).
+    Avec inplace, le DataFrame chargé passe d'étape en étape sans copie (le
+    pipeline en est le seul propriétaire) et le copy-on-write de pandas est actif.
+    Avec n_workers > 1, nettoyage, transformation et features tournent dans un
+    pool de processus, partitionné par route_id ou par plage temporelle ('time').
+    Un spatial_index (SpatialIndex) reçoit les lignes traitées au fil des runs ;
+    un rollup_store (RollupStore) y met à jour ses agrégats route × heure/jour.
+    Un StageRecorder passé en instrumentation mesure chaque étape (durée, CPU,
+    lignes, mémoire) ; verbose=False supprime tous les affichages.
+    diagnostics règle les analyses d'outliers avant/après nettoyage : 'off',
+    'sampled' (échantillon stratifié de diagnostics_sample_size lignes), 'full',
+    ou un OutlierDiagnostics fourni par l'appelant, qui pourra lire
+    diagnostics.report('before') / report('after') après le run. Les rapports ne
+    sont calculés qu'à l'affichage (verbose) ou à la demande.
+    Avec un stage_cache (StageCache), la sortie de chaque étape est mémorisée
+    sous une clé dérivée du contenu du fichier, des paramètres et du code : un
+    nouveau run reprend après la dernière étape déjà connue (par exemple après
+    le chargement si seule la méthode d'outliers change).
+    Avec preprocessor_path, le préprocesseur ML (encodage 'onehot' creux ou
+    'ordinal') est entraîné sur les données traitées, écrit en JSON et retourné
+    (FittedPreprocessor) à la place du ColumnTransformer non entraîné.
+    """
+
+    if chunk_size is not None:
+        if output_path is None:
+            raise ValueError("output_path est requis en mode par lots (chunk_size)")
+        if preprocessor_path is not None:
+            # L'entraînement demande toutes les lignes en mémoire
+            raise ValueError("preprocessor_path n'est pas disponible en mode par lots (chunk_size)")
+        return run_chunked_pipeline(file_path, output_path, outlier_method=outlier_method,
+                                    outlier_robust=outlier_robust, chunk_size=chunk_size,
+                                    cache_dir=cache_dir, quantile_backend=quantile_backend,
+                                    spatial_index=spatial_index, rollup_store=rollup_store,
+                                    instrumentation=instrumentation, verbose=verbose)
+
+    if verbose:
+        print("🚀 DÉMARRAGE DU PIPELINE AVEC TRAITEMENT DES OUTLIERS")
+        print("=" * 70)
+        print(f"📌 Méthode de traitement des outliers: {outlier_method}")
+        print(f"📌 RobustScaler pour ML: {outlier_robust}")
+        print(f"📌 Exécution en place (sans copies): {inplace}")
+
+    # Étapes 3 à 5 : fonctions de transformation et paramètres qui fixent leur sortie
+    if n_workers > 1:
+        # En parallèle, statistiques globales diffusées aux workers
+        stages = [('parallel_stages', {'outlier_method': outlier_method,
+                                       'partition_by': partition_by,
+                                       'quantile_backend': quantile_backend},
+                   lambda df: run_parallel_stages(df, n_workers, outlier_method=outlier_method,
+                                                  partition_by=partition_by,
+                                                  quantile_backend=quantile_backend,
+                                                  verbose=verbose))]
+    else:
+        stages = [('clean', {'outlier_method': outlier_method},
+                   lambda df: clean_data(df, outlier_method=outlier_method, verbose=verbose,
+                                         inplace=inplace)),
+                  ('transform', {}, lambda df: transform_data(df, inplace=inplace)),
+                  ('features', {}, lambda df: create_features(df, inplace=inplace))]
+    stages.append(('validate', {}, lambda df: validate_data_types(df, verbose=verbose)))
+
+    # Cache d'étapes : clés chaînées depuis l'empreinte du fichier, reprise
+    # après la dernière étape dont la sortie est déjà mémorisée
+    keys = {}
+    resume = -1
+    if stage_cache is not None:
+        keys['load'] = stage_cache.key('load', stage_cache.source_key(file_path))
+        previous = keys['load']
+        for i, (name, params, _) in enumerate(stages):
+            keys[name] = previous = stage_cache.key(name, previous, params)
+            if previous in stage_cache:
+                resume = i
+
+    caller_diagnostics = isinstance(diagnostics, OutlierDiagnostics)
+    if not caller_diagnostics:
+        diagnostics = OutlierDiagnostics(diagnostics, sample_size=diagnostics_sample_size)
+    # L'analyse initiale n'est utile que si elle est affichée ou lisible par l'appelant
+    need_before = diagnostics.mode != 'off' and (verbose or caller_diagnostics)
+
+    # Étape 1: Chargement (sauté si une étape ultérieure est relue du cache)
+    loaded = None
+    if need_before:
+        loaded = _run_stage('load', lambda: load_data(file_path, use_cache=use_cache,
+                                                      cache_dir=cache_dir, verbose=verbose),
+                            stage_cache, keys.get('load'), instrumentation, verbose)
+        # Étape 3: Analyse initiale des outliers (calculée seulement si affichée ou demandée)
+        diagnostics.capture('before', loaded)
+        if verbose:
+            print("\n🔍 ANALYSE INITIALE DES OUTLIERS")
+            with stage_context(instrumentation, 'outliers_before', rows_in=len(loaded)):
+                diagnostics.show('before')
+
+    df = None
+    start = 0
+    if resume >= 0:
+        name = stages[resume][0]
+        df = _run_stage(name, None, stage_cache, keys[name], instrumentation, verbose)
+        # Entrée illisible ou évincée entre-temps : tout est recalculé
+        start = resume + 1 if df is not None else 0
+    if df is None:
+        df = loaded if loaded is not None else _run_stage(
+            'load', lambda: load_data(file_path, use_cache=use_cache, cache_dir=cache_dir,
+                                      verbose=verbose),
+            stage_cache, keys.get('load'), instrumentation, verbose)
+    del loaded
+
+    with copy_on_write_context() if inplace else contextlib.nullcontext():
+        for name, _, func in stages[start:]:
+            df = _run_stage(name, lambda: func(df), stage_cache, keys.get(name),
+                            instrumentation, verbose, rows_in=len(df))
 
-            # Statistiques
-            stats_dict = {
-                'Moyenne': data.mean(),
-                'Médiane': data.median(),
-                'Std': data.std(),
-                'Min': data.min(),
-                'Max': data.max(),
-                'Q1': data.quantile(0.25),
-                'Q3': data.quantile(0.75),
-                'IQR': data.quantile(0.75) - data.quantile(0.25),
-                'Skewness': data.skew(),
-                'Kurtosis': data.kurtosis()
-            }
+    # Étape 6: Analyse après traitement
+    diagnostics.capture('after', df)
+    if verbose and diagnostics.mode != 'off':
+        print("\n🔍 ANALYSE APRÈS TRAITEMENT DES OUTLIERS")
+        with stage_context(instrumentation, 'outliers_after', rows_in=len(df)):
+            diagnostics.show('after')
+
+    # Étape 7: Pipeline ML robuste (entraîné et sauvegardé si preprocessor_path)
+    if preprocessor_path is None:
+        preprocessor = create_ml_pipeline(outlier_robust=outlier_robust, encoding=encoding)
+    else:
+        with stage_context(instrumentation, 'fit_preprocessor', rows_in=len(df)):
+            preprocessor = FittedPreprocessor.fit(df, outlier_robust=outlier_robust,
+                                                  encoding=encoding).save(preprocessor_path)
+        if verbose:
+            print(f"🛠️ Préprocesseur ML entraîné ({encoding}, "
+                  f"{len(preprocessor.feature_names)} colonnes) : {preprocessor_path}")
+
+    # Étape 8: Index spatial (zones critiques, proximité) et agrégats matérialisés
+    if spatial_index is not None:
+        with stage_context(instrumentation, 'spatial_index', rows_in=len(df)):
+            spatial_index.add(df)
+    if rollup_store is not None:
+        with stage_context(instrumentation, 'rollups', rows_in=len(df)) as record:
+            record['rows_out'] = rollup_store.update(df)
+            record['skipped'] = rollup_store.skipped
+        if verbose:
+            print(f"📦 Rollups : {record['rows_out']} nouvelles lectures agrégées, "
+                  f"{record['skipped']} déjà agrégées ou en retard ignorées")
+
+    # Étape 9: Export
+    if output_path is not None:
+        with stage_context(instrumentation, 'export', rows_in=len(df)) as record:
+            export_results(df, output_path, verbose=verbose, partition_by=export_partition_by)
+            record['rows_out'] = len(df)
+
+    if verbose:
+        print("\n" + "=" * 70)
+        print("✅ PIPELINE TERMINÉ AVEC SUCCÈS")
+        print(f"📋 Données finales : {df.shape[0]} lignes, {df.shape[1]} colonnes")
 
-            print(f"\n📈 {col}:")
-            for key, value in stats_dict.items():
-                print(f"  {key}: {value:.4f}")
+    return df, preprocessor
 
-            # Détection IQR
-            Q1 = stats_dict['Q1']
-            Q3 = stats_dict['Q3']
-            IQR = stats_dict['IQR']
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
+# 10. EXPORT DES RÉSULTATS
+def export_results(df, output_path='processed_mobility_data_with_outliers.csv', verbose=True,
+                   partition_by=None, compression=DEFAULT_COMPRESSION,
+                   row_group_size=DEFAULT_ROW_GROUP_SIZE, format=None):
+    """Exporte les données traitées (CSV, ou Parquet/Feather compressé et partitionné)
+
+    Le format suit l'extension de output_path (.csv, .parquet, .feather) ; avec
+    partition_by (ex. ['year_month', 'route_id']), output_path est un
+    répertoire de partitions Hive, relisible par columnar_export.read_results.
+    """
+    output_format = export_format(output_path, partition_by=partition_by, format=format)
+    if output_format == 'csv':
+        if partition_by:
+            raise ValueError("partition_by demande un export Parquet ou Feather")
+        # Drapeaux en 0/1 comme avant le schéma (lecteurs CSV, Power BI)
+        encode_flags(df).to_csv(output_path, index=False)
+        if verbose:
+            print(f"\n💾 Données exportées vers : {output_path}")
+        return
+
+    report = write_columnar(df, output_path, format=output_format, partition_by=partition_by,
+                            compression=compression, row_group_size=row_group_size)
+    if verbose:
+        print(f"\n💾 Données exportées vers : {output_path} ({output_format} {compression}, "
+              f"{report['files']} fichier(s), {report['bytes'] / 2**20:.1f} Mo)")
+
+# 11. PIPELINE PAR LOTS (MÉMOIRE BORNÉE)
+def iter_chunks(file_path, chunk_size=100_000, cache_dir=None):
+    """Lit le fichier source par lots de chunk_size lignes (CSV, Parquet, Feather, Excel)"""
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext == '.csv':
+        yield from pd.read_csv(file_path, chunksize=chunk_size)
+        return
+
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    # Excel : on privilégie le cache Feather d'ingestion, lu en memory-map
+    cache_file = file_path if ext == '.feather' else find_cached_table(file_path, cache_dir)
+    if cache_file is not None:
+        import pyarrow.feather as feather
+        table = feather.read_table(cache_file, memory_map=True)
+        for offset in range(0, table.num_rows, chunk_size):
+            yield table.slice(offset, chunk_size).to_pandas()
+        return
+
+    # Excel sans cache : lecture en flux via openpyxl (mode read_only)
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def _summary_quantiles(summary, qs):
+    """Quantiles d'un résumé de colonne : tableau de valeurs (exact) ou KLLSketch"""
+    if isinstance(summary, KLLSketch):
+        return summary.quantiles(qs)
+    return np.quantile(summary, qs)
+
+def _iter_source(source, chunk_size, cache_dir):
+    """Lots d'un fichier (iter_chunks) ou d'un DataFrame déjà chargé (copies superficielles)"""
+    if isinstance(source, pd.DataFrame):
+        with copy_on_write_context():
+            for offset in range(0, len(source), chunk_size):
+                yield source.iloc[offset:offset + chunk_size].copy(deep=False)
+        return
+    yield from iter_chunks(source, chunk_size=chunk_size, cache_dir=cache_dir)
+
+def new_stats_accumulator(quantile_backend='exact', sketch_k=DEFAULT_K):
+    """État cumulatif des statistiques globales, alimenté lot par lot"""
+    if quantile_backend not in ('exact', 'sketch'):
+        raise ValueError(f"quantile_backend inconnu : {quantile_backend}")
+    return {
+        'quantile_backend': quantile_backend,
+        'sketch_k': sketch_k,
+        'n_rows': 0,
+        'numeric': {},
+        'null_counts': {},
+        'label_counts': {}
+    }
 
-            outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
-            outlier_percentage = (len(outliers) / len(df)) * 100
+def accumulate_stats(acc, chunk):
+    """Ajoute un lot (types validés, caractéristiques temporelles extraites) à l'état"""
+    acc['n_rows'] += len(chunk)
 
-            print(f"  Outliers (IQR): {len(outliers)} ({outlier_percentage:.2f}%)")
-            print(f"  Plage normale: [{lower_bound:.4f}, {upper_bound:.4f}]")
+    for col in chunk.columns:
+        series = chunk[col]
+        acc['null_counts'][col] = acc['null_counts'].get(col, 0) + int(series.isnull().sum())
 
-            # Visualisation textuelle
-            if len(outliers) > 0:
-                print(f"  Exemples d'outliers: {outliers[col].head(5).values}")
+        if pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            if acc['quantile_backend'] == 'sketch':
+                acc['numeric'].setdefault(col, KLLSketch(k=acc['sketch_k'])).update(values)
+            else:
+                acc['numeric'].setdefault(col, []).append(values[~np.isnan(values)])
+        else:
+            counts = series.value_counts()
+            if col in acc['label_counts']:
+                counts = acc['label_counts'][col].add(counts, fill_value=0)
+            acc['label_counts'][col] = counts
+    return acc
+
+def finalize_stats(acc, numerical_cols=None, outlier_method='winsorize',
+                   winsorize_limits=(0.01, 0.01)):
+    """Médianes, modes, bornes d'outliers et classes météo à partir de l'état (non modifié)"""
+    if numerical_cols is None:
+        numerical_cols = ['speed_kmh', 'traffic_density', 'air_quality_index']
 
-# 9. PIPELINE COMPLET
-def run_full_pipeline(file_path, outlier_method='winsorize', outlier_robust=True):
-    """Exécute le pipeline complet avec traitement des outliers"""
+    null_counts = acc['null_counts']
+    label_counts = acc['label_counts']
+    if acc['quantile_backend'] == 'exact':
+        numeric_values = {col: np.concatenate(arrays) for col, arrays in acc['numeric'].items()}
+    else:
+        numeric_values = acc['numeric']
 
-    print("🚀 DÉMARRAGE DU PIPELINE AVEC TRAITEMENT DES OUTLIERS")
-    print("=" * 70)
-    print(f"📌 Méthode de traitement des outliers: {outlier_method}")
-    print(f"📌 RobustScaler pour ML: {outlier_robust}")
+    # Imputation : médiane (numérique) ou mode (texte, plus petite valeur en cas d'égalité)
+    fill_values = {}
+    for col, n_null in null_counts.items():
+        if n_null == 0:
+            continue
+        if col in numeric_values and len(numeric_values[col]) > 0:
+            fill_values[col] = float(_summary_quantiles(numeric_values[col], 0.5))
+        elif col in label_counts and len(label_counts[col]) > 0:
+            counts = label_counts[col]
+            fill_values[col] = sorted(counts[counts == counts.max()].index)[0]
+
+    # Bornes calculées sur les colonnes imputées, comme dans clean_data
+    outlier_bounds = {}
+    outlier_cols = []
+    for col in numerical_cols:
+        if col not in numeric_values:
+            continue
+        values = numeric_values[col]
+        if null_counts[col] and col in fill_values:
+            if acc['quantile_backend'] == 'sketch':
+                # Copie : l'état cumulatif ne doit pas contenir les valeurs imputées
+                values = values.copy().update_weighted(fill_values[col], null_counts[col])
+            else:
+                values = np.concatenate([values, np.full(null_counts[col], fill_values[col])])
+        if len(values) == 0:
+            continue
 
-    # Étape 1: Chargement
-    df = load_data(file_path)
+        if outlier_method == 'winsorize':
+            lower_bound, upper_bound = _summary_quantiles(
+                values, [winsorize_limits[0], 1 - winsorize_limits[1]])
+            outlier_bounds[col] = (float(lower_bound), float(upper_bound))
+        elif outlier_method in ('cap', 'remove'):
+            Q1, Q3 = _summary_quantiles(values, [0.25, 0.75])
+            IQR = Q3 - Q1
+            outlier_bounds[col] = (float(Q1 - 1.5 * IQR), float(Q3 + 1.5 * IQR))
+        elif outlier_method == 'log' and _summary_quantiles(values, 0.0) <= 0:
+            # Le test "toutes valeurs > 0" doit porter sur la colonne entière
+            continue
+        outlier_cols.append(col)
 
-    # Étape 2: Vérification types (NOUVELLE ÉTAPE)
-    def validate_data_types(df):
-        print("\n🔍 VÉRIFICATION DES TYPES DE DONNÉES")
-        print("=" * 50)
-        
-        # Affichage des types actuels
-        type_report = pd.DataFrame({
-            'Colonne': df.columns,
-            'Type Actuel': df.dtypes.values,
-            'Valeurs Uniques': [df[col].nunique() for col in df.columns],
-            'Exemple': [df[col].iloc[0] if not df[col].empty else 'N/A' for col in df.columns]
-        })
-        print("📋 Types avant conversion :")
-        print(type_report.to_string())
-        
-        # Conversions critiques
-        conversions = []
-        
-        # Vérifier timestamp
-        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
-            conversions.append(('timestamp', 'datetime'))
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        
-        # Vérifier les colonnes numériques
-        numeric_cols = ['speed_kmh', 'traffic_density', 'air_quality_index', 
-                        'latitude', 'longitude']
-        
-        for col in numeric_cols:
-            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
-                current_type = str(df[col].dtype)
-                conversions.append((col, f'float (était {current_type})'))
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Rapport des conversions
-        if conversions:
-            print("\n🔄 Conversions appliquées :")
-            for col, conversion in conversions:
-                print(f"  • {col} → {conversion}")
-        else:
-            print("\n✅ Tous les types sont corrects")
-        
-        # Affichage final
-        print(f"\n📊 Types après conversion :")
-        print(df.dtypes.to_string())
-        
-        return df
+    weather_classes = sorted(label_counts['weather'].index) if 'weather' in label_counts else None
 
-    # Puis modifiez run_full_pipeline() pour l'inclure :
-    
-    
+    return {
+        'n_rows': acc['n_rows'],
+        'fill_values': fill_values,
+        'outlier_bounds': outlier_bounds,
+        'outlier_cols': outlier_cols,
+        'weather_classes': weather_classes,
+        'quantile_backend': acc['quantile_backend']
+    }
 
-    # Étape 3: Analyse initiale des outliers
-    print("\n🔍 ANALYSE INITIALE DES OUTLIERS")
-    detailed_outlier_analysis(df)
+def stats_accumulator_to_dict(acc):
+    """Sérialise un état cumulatif (backend 'sketch') en structure JSON"""
+    if acc['quantile_backend'] != 'sketch':
+        raise ValueError("seul l'état 'sketch' est sérialisable (taille bornée)")
+    return {
+        'quantile_backend': 'sketch',
+        'sketch_k': acc['sketch_k'],
+        'n_rows': acc['n_rows'],
+        'numeric': {col: sketch.to_dict() for col, sketch in acc['numeric'].items()},
+        'null_counts': acc['null_counts'],
+        # Paires [valeur, effectif] : les clés JSON ne conservent pas les types
+        'label_counts': {col: [[value, int(count)] for value, count in counts.items()]
+                         for col, counts in acc['label_counts'].items()}
+    }
 
-    # Étape 3: Nettoyage avec traitement des outliers
-    df = clean_data(df, outlier_method=outlier_method)
+def stats_accumulator_from_dict(data):
+    """Reconstruit un état cumulatif depuis stats_accumulator_to_dict()"""
+    acc = new_stats_accumulator('sketch', data['sketch_k'])
+    acc['n_rows'] = data['n_rows']
+    acc['numeric'] = {col: KLLSketch.from_dict(sketch) for col, sketch in data['numeric'].items()}
+    acc['null_counts'] = dict(data['null_counts'])
+    acc['label_counts'] = {
+        col: pd.Series([count for _, count in pairs], index=[value for value, _ in pairs],
+                       dtype='float64')
+        for col, pairs in data['label_counts'].items()
+    }
+    return acc
+
+def compute_global_stats(source, numerical_cols=None, outlier_method='winsorize',
+                         winsorize_limits=(0.01, 0.01), chunk_size=100_000, cache_dir=None,
+                         quantile_backend='exact', sketch_k=DEFAULT_K):
+    """Premier passage : médianes, modes, bornes d'outliers et classes météo globales
+
+    source : chemin de fichier (lu par lots) ou DataFrame en mémoire (non modifié).
+    quantile_backend='exact' conserve les valeurs des colonnes numériques (pas
+    le DataFrame complet) ; 'sketch' les résume par un KLLSketch par colonne,
+    fusionné lot après lot : mémoire constante, quantiles approchés (erreur de
+    rang ≈ 2.296 / sketch_k**0.9723). Les colonnes texte sont résumées par
+    leurs comptages.
+    """
+    acc = new_stats_accumulator(quantile_backend, sketch_k)
+    for chunk in _iter_source(source, chunk_size, cache_dir):
+        accumulate_stats(acc, add_time_features(validate_data_types(chunk, verbose=False)))
+    return finalize_stats(acc, numerical_cols=numerical_cols, outlier_method=outlier_method,
+                          winsorize_limits=winsorize_limits)
+
+def run_chunked_pipeline(file_path, output_path, outlier_method='winsorize', outlier_robust=True,
+                         chunk_size=100_000, cache_dir=None, quantile_backend='exact',
+                         sketch_k=DEFAULT_K, spatial_index=None, rollup_store=None,
+                         instrumentation=None, verbose=True):
+    """Exécute le pipeline par lots de taille fixe et écrit la sortie CSV au fil de l'eau
+
+    Deux passages : le premier calcule les statistiques globales (médianes,
+    modes, bornes winsorize/IQR, classes météo), le second applique nettoyage,
+    transformation et features lot par lot avec ces statistiques.
+    instrumentation (StageRecorder) reçoit un enregistrement par étape et par
+    lot (champ chunk), cumulés par StageRecorder.summary().
+
+    Tolérance par rapport à run_full_pipeline :
+      - winsorize, cap, log : mêmes valeurs (à l'arrondi flottant près) ;
+      - remove : bornes IQR de chaque colonne calculées avant tout filtrage
+        (le chemin en mémoire les recalcule après chaque colonne filtrée) ;
+      - doublons : supprimés à l'intérieur de chaque lot seulement ;
+      - quantile_backend='sketch' : médianes et bornes approchées par KLL
+        (erreur de rang ≈ 1,3 % pour sketch_k=200), mémoire constante.
+    """
+
+    if export_format(output_path) != 'csv':
+        # Écriture incrémentale par ajout : Parquet/Feather via export_results en mémoire
+        raise ValueError("Le mode par lots écrit un CSV (output_path en .csv)")
+
+    if verbose:
+        print("🚀 DÉMARRAGE DU PIPELINE PAR LOTS")
+        print("=" * 70)
+        print(f"📌 Méthode de traitement des outliers: {outlier_method}")
+        print(f"📌 Taille des lots: {chunk_size} lignes")
+        print(f"📌 Calcul des quantiles: {quantile_backend}")
+
+    # Passage 1: statistiques globales
+    with stage_context(instrumentation, 'global_stats') as record:
+        global_stats = compute_global_stats(file_path, outlier_method=outlier_method,
+                                            chunk_size=chunk_size, cache_dir=cache_dir,
+                                            quantile_backend=quantile_backend, sketch_k=sketch_k)
+        record['rows_in'] = global_stats['n_rows']
+    if verbose:
+        print(f"📊 Premier passage : {global_stats['n_rows']} lignes analysées")
+        for col, (lower_bound, upper_bound) in global_stats['outlier_bounds'].items():
+            print(f"  • {col}: bornes [{lower_bound:.4f}, {upper_bound:.4f}]")
+
+    # Passage 2: traitement lot par lot, écriture incrémentale
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    rows_out = 0
+    rollups_skipped = 0
+    n_chunks = 0
+    chunks = iter_chunks(file_path, chunk_size=chunk_size, cache_dir=cache_dir)
+    while True:
+        with stage_context(instrumentation, 'load', chunk=n_chunks) as record:
+            chunk = next(chunks, None)
+            record['rows_out'] = None if chunk is None else len(chunk)
+        if chunk is None:
+            break
+
+        with stage_context(instrumentation, 'validate', len(chunk), chunk=n_chunks) as record:
+            chunk = validate_data_types(chunk, verbose=False)
+            record['rows_out'] = len(chunk)
+        with stage_context(instrumentation, 'clean', len(chunk), chunk=n_chunks) as record:
+            chunk = clean_data(chunk, outlier_method=outlier_method,
+                               fill_values=global_stats['fill_values'],
+                               outlier_bounds=global_stats['outlier_bounds'],
+                               outlier_cols=global_stats['outlier_cols'], verbose=False,
+                               inplace=True)
+            record['rows_out'] = len(chunk)
+        with stage_context(instrumentation, 'transform', len(chunk), chunk=n_chunks) as record:
+            chunk = transform_data(chunk, weather_classes=global_stats['weather_classes'],
+                                   inplace=True)
+            record['rows_out'] = len(chunk)
+        with stage_context(instrumentation, 'features', len(chunk), chunk=n_chunks) as record:
+            chunk = create_features(chunk, inplace=True)
+            # Colonnes dérivées aux types du schéma, comme en mémoire
+            enforce_schema(chunk)
+            record['rows_out'] = len(chunk)
+
+        with stage_context(instrumentation, 'export', len(chunk), chunk=n_chunks) as record:
+            encode_flags(chunk).to_csv(output_path, mode='a', header=(n_chunks == 0), index=False)
+            record['rows_out'] = len(chunk)
+        if spatial_index is not None:
+            with stage_context(instrumentation, 'spatial_index', len(chunk), chunk=n_chunks):
+                spatial_index.add(chunk)
+        if rollup_store is not None:
+            with stage_context(instrumentation, 'rollups', len(chunk), chunk=n_chunks) as record:
+                record['rows_out'] = rollup_store.update(chunk)
+                record['skipped'] = rollup_store.skipped
+            rollups_skipped += rollup_store.skipped
+        rows_out += len(chunk)
+        n_chunks += 1
 
-    # Étape 4: Transformation
-    df = transform_data(df)
+    preprocessor = create_ml_pipeline(outlier_robust=outlier_robust)
 
-    # Étape 5: Création de features
-    df = create_features(df)
-    df = validate_data_types(df)
+    if verbose:
+        print("\n" + "=" * 70)
+        print("✅ PIPELINE PAR LOTS TERMINÉ")
+        print(f"📋 {n_chunks} lots traités, {rows_out} lignes écrites dans {output_path}")
+        if rollups_skipped:
+            print(f"📦 Rollups : {rollups_skipped} lectures déjà agrégées ou en retard ignorées")
+
+    return output_path, preprocessor
+
+# 12. RAPPORT MÉMOIRE : COPIES VS EXÉCUTION EN PLACE
+def _load_silently(file_path, use_cache, cache_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_data(file_path, use_cache=use_cache, cache_dir=cache_dir)
+
+def _profile_stage_memory(file_path, outlier_method, inplace, use_cache, cache_dir):
+    """Exécute nettoyage, transformation et features et mesure le pic mémoire (processus dédié)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = load_data(file_path, use_cache=use_cache, cache_dir=cache_dir)
+    input_mb = df.memory_usage(deep=True).sum() / 2**20
+    rss_after_load_mb = max_rss_mb()
+
+    tracemalloc.start()
+    with copy_on_write_context() if inplace else contextlib.nullcontext():
+        df = clean_data(df, outlier_method=outlier_method, verbose=False, inplace=inplace)
+        df = transform_data(df, inplace=inplace)
+        df = create_features(df, inplace=inplace)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'input_mb': input_mb,
+        'traced_peak_mb': traced_peak / 2**20,
+        'rss_after_load_mb': rss_after_load_mb,
+        'peak_rss_mb': max_rss_mb()
+    }
 
-    # Étape 6: Analyse après traitement
-    print("\n🔍 ANALYSE APRÈS TRAITEMENT DES OUTLIERS")
-    detailed_outlier_analysis(df)
+def compare_peak_memory(file_path, outlier_method='winsorize', use_cache=True, cache_dir=None):
+    """Compare le pic mémoire des étapes avec copies (comportement historique) et en place
 
-    # Étape 7: Pipeline ML robuste
-    preprocessor = create_ml_pipeline(outlier_robust=outlier_robust)
+    Chaque mode tourne dans un processus neuf : le pic RSS d'un processus ne
+    redescend jamais, on ne peut donc pas mesurer les deux modes dans le même.
+    """
+    context = multiprocessing.get_context('spawn')
 
-    print("\n" + "=" * 70)
-    print("✅ PIPELINE TERMINÉ AVEC SUCCÈS")
-    print(f"📋 Données finales : {df.shape[0]} lignes, {df.shape[1]} colonnes")
+    # Remplit le cache d'ingestion avant les mesures : sinon le parsing Excel
+    # du premier mode fixerait le pic RSS et masquerait celui des étapes
+    if use_cache:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            executor.submit(_load_silently, file_path, use_cache, cache_dir).result()
 
-    return df, preprocessor
+    report = {}
+    for mode, inplace in (('copy', False), ('inplace', True)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            report[mode] = executor.submit(_profile_stage_memory, file_path, outlier_method,
+                                           inplace, use_cache, cache_dir).result()
 
-# 10. EXPORT DES RÉSULTATS
-def export_results(df, output_path='processed_mobility_data_with_outliers.csv'):
-    """Exporte les données traitées"""
-    df.to_csv(output_path, index=False)
-    print(f"\n💾 Données exportées vers : {output_path}")
-
-# 11. EXÉCUTION AVEC OPTIONS
-if __name__ == "__main__":
-    INPUT_FILE = "C:/Users/PC/Desktop/Bootcamp_FN/mobility_urban_pollution_300.xlsx"
-
-    # Options de traitement des outliers
-    METHODS = {
-        'winsorize': 'Winsorization (remplacement par percentiles)',
-        'cap': 'Capping IQR (troncature des extrêmes)',
-        'log': 'Transformation logarithmique',
-        'remove': 'Suppression des outliers'
+    print("\n🧠 PIC MÉMOIRE DES ÉTAPES (nettoyage, transformation, features)")
+    print("=" * 60)
+    print(f"📋 Taille des données chargées : {report['copy']['input_mb']:.1f} Mo")
+    for mode, result in report.items():
+        line = (f"  {mode:8s}: pic alloué {result['traced_peak_mb']:.1f} Mo "
+                f"({result['traced_peak_mb'] / result['input_mb']:.1f}x l'entrée)")
+        if result['peak_rss_mb'] is not None:
+            line += (f", pic RSS {result['peak_rss_mb']:.1f} Mo "
+                     f"(+{result['peak_rss_mb'] - result['rss_after_load_mb']:.1f} Mo après chargement)")
+        print(line)
+
+    reduction = 1 - report['inplace']['traced_peak_mb'] / report['copy']['traced_peak_mb']
+    print(f"\n✅ Réduction du pic alloué en mode en place : {reduction:.0%}")
+    return report
+
+# 13. EXÉCUTION PARALLÈLE PAR PARTITIONS
+# DataFrame partagé avec les workers : avec le démarrage 'fork', ils héritent
+# de la mémoire du parent (copy-on-write du système) et ne reçoivent que les
+# positions de leurs lignes, sans sérialiser les colonnes
+_shared_frame = None
+
+def partition_rows(df, n_partitions, partition_by='route_id'):
+    """Découpe les positions des lignes en partitions équilibrées (route_id ou plage temporelle)
+
+    Deux lignes identiques tombent toujours dans la même partition : la
+    suppression des doublons reste exacte partition par partition.
+    """
+    if partition_by == 'route_id':
+        # Répartition gloutonne des routes, de la plus volumineuse à la plus petite
+        codes, _ = pd.factorize(df['route_id'], use_na_sentinel=False)
+        sizes = np.bincount(codes)
+        loads = np.zeros(n_partitions, dtype='int64')
+        partition_of_group = np.empty(len(sizes), dtype='int64')
+        for group in np.argsort(-sizes, kind='stable'):
+            target = int(np.argmin(loads))
+            partition_of_group[group] = target
+            loads[target] += sizes[group]
+        partition_of_row = partition_of_group[codes]
+    elif partition_by == 'time':
+        # Plages de timestamps de tailles égales ; un même instant n'est jamais coupé
+        ts = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
+        boundaries = np.quantile(ts, np.linspace(0, 1, n_partitions + 1)[1:-1])
+        partition_of_row = np.searchsorted(boundaries, ts, side='right')
+    else:
+        raise ValueError(f"partition_by inconnu : {partition_by}")
+
+    order = np.argsort(partition_of_row, kind='stable')
+    counts = np.bincount(partition_of_row, minlength=n_partitions)
+    return [positions for positions in np.split(order, np.cumsum(counts)[:-1]) if len(positions)]
+
+def _run_partition(positions, global_stats, outlier_method, frame=None):
+    """Étapes ligne à ligne d'une partition, exécutées dans un worker du pool"""
+    with copy_on_write_context():
+        part = frame if frame is not None else _shared_frame.iloc[positions]
+        part = part.copy(deep=False)
+        part.index = positions
+        part = clean_data(part, outlier_method=outlier_method,
+                          fill_values=global_stats['fill_values'],
+                          outlier_bounds=global_stats['outlier_bounds'],
+                          outlier_cols=global_stats['outlier_cols'], verbose=False,
+                          inplace=True)
+        part = transform_data(part, weather_classes=global_stats['weather_classes'],
+                              inplace=True)
+        part = create_features(part, inplace=True)
+    return part
+
+def run_parallel_stages(df, n_workers, outlier_method='winsorize', partition_by='route_id',
+                        quantile_backend='exact', verbose=True):
+    """Nettoyage, transformation et features en parallèle sur un pool de processus
+
+    Les statistiques globales (médianes, modes, bornes, classes météo) sont
+    calculées une seule fois puis diffusées aux workers ; le résultat est
+    remis dans l'ordre d'origine. Tolérance : celle de run_chunked_pipeline,
+    sauf pour les doublons, dont la suppression reste exacte.
+    """
+    global _shared_frame
+
+    df = validate_data_types(df, verbose=False)
+    global_stats = compute_global_stats(df, outlier_method=outlier_method,
+                                        quantile_backend=quantile_backend)
+    partitions = partition_rows(df, n_workers * 4, partition_by=partition_by)
+
+    use_fork = 'fork' in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if use_fork else 'spawn')
+    _shared_frame = df if use_fork else None
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+            futures = [executor.submit(_run_partition, positions, global_stats, outlier_method,
+                                       None if use_fork else df.iloc[positions])
+                       for positions in partitions]
+            parts = [future.result() for future in futures]
+    finally:
+        _shared_frame = None
+
+    result = pd.concat(parts).sort_index()
+    result.index = df.index[result.index]
+    if verbose:
+        print(f"\n⚙️  {len(partitions)} partitions ({partition_by}) traitées par {n_workers} processus")
+    return result
+
+# 14. GRAPHE PARESSEUX DE COLONNES
+# Colonnes du fichier source (nettoyées par clean_data) et colonnes temporelles
+# qu'il y ajoute ; les colonnes dérivées sont déclarées dans COLUMN_PRODUCERS
+SOURCE_COLUMNS = ('route_id', 'timestamp', 'latitude', 'longitude', 'speed_kmh',
+                  'traffic_density', 'air_quality_index', 'weather')
+TIME_COLUMNS = ('hour', 'day_of_week', 'month', 'is_weekend')
+OUTLIER_COLUMNS = ('speed_kmh', 'traffic_density', 'air_quality_index')
+
+
+def _binning_producer(name):
+    spec = BINNINGS[name]
+    return {'stage': 'transform' if name.endswith('_category') else 'features',
+            'inputs': (spec['source'],),
+            'compute': lambda frame, context: apply_binning(frame[spec['source']], spec)}
+
+
+# Colonne dérivée -> étape d'origine, colonnes d'entrée et calcul (mêmes formules
+# que transform_data et create_features)
+COLUMN_PRODUCERS = {
+    **{name: _binning_producer(name) for name in ('aqi_category', 'speed_category',
+                                                  'traffic_category')},
+    'weather_encoded': {
+        'stage': 'transform',
+        'inputs': ('weather',),
+        'compute': lambda frame, context: encode_weather(frame['weather'], context['weather_classes'])
+    },
+    'speed_traffic_product': {
+        'stage': 'features',
+        'inputs': ('speed_kmh', 'traffic_density'),
+        'compute': lambda frame, context: frame['speed_kmh'] * frame['traffic_density']
+    },
+    'traffic_aqi_flag': {
+        'stage': 'features',
+        'inputs': ('traffic_density', 'air_quality_index'),
+        'compute': lambda frame, context: ((frame['traffic_density'] < 0.2)
+                                           & (frame['air_quality_index'] > 70)).astype(int)
+    },
+    **{name: _binning_producer(name) for name in ('is_rush_hour', 'time_of_day')}
+}
+
+
+def required_columns(columns, outlier_method='winsorize', deduplicate=True):
+    """Plan d'exécution : colonnes source à nettoyer, colonnes temporelles et dérivées à calculer
+
+    La suppression des doublons compare des lignes entières : avec
+    deduplicate, tout le nettoyage est nécessaire (mêmes lignes que
+    run_full_pipeline) ; seules les colonnes dérivées sont élaguées.
+    'remove' filtre les lignes sur toutes les colonnes d'outliers.
+    """
+    unknown = [col for col in columns if col not in SOURCE_COLUMNS + TIME_COLUMNS
+               and col not in COLUMN_PRODUCERS]
+    if unknown:
+        raise KeyError(f"Colonnes inconnues : {unknown}")
+
+    stack = list(columns)
+    needed = set()
+    while stack:
+        col = stack.pop()
+        if col in needed:
+            continue
+        needed.add(col)
+        if col in COLUMN_PRODUCERS:
+            stack.extend(COLUMN_PRODUCERS[col]['inputs'])
+    # Ordre de déclaration : une colonne dérivée suit toujours ses entrées
+    derived = [col for col in COLUMN_PRODUCERS if col in needed]
+
+    if deduplicate:
+        needed.update(SOURCE_COLUMNS + TIME_COLUMNS)
+    if outlier_method == 'remove':
+        needed.update(OUTLIER_COLUMNS)
+    if needed & set(TIME_COLUMNS):
+        needed.add('timestamp')
+    return {
+        'source': [col for col in SOURCE_COLUMNS if col in needed],
+        'time': any(col in needed for col in TIME_COLUMNS),
+        'derived': derived
     }
 
-    print("🎯 OPTIONS DE TRAITEMENT DES OUTLIERS")
-    print("=" * 50)
-    for key, value in METHODS.items():
-        print(f"  {key}: {value}")
-
-    # Choix de la méthode (vous pouvez le rendre interactif)
-    chosen_method = 'winsorize'  # Par défaut
-    # Pour rendre interactif : chosen_method = input("\nChoisissez une méthode: ")
 
-    try:
-        # Exécution avec la méthode choisie
-        processed_data, ml_pipeline = run_full_pipeline(
-            INPUT_FILE,
-            outlier_method=chosen_method,
-            outlier_robust=True
-        )
-
-        # Affichage d'échantillon
-        print("\n📄 Échantillon des données traitées :")
-        print(processed_data[['speed_kmh', 'traffic_density', 'air_quality_index',
-                              'weather', 'aqi_category']].head())
-
-        # Export
-        export_results(processed_data, f"mobility_data_processed_{chosen_method}.csv")
-
-        print(f"\n🛠️ Pipeline ML créé avec RobustScaler: {ml_pipeline}")
-
-    except Exception as e:
-        print(f"\n❌ Erreur : {e}")
-        import traceback
-        traceback.print_exc()
\ No newline at end of file
+def compute_columns(df, columns, outlier_method='winsorize', deduplicate=True,
+                    weather_classes=None, fill_values=None, outlier_bounds=None, verbose=False):
+    """Calcule seulement les colonnes demandées et le travail amont dont elles dépendent
+
+    df : données chargées (colonnes source). Le nettoyage ne porte que sur les
+    colonnes source nécessaires (toutes avec deduplicate, voir required_columns),
+    puis seules les colonnes dérivées requises sont produites, dans l'ordre de
+    COLUMN_PRODUCERS. Les valeurs et les types sont ceux de run_full_pipeline ;
+    deduplicate=False garde les doublons (et élague aussi le nettoyage).
+    Retourne un DataFrame limité aux colonnes demandées, dans leur ordre.
+    """
+    plan = required_columns(columns, outlier_method=outlier_method, deduplicate=deduplicate)
+    if verbose:
+        print(f"🧮 Colonnes source nettoyées : {plan['source']}")
+        print(f"🧮 Colonnes dérivées calculées : {plan['derived']}")
+
+    # Sélection de colonnes sans copie (copy-on-write) : clean_data travaille sur sa copie
+    frame = clean_data(df[plan['source']], outlier_method=outlier_method,
+                       fill_values=fill_values, outlier_bounds=outlier_bounds,
+                       outlier_cols=[col for col in OUTLIER_COLUMNS if col in plan['source']],
+                       verbose=False, time_features=plan['time'], deduplicate=deduplicate)
+
+    context = {'weather_classes': weather_classes}
+    for col in plan['derived']:
+        frame[col] = COLUMN_PRODUCERS[col]['compute'](frame, context)
+    result = frame[list(columns)]
+    # Mêmes types que run_full_pipeline (weather_encoded int8, drapeaux booléens)
+    enforce_schema(result)
+    return result
+
+
+def run_pipeline_columns(file_path, columns, outlier_method='winsorize', deduplicate=True,
+                         use_cache=True, cache_dir=None, verbose=True):
+    """Charge le fichier et ne calcule que les colonnes demandées (voir compute_columns)"""
+    df = load_data(file_path, use_cache=use_cache, cache_dir=cache_dir, verbose=verbose)
+    df = validate_data_types(df, verbose=False)
+    return compute_columns(df, columns, outlier_method=outlier_method,
+                           deduplicate=deduplicate, verbose=verbose)
+
+# 15. COMPARAISON DES MÉTHODES D'OUTLIERS
+OUTLIER_METHODS = {
+    'winsorize': 'Winsorization (remplacement par percentiles)',
+    'cap': 'Capping IQR (troncature des extrêmes)',
+    'log': 'Transformation logarithmique',
+    'remove': 'Suppression des outliers'
+}
+COMPARISON_FILENAME = 'outlier_methods_comparison.csv'
+
+def shared_outlier_bounds(df, outlier_method, numerical_cols=OUTLIER_COLUMNS,
+                          winsorize_limits=(0.01, 0.01)):
+    """Bornes {colonne: (basse, haute)} de outlier_method, servies par le cache column_stats
+
+    'remove' recalcule les bornes après chaque colonne filtrée : seule la
+    première colonne, calculée sur toutes les lignes, est partageable.
+    """
+    lower_limit, upper_limit = winsorize_limits[0], 1 - winsorize_limits[1]
+    col_stats = column_stats(df, numerical_cols,
+                             quantiles=DEFAULT_QUANTILES + (lower_limit, upper_limit))
+    columns = [col for col in numerical_cols if col in col_stats]
+    if outlier_method == 'winsorize':
+        return {col: (col_stats[col]['quantiles'][lower_limit],
+                      col_stats[col]['quantiles'][upper_limit]) for col in columns}
+    if outlier_method == 'cap':
+        return {col: iqr_bounds(df, col) for col in columns}
+    if outlier_method == 'remove':
+        return {col: iqr_bounds(df, col) for col in columns[:1]}
+    return {}
+
+def _run_method_branch(method, bounds, weather_classes, output_path, frame=None):
+    """Traitement propre à une méthode sur le préfixe partagé, exporté vers output_path"""
+    with copy_on_write_context():
+        df = (frame if frame is not None else _shared_frame).copy(deep=False)
+        df = handle_outliers(df, numerical_cols=list(OUTLIER_COLUMNS), method=method,
+                             bounds=bounds, verbose=False, inplace=True)
+        df = df.drop_duplicates()
+        df = transform_data(df, weather_classes=weather_classes, inplace=True)
+        df = create_features(df, inplace=True)
+        df = validate_data_types(df, verbose=False)
+    export_results(df, output_path, verbose=False)
+
+    summary = {'method': method, 'rows_out': len(df), 'output_path': output_path}
+    col_stats = column_stats(df, OUTLIER_COLUMNS)
+    for col in OUTLIER_COLUMNS:
+        lower_bound, upper_bound = iqr_bounds(df, col)
+        summary[f'{col}_mean'] = col_stats[col]['mean']
+        summary[f'{col}_std'] = col_stats[col]['std']
+        summary[f'{col}_min'] = col_stats[col]['min']
+        summary[f'{col}_max'] = col_stats[col]['max']
+        summary[f'{col}_outliers'] = int(((df[col] < lower_bound) | (df[col] > upper_bound)).sum())
+    return summary
+
+def run_multi_method_pipeline(file_path, output_dir='.', methods=tuple(OUTLIER_METHODS),
+                              n_workers=None, use_cache=True, cache_dir=None,
+                              instrumentation=None, verbose=True, output_format='csv'):
+    """Exécute toutes les méthodes d'outliers en un passage partagé et compare leurs sorties
+
+    Chargement, conversion du timestamp, imputation et statistiques (quantiles,
+    bornes, classes météo) sont calculés une seule fois ; seuls le traitement
+    des outliers, la suppression des doublons, la transformation et les
+    features sont propres à chaque méthode, exécutés dans un pool de
+    n_workers processus (un par méthode par défaut, dans le processus courant
+    avec n_workers=1). Chaque méthode écrit
+    mobility_data_processed_{méthode}.{output_format} dans output_dir, avec les mêmes
+    valeurs que run_full_pipeline ; la comparaison (lignes, statistiques et
+    outliers IQR restants par colonne) est écrite dans COMPARISON_FILENAME
+    et retournée, indexée par méthode.
+    """
+    global _shared_frame
+
+    unknown = [method for method in methods if method not in OUTLIER_METHODS]
+    if unknown:
+        raise ValueError(f"Méthodes inconnues : {unknown} (attendu : {list(OUTLIER_METHODS)})")
+    if n_workers is None:
+        n_workers = min(len(methods), os.cpu_count() or 1)
+
+    if verbose:
+        print("🚀 COMPARAISON DES MÉTHODES DE TRAITEMENT DES OUTLIERS")
+        print("=" * 70)
+        print(f"📌 Méthodes: {', '.join(methods)}")
+        print(f"📌 Processus: {n_workers}")
+
+    # Préfixe commun : chargement, timestamp, imputation
+    with stage_context(instrumentation, 'load') as record:
+        df = load_data(file_path, use_cache=use_cache, cache_dir=cache_dir, verbose=verbose)
+        record['rows_out'] = len(df)
+    with stage_context(instrumentation, 'shared_clean', rows_in=len(df)) as record:
+        df = impute_missing(add_time_features(df.copy()), verbose=verbose)
+        record['rows_out'] = len(df)
+
+    # Statistiques partagées : un seul calcul des quantiles pour toutes les méthodes
+    with stage_context(instrumentation, 'shared_stats', rows_in=len(df)):
+        bounds = {method: shared_outlier_bounds(df, method) for method in methods}
+        # Sans filtrage des lignes, les classes météo sont celles du jeu complet
+        weather_classes = sorted(df['weather'].unique())
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = {method: os.path.join(output_dir,
+                                         f"mobility_data_processed_{method}.{output_format}")
+                    for method in methods}
+    branch_args = {method: (method, bounds[method],
+                            None if method == 'remove' else weather_classes,
+                            output_paths[method]) for method in methods}
+
+    with stage_context(instrumentation, 'method_branches', rows_in=len(df)) as record:
+        if n_workers <= 1:
+            summaries = [_run_method_branch(*branch_args[method], frame=df) for method in methods]
+        else:
+            use_fork = 'fork' in multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if use_fork else 'spawn')
+            _shared_frame = df if use_fork else None
+            try:
+                with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+                    futures = [executor.submit(_run_method_branch, *branch_args[method],
+                                               frame=None if use_fork else df)
+                               for method in methods]
+                    summaries = [future.result() for future in futures]
+            finally:
+                _shared_frame = None
+        record['rows_out'] = sum(summary['rows_out'] for summary in summaries)
+
+    comparison = pd.DataFrame(summaries).set_index('method')
+    comparison.insert(1, 'rows_removed', len(df) - comparison['rows_out'])
+    comparison_path = os.path.join(output_dir, COMPARISON_FILENAME)
+    comparison.to_csv(comparison_path)
+
+    if verbose:
+        print("\n📊 COMPARAISON DES MÉTHODES")
+        print("=" * 70)
+        for method, row in comparison.iterrows():
+            print(f"\n📈 {method} ({OUTLIER_METHODS[method]}) → {row['output_path']}")
+            print(f"  Lignes: {row['rows_out']} ({row['rows_removed']} supprimées)")
+            for col in OUTLIER_COLUMNS:
+                print(f"  {col}: moyenne {row[f'{col}_mean']:.4f}, std {row[f'{col}_std']:.4f}, "
+                      f"plage [{row[f'{col}_min']:.4f}, {row[f'{col}_max']:.4f}], "
+                      f"outliers IQR restants {row[f'{col}_outliers']}")
+        print(f"\n💾 Comparaison exportée vers : {comparison_path}")
+
+    return comparison
@@ -0,0 +1,201 @@
+import numpy as np
+
+DEFAULT_K = 200
+
+
+class KLLSketch:
+    """Sketch de quantiles KLL (Karnin-Lang-Liberty), fusionnable et à mémoire bornée
+
+    Le sketch garde O(k) valeurs quelle que soit la taille du flux. L'erreur de
+    rang normalisée est d'environ 2.296 / k**0.9723 avec 99 % de confiance
+    (≈ 1,3 % pour k=200). Tant qu'aucune compaction n'a eu lieu (n petit),
+    les quantiles sont exacts et interpolés comme Series.quantile.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while sum(len(buf) for buf in self.levels) > \
+                sum(self._capacity(h) for h in range(len(self.levels))):
+            for h, buf in enumerate(self.levels):
+                if len(buf) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                # Compaction : on trie, puis une valeur sur deux (décalage
+                # aléatoire) monte au niveau supérieur avec un poids doublé
+                buf = np.sort(buf)
+                leftover = buf[:len(buf) % 2]
+                paired = buf[len(buf) % 2:]
+                offset = self._rng.integers(2)
+                self.levels[h] = leftover
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], paired[offset::2]])
+                break
+
+    def copy(self):
+        """Copie indépendante du sketch"""
+        other = KLLSketch(k=self.k)
+        other.n = self.n
+        other.min = self.min
+        other.max = self.max
+        other.levels = [buf.copy() for buf in self.levels]
+        return other
+
+    def update(self, values):
+        """Ajoute un tableau de valeurs (les NaN sont ignorés)"""
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def update_weighted(self, value, weight):
+        """Ajoute weight occurrences de value sans les matérialiser (décomposition binaire)"""
+        weight = int(weight)
+        if weight <= 0 or np.isnan(value):
+            return self
+        self.n += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        h = 0
+        while weight:
+            if weight & 1:
+                while len(self.levels) <= h:
+                    self.levels.append(np.empty(0))
+                self.levels[h] = np.append(self.levels[h], value)
+            weight >>= 1
+            h += 1
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fusionne un autre sketch dans celui-ci (par lot, fichier ou worker)"""
+        if other.n == 0:
+            return self
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self._compress()
+        return self
+
+    def is_exact(self):
+        """Vrai tant que toutes les valeurs sont conservées avec un poids 1"""
+        return all(len(buf) == 0 for buf in self.levels[1:])
+
+    def quantiles(self, qs):
+        """Quantiles approchés pour une liste de probabilités"""
+        qs = np.asarray(qs, dtype='float64')
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.is_exact():
+            return np.quantile(self.levels[0], qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(buf), 2 ** h, dtype='float64')
+                                  for h, buf in enumerate(self.levels)])
+        order = np.argsort(items)
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.minimum(idx, len(items) - 1)]
+        # Les extrêmes sont connus exactement
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+
+    def quantile(self, q):
+        """Quantile approché q"""
+        return float(self.quantiles([q])[0])
+
+    def normalized_rank_error(self):
+        """Erreur de rang normalisée (99 % de confiance) ; 0 tant que le sketch est exact"""
+        if self.is_exact():
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def to_dict(self):
+        """Représentation sérialisable (JSON) du sketch"""
+        return {
+            'k': self.k,
+            'n': self.n,
+            'min': None if self.n == 0 else float(self.min),
+            'max': None if self.n == 0 else float(self.max),
+            'levels': [buf.tolist() for buf in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data, seed=None):
+        """Reconstruit un sketch depuis to_dict()"""
+        sketch = cls(k=data['k'], seed=seed)
+        sketch.n = data['n']
+        if data['n']:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        sketch.levels = [np.asarray(buf, dtype='float64') for buf in data['levels']]
+        return sketch
+
+
+def sketch_columns(df, columns, k=DEFAULT_K, sketches=None):
+    """Construit (ou complète) un sketch par colonne numérique de df"""
+    if sketches is None:
+        sketches = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        sketch = sketches.setdefault(col, KLLSketch(k=k))
+        sketch.update(df[col].to_numpy(dtype='float64', na_value=np.nan))
+    return sketches
+
+
+def merge_sketches(sketch_dicts):
+    """Fusionne plusieurs {colonne: sketch} en un seul (ex. un par fichier ou worker)"""
+    merged = {}
+    for sketches in sketch_dicts:
+        for col, sketch in sketches.items():
+            if col not in merged:
+                merged[col] = KLLSketch(k=sketch.k)
+            merged[col].merge(sketch)
+    return merged
+
+
+def outlier_bounds_from_sketches(sketches, method='winsorize', winsorize_limits=(0.01, 0.01),
+                                 threshold=1.5):
+    """Bornes {colonne: (basse, haute)} pour winsorize ou cap/remove (IQR) depuis des sketches"""
+    bounds = {}
+    for col, sketch in sketches.items():
+        if sketch.n == 0:
+            continue
+        if method == 'winsorize':
+            lower_bound, upper_bound = sketch.quantiles([winsorize_limits[0],
+                                                         1 - winsorize_limits[1]])
+        elif method in ('cap', 'remove'):
+            Q1, Q3 = sketch.quantiles([0.25, 0.75])
+            IQR = Q3 - Q1
+            lower_bound, upper_bound = Q1 - threshold * IQR, Q3 + threshold * IQR
+        else:
+            continue
+        bounds[col] = (float(lower_bound), float(upper_bound))
+    return bounds
@@ -0,0 +1,244 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from quantile_sketch import KLLSketch, DEFAULT_K
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow est optionnel : repli sur le format pickle de pandas
+    feather = None
+
+MEASURES = ('speed_kmh', 'traffic_density', 'air_quality_index')
+# Granularités : nom -> fréquence de troncature du timestamp
+LEVELS = {'hour': 'h', 'day': 'D'}
+# Lectures non postérieures au watermark de leur route : ignorées (relecture d'un
+# fichier déjà agrégé) ou fusionnées (source qui ne livre que des lectures nouvelles)
+LATE_POLICIES = ('skip', 'merge')
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_ROLLUP_DIRNAME = '.rollups'
+
+
+def _sketch_columns(sketch):
+    """Sketch -> (valeurs conservées, taille de chaque niveau), stockés en colonnes liste"""
+    return np.concatenate(sketch.levels), [len(buf) for buf in sketch.levels]
+
+
+def _sketch_from_row(row, measure, k):
+    """Reconstruit le sketch KLL d'une ligne de rollup"""
+    items = np.asarray(row[f"{measure}_sketch"], dtype='float64')
+    sizes = np.asarray(row[f"{measure}_levels"], dtype='int64')
+    return KLLSketch.from_dict({
+        'k': k,
+        'n': int(row[f"{measure}_count"]),
+        'min': row[f"{measure}_min"],
+        'max': row[f"{measure}_max"],
+        'levels': np.split(items, np.cumsum(sizes)[:-1])
+    })
+
+
+def _batch_rollup(df, freq, k):
+    """Agrégats route × période d'un lot : effectif, somme, min, max et sketch par mesure"""
+    rows = df[['route_id', 'timestamp'] + [m for m in MEASURES if m in df.columns]]
+    rows = rows.dropna(subset=['route_id', 'timestamp'])
+    keys = pd.DataFrame({'route_id': rows['route_id'].astype(str).to_numpy(),
+                         'bucket': pd.to_datetime(rows['timestamp']).dt.floor(freq).to_numpy()})
+    group_ids, uniques = pd.MultiIndex.from_frame(keys).factorize()
+    n_groups = len(uniques)
+    order = np.argsort(group_ids, kind='stable')
+
+    result = uniques.to_frame(index=False, name=['route_id', 'bucket'])
+    for measure in MEASURES:
+        if measure not in rows.columns:
+            continue
+        values = rows[measure].to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(values)
+        count = np.bincount(group_ids, weights=valid, minlength=n_groups).astype('int64')
+        minimum = np.full(n_groups, np.inf)
+        maximum = np.full(n_groups, -np.inf)
+        np.minimum.at(minimum, group_ids, np.where(valid, values, np.inf))
+        np.maximum.at(maximum, group_ids, np.where(valid, values, -np.inf))
+
+        result[f"{measure}_count"] = count
+        result[f"{measure}_sum"] = np.bincount(group_ids, weights=np.where(valid, values, 0.0),
+                                               minlength=n_groups)
+        result[f"{measure}_min"] = np.where(count > 0, minimum, np.nan)
+        result[f"{measure}_max"] = np.where(count > 0, maximum, np.nan)
+
+        # Sketch exact (un seul niveau) tant qu'un groupe tient dans k valeurs :
+        # découpage vectorisé des valeurs triées par groupe
+        sorted_values = values[order][valid[order]]
+        items = np.split(sorted_values, np.cumsum(count)[:-1])
+        levels = [[int(c)] for c in count]
+        for i in np.flatnonzero(count > k):
+            items[i], levels[i] = _sketch_columns(KLLSketch(k=k).update(items[i]))
+        result[f"{measure}_sketch"] = items
+        result[f"{measure}_levels"] = levels
+    return result
+
+
+def _merge_rows(left, right, k):
+    """Fusionne deux agrégats d'une même clé (route, période)"""
+    merged = left.copy()
+    for measure in MEASURES:
+        if f"{measure}_count" not in left:
+            continue
+        sketch = _sketch_from_row(left, measure, k).merge(_sketch_from_row(right, measure, k))
+        merged[f"{measure}_count"] = left[f"{measure}_count"] + right[f"{measure}_count"]
+        merged[f"{measure}_sum"] = left[f"{measure}_sum"] + right[f"{measure}_sum"]
+        merged[f"{measure}_min"] = np.fmin(left[f"{measure}_min"], right[f"{measure}_min"])
+        merged[f"{measure}_max"] = np.fmax(left[f"{measure}_max"], right[f"{measure}_max"])
+        merged[f"{measure}_sketch"], merged[f"{measure}_levels"] = _sketch_columns(sketch)
+    return merged
+
+
+class RollupStore:
+    """Agrégats matérialisés par route × heure et route × jour, stockés en colonnes (Feather)
+
+    Par défaut, update() n'intègre que les lectures postérieures au watermark
+    de leur route : relancer le pipeline sur le même fichier n'ajoute rien, un
+    fichier complété n'ajoute que les nouvelles lectures. Les lectures écartées
+    (déjà agrégées ou en retard) sont comptées dans skipped et dans le
+    manifeste. Avec late='merge', elles sont fusionnées (sommes, effectifs et
+    sketches sont additifs) : à réserver aux sources qui ne livrent que des
+    lectures nouvelles, comme le pipeline incrémental. Les rapports lisent ces
+    tables (quelques Ko par route et par jour) au lieu de l'historique brut.
+    """
+
+    def __init__(self, path=DEFAULT_ROLLUP_DIRNAME, k=DEFAULT_K):
+        self.path = path
+        self.k = k
+        self._tables = {}
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'watermarks': {}, 'rows': 0}
+        self.manifest.setdefault('skipped', 0)
+        # Lectures écartées par le dernier update()
+        self.skipped = 0
+
+    def _table_path(self, level):
+        extension = 'feather' if feather is not None else 'pkl'
+        return os.path.join(self.path, f"route_{level}.{extension}")
+
+    def table(self, level='hour'):
+        """Table brute d'une granularité (une ligne par route × période)"""
+        if level not in self._tables:
+            path = self._table_path(level)
+            if not os.path.exists(path):
+                return pd.DataFrame(columns=['route_id', 'bucket'])
+            self._tables[level] = feather.read_feather(path) if feather is not None \
+                else pd.read_pickle(path)
+        return self._tables[level]
+
+    def _write(self, level, table):
+        path = self._table_path(level)
+        tmp_path = path + '.tmp'
+        if feather is not None:
+            feather.write_feather(table, tmp_path, compression='zstd')
+        else:
+            table.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        self._tables[level] = table
+
+    def update(self, df, late='skip'):
+        """Intègre les nouvelles lectures de df ; retourne le nombre de lignes ajoutées
+
+        late : 'skip' (lectures non postérieures au watermark de leur route
+        écartées et comptées dans self.skipped) ou 'merge' (fusionnées).
+        """
+        if late not in LATE_POLICIES:
+            raise ValueError(f"Politique inconnue pour les lectures en retard : {late}")
+        rows = df.dropna(subset=['route_id', 'timestamp'])
+        routes = rows['route_id'].astype(str)
+        timestamps = pd.to_datetime(rows['timestamp'])
+        watermarks = pd.to_datetime(routes.map(self.manifest['watermarks']))
+        behind = (watermarks.notna() & (timestamps <= watermarks)).to_numpy()
+        self.skipped = int(behind.sum()) if late == 'skip' else 0
+        if self.skipped:
+            rows = rows[~behind]
+            self.manifest['skipped'] += self.skipped
+        if len(rows) == 0:
+            if self.skipped:
+                self._write_manifest()
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        for level, freq in LEVELS.items():
+            batch = _batch_rollup(rows, freq, self.k)
+            existing = self.table(level)
+            if len(existing) == 0:
+                self._write(level, batch.sort_values(['route_id', 'bucket'], ignore_index=True))
+                continue
+
+            existing_keys = pd.MultiIndex.from_frame(existing[['route_id', 'bucket']])
+            batch_keys = pd.MultiIndex.from_frame(batch[['route_id', 'bucket']])
+            overlap = batch_keys.isin(existing_keys)
+            # Périodes déjà entamées (watermark en cours d'heure ou de jour) : fusion ligne à ligne
+            merged = existing.copy()
+            positions = existing_keys.get_indexer(batch_keys[overlap])
+            for position, (_, row) in zip(positions, batch[overlap].iterrows()):
+                merged.iloc[position] = _merge_rows(merged.iloc[position], row, self.k)
+            table = pd.concat([merged, batch[~overlap]], ignore_index=True)
+            self._write(level, table.sort_values(['route_id', 'bucket'], ignore_index=True))
+
+        latest = pd.to_datetime(rows['timestamp']).groupby(rows['route_id'].astype(str)).max()
+        for route, timestamp in latest.items():
+            # Des lectures en retard fusionnées ne font pas reculer le watermark
+            previous = self.manifest['watermarks'].get(route)
+            if previous is None or timestamp > pd.Timestamp(previous):
+                self.manifest['watermarks'][route] = timestamp.isoformat()
+        self.manifest['rows'] += len(rows)
+        self._write_manifest()
+        return len(rows)
+
+    def _write_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def means(self, level='hour', start=None, end=None, routes=None):
+        """Effectifs et moyennes par route × période, sur une fenêtre et des routes optionnelles"""
+        table = self._window(level, start, end, routes)
+        result = table[['route_id', 'bucket']].copy()
+        for measure in MEASURES:
+            if f"{measure}_count" in table:
+                result[f"{measure}_count"] = table[f"{measure}_count"]
+                result[f"{measure}_mean"] = table[f"{measure}_sum"] / table[f"{measure}_count"]
+                result[f"{measure}_min"] = table[f"{measure}_min"]
+                result[f"{measure}_max"] = table[f"{measure}_max"]
+        return result
+
+    def quantiles(self, measure, qs=(0.5,), level='day', start=None, end=None, routes=None):
+        """Quantiles de measure par route sur la fenêtre, par fusion des sketches"""
+        table = self._window(level, start, end, routes)
+        result = {}
+        for route, group in table.groupby('route_id'):
+            if all(len(levels) == 1 for levels in group[f"{measure}_levels"]):
+                # Sketches exacts : quantiles exacts sur les valeurs conservées
+                values = np.concatenate([np.asarray(items, dtype='float64')
+                                         for items in group[f"{measure}_sketch"]])
+                result[route] = np.quantile(values, qs) if len(values) else np.full(len(qs), np.nan)
+                continue
+            sketch = KLLSketch(k=self.k)
+            for _, row in group.iterrows():
+                sketch.merge(_sketch_from_row(row, measure, self.k))
+            result[route] = sketch.quantiles(qs)
+        return pd.DataFrame.from_dict(result, orient='index', columns=list(qs))
+
+    def _window(self, level, start, end, routes):
+        table = self.table(level)
+        if len(table) == 0:
+            return table
+        mask = np.ones(len(table), dtype=bool)
+        if start is not None:
+            mask &= (table['bucket'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (table['bucket'] <= pd.Timestamp(end)).to_numpy()
+        if routes is not None:
+            mask &= table['route_id'].isin([str(route) for route in routes]).to_numpy()
+        return table[mask]
@@ -0,0 +1,100 @@
+import re
+import pandas as pd
+
+# Schéma unique des colonnes de mobility_processed : type pandas en mémoire et type
+# SQL de la table (db_schema.COLUMNS en dérive). Les types mémoire suivent la
+# précision déclarée en base : DECIMAL(9,6) demande 9 chiffres significatifs
+# (float64), les autres décimaux tiennent en float32. air_quality_index est un
+# SMALLINT en base mais devient fractionnaire après winsorize/log : float32.
+SCHEMA = {
+    'route_id': {'dtype': 'category', 'sql': 'VARCHAR(10) NOT NULL'},
+    'timestamp': {'dtype': 'datetime64', 'sql': 'DATETIME NOT NULL'},
+    'latitude': {'dtype': 'float64', 'sql': 'DECIMAL(9,6)'},
+    'longitude': {'dtype': 'float64', 'sql': 'DECIMAL(9,6)'},
+    'speed_kmh': {'dtype': 'float32', 'sql': 'DECIMAL(5,2)'},
+    'traffic_density': {'dtype': 'float32', 'sql': 'DECIMAL(3,2)'},
+    'air_quality_index': {'dtype': 'float32', 'sql': 'SMALLINT'},
+    'weather': {'dtype': 'category', 'sql': 'VARCHAR(20)'},
+    'hour': {'dtype': 'int8', 'sql': 'TINYINT'},
+    'day_of_week': {'dtype': 'int8', 'sql': 'TINYINT'},
+    'month': {'dtype': 'int8', 'sql': 'TINYINT'},
+    'is_weekend': {'dtype': 'bool', 'sql': 'BOOLEAN'},
+    'aqi_category': {'dtype': 'category', 'sql': 'VARCHAR(15)'},
+    'speed_category': {'dtype': 'category', 'sql': 'VARCHAR(10)'},
+    'traffic_category': {'dtype': 'category', 'sql': 'VARCHAR(10)'},
+    'weather_encoded': {'dtype': 'int8', 'sql': 'TINYINT'},
+    'speed_traffic_product': {'dtype': 'float32', 'sql': 'DECIMAL(8,4)'},
+    'traffic_aqi_flag': {'dtype': 'bool', 'sql': 'BOOLEAN'},
+    'is_rush_hour': {'dtype': 'bool', 'sql': 'BOOLEAN'},
+    'time_of_day': {'dtype': 'category', 'sql': 'VARCHAR(15)'}
+}
+
+# Types nullables de repli quand une colonne entière/booléenne contient des manquants
+NULLABLE_DTYPES = {'int8': 'Int8', 'int16': 'Int16', 'bool': 'boolean'}
+
+
+def _has_dtype(series, dtype):
+    """Vrai si series a déjà le type du schéma (ou son équivalent nullable)"""
+    if dtype == 'category':
+        return isinstance(series.dtype, pd.CategoricalDtype)
+    if dtype == 'datetime64':
+        return pd.api.types.is_datetime64_any_dtype(series)
+    return series.dtype == dtype or str(series.dtype) == NULLABLE_DTYPES.get(dtype)
+
+
+def _convert(series, dtype):
+    """Convertit series vers dtype (valeurs invalides -> manquantes, comme errors='coerce')"""
+    if dtype == 'category':
+        return series.astype('category')
+    if dtype == 'datetime64':
+        return pd.to_datetime(series, errors='coerce')
+    if not pd.api.types.is_numeric_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.to_numeric(series, errors='coerce')
+    if dtype in NULLABLE_DTYPES and series.hasnans:
+        return series.astype(NULLABLE_DTYPES[dtype])
+    if dtype == 'bool':
+        return series != 0
+    return series.astype(dtype)
+
+
+def enforce_schema(df, schema=SCHEMA):
+    """Applique les types du schéma aux colonnes présentes de df, en place et en un passage
+
+    Seules les colonnes dont le type diffère sont converties ; les catégories
+    déjà fixées (binning) sont conservées. Retourne [(colonne, conversion)].
+    """
+    conversions = []
+    for col, spec in schema.items():
+        if col not in df.columns or _has_dtype(df[col], spec['dtype']):
+            continue
+        conversions.append((col, f"{spec['dtype']} (était {df[col].dtype})"))
+        df[col] = _convert(df[col], spec['dtype'])
+    return conversions
+
+
+def encode_flags(df):
+    """df avec les colonnes booléennes en 1/0 (Int8 si manquants), format des CSV et de la base"""
+    flags = {col: 'Int8' if df[col].hasnans else 'int8'
+             for col in df.columns if pd.api.types.is_bool_dtype(df[col])}
+    return df.astype(flags) if flags else df
+
+
+def sql_columns(schema=SCHEMA):
+    """[(colonne, type SQL)] de la table, dans l'ordre du schéma"""
+    return [(col, spec['sql']) for col, spec in schema.items()]
+
+
+def sql_scale(col, schema=SCHEMA):
+    """Nombre de décimales stockées en base (DECIMAL(p,s) -> s, entiers -> 0), None sinon"""
+    sql_type = schema[col]['sql'] if col in schema else ''
+    match = re.match(r'DECIMAL\(\d+,\s*(\d+)\)', sql_type)
+    if match:
+        return int(match.group(1))
+    if sql_type.split()[0] in ('TINYINT', 'SMALLINT', 'INT'):
+        return 0
+    return None
+
+
+def memory_per_row(df):
+    """Octets par ligne (mémoire profonde, chaînes comprises)"""
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
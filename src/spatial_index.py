@@ -0,0 +1,136 @@
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_M = 6_371_000
+# Côté des cellules de la grille (~550 m à Dakar)
+DEFAULT_CELL_DEG = 0.005
+PAYLOAD_COLUMNS = ['route_id', 'timestamp', 'latitude', 'longitude', 'speed_kmh',
+                   'traffic_density', 'air_quality_index']
+HOTSPOT_MEASURES = ('air_quality_index', 'traffic_density')
+
+
+class SpatialIndex:
+    """Index spatial incrémental : BallTree (haversine) par segments + grille agrégée par heure
+
+    - Proximité : chaque lot ajouté devient un segment indexé par un BallTree ;
+      deux segments de taille comparable sont fusionnés (comme un LSM-tree),
+      d'où O(log n) segments et un coût d'insertion amorti O(n log n).
+      query_radius interroge chaque segment en O(log n + résultat).
+    - Zones critiques : effectifs et sommes par cellule de grille × heure,
+      agrégés à l'insertion ; top_cells ne parcourt que ces agrégats.
+    """
+
+    def __init__(self, cell_deg=DEFAULT_CELL_DEG, leaf_size=40):
+        self.cell_deg = cell_deg
+        self.leaf_size = leaf_size
+        self.segments = []
+        self._cells = []
+        self._cell_frame = None
+
+    def __len__(self):
+        return sum(len(segment['rows']) for segment in self.segments)
+
+    def _build_segment(self, rows):
+        coords = np.radians(rows[['latitude', 'longitude']].to_numpy(dtype='float64'))
+        return {'rows': rows, 'tree': BallTree(coords, leaf_size=self.leaf_size, metric='haversine')}
+
+    def add(self, df):
+        """Ajoute un lot de lectures (les lignes sans coordonnées sont ignorées)"""
+        columns = [col for col in PAYLOAD_COLUMNS if col in df.columns]
+        rows = df[columns].dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        if len(rows) == 0:
+            return self
+
+        # Agrégats par cellule × heure du lot
+        cells = pd.DataFrame({
+            'cell_lat': np.floor(rows['latitude'].to_numpy() / self.cell_deg).astype('int64'),
+            'cell_lon': np.floor(rows['longitude'].to_numpy() / self.cell_deg).astype('int64'),
+            'hour_ts': pd.to_datetime(rows['timestamp']).dt.floor('h') if 'timestamp' in rows
+            else pd.NaT,
+            'count': 1
+        })
+        for col in HOTSPOT_MEASURES:
+            if col in rows:
+                cells[f"{col}_sum"] = rows[col].to_numpy(dtype='float64', na_value=np.nan)
+                cells[f"{col}_count"] = rows[col].notna().to_numpy().astype('int64')
+        self._cells.append(cells.groupby(['cell_lat', 'cell_lon', 'hour_ts'], dropna=False).sum())
+        self._cell_frame = None
+
+        # Nouveau segment, fusionné tant que le précédent n'est pas au moins deux fois plus gros
+        segment = self._build_segment(rows)
+        while self.segments and len(self.segments[-1]['rows']) <= 2 * len(segment['rows']):
+            previous = self.segments.pop()
+            segment = self._build_segment(pd.concat([previous['rows'], segment['rows']],
+                                                    ignore_index=True))
+        self.segments.append(segment)
+        return self
+
+    def query_radius(self, latitude, longitude, radius_m, start=None, end=None):
+        """Lectures à moins de radius_m mètres du point, éventuellement dans [start, end]"""
+        point = np.radians([[latitude, longitude]])
+        parts = []
+        for segment in self.segments:
+            idx, dist = segment['tree'].query_radius(point, r=radius_m / EARTH_RADIUS_M,
+                                                     return_distance=True)
+            rows = segment['rows'].iloc[idx[0]].copy()
+            rows['distance_m'] = dist[0] * EARTH_RADIUS_M
+            parts.append(rows)
+        if not parts:
+            return pd.DataFrame(columns=PAYLOAD_COLUMNS + ['distance_m'])
+
+        result = pd.concat(parts, ignore_index=True)
+        if start is not None or end is not None:
+            timestamps = pd.to_datetime(result['timestamp'])
+            mask = np.ones(len(result), dtype=bool)
+            if start is not None:
+                mask &= (timestamps >= pd.Timestamp(start)).to_numpy()
+            if end is not None:
+                mask &= (timestamps <= pd.Timestamp(end)).to_numpy()
+            result = result[mask]
+        return result.sort_values('distance_m', ignore_index=True)
+
+    def cell_frame(self):
+        """Agrégats consolidés par cellule × heure"""
+        if self._cell_frame is None:
+            if not self._cells:
+                return pd.DataFrame()
+            merged = pd.concat(self._cells).groupby(level=[0, 1, 2], dropna=False).sum()
+            # Consolidation : les lots suivants s'ajoutent à cette seule table
+            self._cells = [merged]
+            self._cell_frame = merged.reset_index().sort_values('hour_ts', ignore_index=True)
+        return self._cell_frame
+
+    def top_cells(self, measure='air_quality_index', n=10, start=None, end=None, min_count=1):
+        """Les n cellules de plus forte moyenne de measure sur la fenêtre [start, end]"""
+        cells = self.cell_frame()
+        if len(cells) == 0:
+            return cells
+        # Table triée par heure : la fenêtre se délimite par recherche dichotomique
+        hours = cells['hour_ts'].to_numpy()
+        lo = 0 if start is None else np.searchsorted(hours, np.datetime64(pd.Timestamp(start).floor('h')), 'left')
+        hi = len(cells) if end is None else np.searchsorted(hours, np.datetime64(pd.Timestamp(end)), 'right')
+        window = cells.iloc[lo:hi]
+
+        totals = window.groupby(['cell_lat', 'cell_lon'])[
+            ['count', f"{measure}_sum", f"{measure}_count"]].sum()
+        totals = totals[totals['count'] >= min_count]
+        totals[f"mean_{measure}"] = totals[f"{measure}_sum"] / totals[f"{measure}_count"]
+        top = totals.nlargest(n, f"mean_{measure}").reset_index()
+        # Centre de la cellule pour l'affichage
+        top['latitude'] = (top['cell_lat'] + 0.5) * self.cell_deg
+        top['longitude'] = (top['cell_lon'] + 0.5) * self.cell_deg
+        return top[['latitude', 'longitude', 'count', f"mean_{measure}", 'cell_lat', 'cell_lon']]
+
+    def save(self, path):
+        """Sauvegarde l'index (segments, arbres et agrégats)"""
+        self.cell_frame()
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        """Recharge un index sauvegardé par save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+from ingestion_cache import file_content_hash
+
+DEFAULT_STAGE_CACHE_DIRNAME = '.stage_cache'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_MAX_BYTES = 2 * 2**30
+# Modules dont le code détermine les sorties des étapes : toute modification
+# invalide les entrées calculées avec l'ancienne version
+CODE_MODULES = ('pipeline.py', 'binning.py', 'column_stats.py', 'quantile_sketch.py',
+                'ingestion_cache.py', 'schema.py')
+
+_code_version = None
+
+
+def code_version():
+    """Empreinte du code des étapes (contenu des modules de CODE_MODULES)"""
+    global _code_version
+    if _code_version is None:
+        sha = hashlib.sha256()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in CODE_MODULES:
+            path = os.path.join(src_dir, name)
+            if os.path.exists(path):
+                sha.update(name.encode())
+                sha.update(file_content_hash(path).encode())
+        _code_version = sha.hexdigest()[:16]
+    return _code_version
+
+
+class StageCache:
+    """Cache disque des sorties d'étapes, adressé par contenu
+
+    La clé d'une étape est l'empreinte de (nom, clé de son entrée, paramètres,
+    version du code) ; la clé d'entrée de la première étape est l'empreinte
+    SHA-256 du fichier source, celle des suivantes la clé de l'étape
+    précédente. Une sortie ne dépend que de ces éléments : une clé connue se
+    relit au lieu d'être recalculée. Les entrées (pickle, dtypes et index
+    exacts) sont évincées par ancienneté d'accès (LRU) au-delà de max_bytes.
+    """
+
+    def __init__(self, path=DEFAULT_STAGE_CACHE_DIRNAME, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'entries': {}, 'sources': {}}
+
+    def _write_manifest(self):
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def source_key(self, file_path):
+        """Empreinte du contenu d'un fichier source (relue seulement si mtime/taille changent)"""
+        source = os.path.abspath(file_path)
+        stat = os.stat(source)
+        entry = self.manifest['sources'].get(source)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['sha256']
+        sha256 = file_content_hash(source)
+        with self._lock:
+            self.manifest['sources'][source] = {'sha256': sha256, 'mtime_ns': stat.st_mtime_ns,
+                                                'size': stat.st_size}
+            self._write_manifest()
+        return sha256
+
+    def key(self, stage, input_key, params=None):
+        """Clé d'une étape : empreinte de son nom, de son entrée, de ses paramètres et du code"""
+        payload = json.dumps({'stage': stage, 'input': input_key, 'params': params or {},
+                              'code': code_version()}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def __contains__(self, key):
+        return key in self.manifest['entries'] and os.path.exists(self._entry_path(key))
+
+    def get(self, key):
+        """Sortie mémorisée sous key (None si absente ou illisible)"""
+        if key not in self:
+            self.misses += 1
+            return None
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.manifest['entries'][key]['last_access'] = time.time()
+            self._write_manifest()
+        return value
+
+    def put(self, key, value, stage=None):
+        """Mémorise value sous key puis évince les entrées les moins récemment utilisées"""
+        path = self._entry_path(key)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        now = time.time()
+        with self._lock:
+            self.manifest['entries'][key] = {'stage': stage, 'size': os.path.getsize(path),
+                                             'created': now, 'last_access': now}
+            self._evict(keep=key)
+            self._write_manifest()
+
+    def _evict(self, keep=None):
+        entries = self.manifest['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries.pop(key)['size']
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def get_or_compute(self, key, compute, stage=None):
+        """Sortie mémorisée sous key, sinon compute() mémorisé ; retourne (valeur, hit)"""
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(key, value, stage=stage)
+        return value, False
+
+    def info(self):
+        """Nombre d'entrées, taille totale et compteurs hits/misses"""
+        entries = self.manifest['entries']
+        return {'entries': len(entries), 'bytes': sum(entry['size'] for entry in entries.values()),
+                'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """Supprime toutes les entrées"""
+        with self._lock:
+            for key in list(self.manifest['entries']):
+                try:
+                    os.remove(self._entry_path(key))
+                except OSError:
+                    pass
+            self.manifest['entries'] = {}
+            self._write_manifest()
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+
+WEATHERS = ['Sunny', 'Cloudy', 'Rain', 'Fog', 'Windy']
+WEATHER_PROBABILITIES = [0.45, 0.25, 0.15, 0.08, 0.07]
+# Zone de Dakar couverte par les routes
+LATITUDE_RANGE = (14.60, 14.80)
+LONGITUDE_RANGE = (-17.55, -17.30)
+# Limite de lignes d'une feuille Excel
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def _route_geometry(n_routes, seed):
+    """Point de départ, point d'arrivée et facteur de charge de chaque route (fixes pour un seed)"""
+    rng = np.random.default_rng(seed)
+    start = np.column_stack([rng.uniform(*LATITUDE_RANGE, n_routes), rng.uniform(*LONGITUDE_RANGE, n_routes)])
+    end = np.column_stack([rng.uniform(*LATITUDE_RANGE, n_routes), rng.uniform(*LONGITUDE_RANGE, n_routes)])
+    load = rng.uniform(0.7, 1.3, n_routes)
+    return start, end, load
+
+
+def generate_mobility_data(n_rows, n_routes=30, start='2025-08-01', days=30, outlier_rate=0.01,
+                           missing_rate=0.02, seed=0, chunk_index=0):
+    """Génère n_rows lectures réalistes (mêmes colonnes que le fichier source Excel)
+
+    - routes R001.. avec un tracé fixe (points le long du segment + bruit GPS) ;
+    - densité de trafic à deux pics (8h et 18h), plus faible le week-end ;
+    - vitesse décroissante avec la densité, AQI croissant avec elle ;
+    - météo (Sunny, Cloudy, Rain, Fog, Windy) qui module vitesse, densité et AQI ;
+    - outliers injectés (outlier_rate) et valeurs manquantes (missing_rate par colonne).
+    chunk_index permet de produire des lots distincts d'un même jeu (iter_synthetic_chunks).
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    route_start, route_end, route_load = _route_geometry(n_routes, seed)
+
+    route = rng.integers(0, n_routes, n_rows)
+    position = rng.uniform(0, 1, n_rows)[:, None]
+    coords = route_start[route] + position * (route_end[route] - route_start[route])
+    coords += rng.normal(0, 0.0008, coords.shape)
+
+    seconds = rng.integers(0, days * 86400, n_rows)
+    timestamp = pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')
+    hour = (seconds % 86400) / 3600
+    weekday = timestamp.dayofweek.to_numpy()
+
+    weather_idx = rng.choice(len(WEATHERS), n_rows, p=WEATHER_PROBABILITIES)
+    rain = weather_idx == WEATHERS.index('Rain')
+    fog = weather_idx == WEATHERS.index('Fog')
+    windy = weather_idx == WEATHERS.index('Windy')
+
+    profile = 0.2 + 0.45 * np.exp(-(hour - 8) ** 2 / 3) + 0.5 * np.exp(-(hour - 18) ** 2 / 4)
+    profile *= np.where(weekday >= 5, 0.7, 1.0)
+    density = profile * route_load[route] + 0.1 * rain + rng.normal(0, 0.07, n_rows)
+    density = np.clip(density, 0, 1).round(2)
+
+    speed = 52 - 38 * density - 6 * rain - 4 * fog + rng.normal(0, 4, n_rows)
+    speed = np.clip(speed, 5, None).round(0)
+
+    aqi = 28 + 85 * density - 10 * (rain | windy) + 6 * fog + rng.normal(0, 8, n_rows)
+    aqi = np.clip(aqi, 5, None).round(0)
+
+    # Outliers : capteurs défaillants (vitesses aberrantes, pics de pollution)
+    n_outliers = int(n_rows * outlier_rate)
+    outlier_rows = rng.choice(n_rows, n_outliers, replace=False)
+    half = n_outliers // 2
+    speed[outlier_rows[:half]] = rng.uniform(120, 250, half).round(0)
+    aqi[outlier_rows[half:]] = rng.uniform(250, 500, n_outliers - half).round(0)
+
+    df = pd.DataFrame({
+        'route_id': np.char.add('R', np.char.zfill((route + 1).astype(str), 3)),
+        'timestamp': timestamp.floor('s'),
+        'latitude': coords[:, 0].round(5),
+        'longitude': coords[:, 1].round(5),
+        'speed_kmh': speed,
+        'traffic_density': density,
+        'air_quality_index': aqi,
+        'weather': np.asarray(WEATHERS, dtype=object)[weather_idx]
+    })
+
+    for col in ['speed_kmh', 'traffic_density', 'air_quality_index', 'weather']:
+        missing = rng.random(n_rows) < missing_rate
+        df.loc[missing, col] = np.nan
+    return df
+
+
+def iter_synthetic_chunks(n_rows, chunk_size=1_000_000, seed=0, **kwargs):
+    """Produit le jeu synthétique par lots (mémoire bornée, jusqu'à 1e8 lignes et plus)"""
+    for chunk_index, offset in enumerate(range(0, n_rows, chunk_size)):
+        yield generate_mobility_data(min(chunk_size, n_rows - offset), seed=seed,
+                                     chunk_index=chunk_index, **kwargs)
+
+
+def write_synthetic(path, n_rows, chunk_size=1_000_000, seed=0, **kwargs):
+    """Écrit le jeu synthétique dans path (.parquet, .csv ou .xlsx) lot par lot"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        if n_rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel limité à {EXCEL_MAX_ROWS} lignes : utiliser .parquet ou .csv")
+        generate_mobility_data(n_rows, seed=seed, **kwargs).to_excel(path, index=False)
+        return path
+
+    if os.path.exists(path):
+        os.remove(path)
+    writer = None
+    try:
+        for i, chunk in enumerate(iter_synthetic_chunks(n_rows, chunk_size, seed=seed, **kwargs)):
+            if ext == '.parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            elif ext == '.csv':
+                chunk.to_csv(path, mode='a', header=(i == 0), index=False)
+            else:
+                raise ValueError(f"Format non supporté : {ext}")
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
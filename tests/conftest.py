@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# Les modules du pipeline vivent dans src/ (imports entre modules frères)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from pipeline import clean_data, transform_data, create_features, validate_data_types  # noqa: E402
+from synthetic_data import generate_mobility_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def processed():
+    """Lectures synthétiques traitées comme par run_full_pipeline (types du schéma)"""
+    df = validate_data_types(generate_mobility_data(3_000, n_routes=8, seed=1), verbose=False)
+    return validate_data_types(create_features(transform_data(clean_data(df, verbose=False))),
+                               verbose=False)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from pipeline import run_full_pipeline, run_chunked_pipeline
+from columnar_export import read_results
+from synthetic_data import write_synthetic
+
+NUMERIC = ['speed_kmh', 'traffic_density', 'air_quality_index', 'speed_traffic_product']
+CATEGORIES = ['aqi_category', 'speed_category', 'traffic_category', 'time_of_day']
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    path = tmp_path_factory.mktemp('chunked') / 'readings.xlsx'
+    return str(write_synthetic(str(path), 3_000, seed=4, n_routes=6))
+
+
+def _sorted(df):
+    return df.sort_values(['route_id', 'timestamp']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('method', ['winsorize', 'cap', 'log'])
+def test_chunked_matches_memory(source, tmp_path, method):
+    full, _ = run_full_pipeline(source, outlier_method=method, use_cache=False, verbose=False,
+                                diagnostics='off')
+    output = str(tmp_path / 'out.csv')
+    run_chunked_pipeline(source, output, outlier_method=method, chunk_size=700, verbose=False)
+    chunked = read_results(output)
+
+    full, chunked = _sorted(full), _sorted(chunked)
+    assert len(full) == len(chunked)
+    # Mêmes valeurs à l'arrondi float32 près
+    np.testing.assert_allclose(chunked[NUMERIC].to_numpy('float64'),
+                               full[NUMERIC].to_numpy('float64'), rtol=1e-5, atol=1e-5)
+    for col in CATEGORIES + ['is_weekend', 'is_rush_hour', 'traffic_aqi_flag']:
+        assert (chunked[col].astype(str) == full[col].astype(str)).all(), col
+
@@ -0,0 +1,61 @@
+import gc
+import numpy as np
+import pandas as pd
+import pytest
+from column_stats import column_stats, invalidate_columns, clear_stats_cache, stats_cache_info
+
+COLUMNS = ['speed_kmh', 'traffic_density', 'air_quality_index']
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_stats_cache()
+    yield
+    clear_stats_cache()
+
+
+def test_stats_match_pandas(processed):
+    stats = column_stats(processed, COLUMNS)
+    for col in COLUMNS:
+        series = processed[col].astype('float64')
+        assert stats[col]['count'] == series.count()
+        assert stats[col]['mean'] == pytest.approx(series.mean())
+        assert stats[col]['std'] == pytest.approx(series.std())
+        assert stats[col]['skew'] == pytest.approx(series.skew())
+        assert stats[col]['kurtosis'] == pytest.approx(series.kurt())
+        for q, value in stats[col]['quantiles'].items():
+            assert value == pytest.approx(series.quantile(q))
+
+
+def test_unchanged_column_is_served_from_cache(processed):
+    column_stats(processed, COLUMNS)
+    column_stats(processed, COLUMNS)
+    assert stats_cache_info()['hits'] == len(COLUMNS)
+
+
+def test_in_place_edit_is_recomputed_after_invalidate():
+    df = pd.DataFrame({'x': np.arange(100, dtype='float64')})
+    assert column_stats(df, ['x'])['x']['quantiles'][0.99] == pytest.approx(98.01)
+
+    # Écriture en place qui préserve la somme : même buffer, même total
+    address = df['x'].to_numpy().__array_interface__['data'][0]
+    df.loc[[0, 99], 'x'] = [50.0, 49.0]
+    values = df['x'].to_numpy()
+    assert values.__array_interface__['data'][0] == address
+    invalidate_columns(df, ['x'])
+
+    assert column_stats(df, ['x'])['x']['quantiles'][0.99] == pytest.approx(np.quantile(values, 0.99))
+
+
+def test_reused_address_is_not_served_stale():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=1_000)
+    for _ in range(20):
+        # Même taille, même somme : seule l'identité du buffer les distingue
+        values = rng.permutation(base)
+        values[:10] = values[:10].mean()
+        df = pd.DataFrame({'x': values})
+        expected = np.quantile(values, 0.25)
+        assert column_stats(df, ['x'])['x']['quantiles'][0.25] == pytest.approx(expected)
+        del df, values
+        gc.collect()
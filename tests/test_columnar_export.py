@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from columnar_export import write_columnar, read_results
+
+pytest.importorskip('pyarrow')
+
+
+def _sorted(df):
+    return df.sort_values(['route_id', 'timestamp']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('format', ['parquet', 'feather'])
+@pytest.mark.parametrize('partition_by', [None, ['year_month', 'route_id']])
+def test_round_trip_keeps_columns_and_types(processed, tmp_path, format, partition_by):
+    path = str(tmp_path / ('out' if partition_by else f'out.{format}'))
+    report = write_columnar(processed, path, format=format, partition_by=partition_by)
+    assert report['rows'] == len(processed)
+
+    df = read_results(path, format=format)
+    assert list(df.columns) == list(processed.columns)
+    assert (df.dtypes.astype(str) == processed.dtypes.astype(str)).all()
+    pd.testing.assert_frame_equal(_sorted(df), _sorted(processed), check_categorical=False)
+
+
+def test_partition_filters_and_derived_key(processed, tmp_path):
+    path = str(tmp_path / 'out')
+    write_columnar(processed, path, partition_by=['year_month', 'route_id'])
+    start = processed['timestamp'].median()
+
+    df = read_results(path, filters=[('route_id', '=', 'R001'), ('timestamp', '>=', start)])
+    expected = processed[(processed['route_id'] == 'R001') & (processed['timestamp'] >= start)]
+    assert len(df) == len(expected) > 0
+
+    # La clé calculée n'est retournée que si elle est demandée
+    months = read_results(path, columns=['year_month', 'timestamp'])
+    assert list(months.columns) == ['year_month', 'timestamp']
+    assert (months['year_month'].astype(str) == months['timestamp'].dt.strftime('%Y-%m')).all()
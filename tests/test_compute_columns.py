@@ -0,0 +1,16 @@
+from pipeline import (clean_data, transform_data, create_features, validate_data_types,
+                      compute_columns)
+from synthetic_data import generate_mobility_data
+
+
+def test_compute_columns_matches_full_pipeline_dtypes():
+    df = validate_data_types(generate_mobility_data(2_000, seed=0), verbose=False)
+    full = validate_data_types(create_features(transform_data(clean_data(df, verbose=False))),
+                               verbose=False)
+
+    columns = ['weather_encoded', 'traffic_aqi_flag', 'speed_traffic_product', 'is_rush_hour',
+               'aqi_category', 'hour']
+    result = compute_columns(df, columns)
+
+    assert result.dtypes.to_dict() == full[columns].dtypes.to_dict()
+    assert result.reset_index(drop=True).equals(full[columns].reset_index(drop=True))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dashboard_cube import FilterCube, DAY_NAMES
+
+MEASURES = ['speed_kmh', 'traffic_density', 'air_quality_index']
+
+
+@pytest.fixture(scope='module')
+def frame(processed):
+    """Vue du dashboard : jours nommés, mesures en float64"""
+    df = processed[['hour', 'day_of_week', 'weather', 'route_id'] + MEASURES].copy()
+    df['day_of_week'] = df['day_of_week'].map(dict(enumerate(DAY_NAMES))).astype(object)
+    df['weather'] = df['weather'].astype(object)
+    df['route_id'] = df['route_id'].astype(object)
+    return df.astype({col: 'float64' for col in MEASURES})
+
+
+FILTERS = [None,
+           {'hour': (7, 9)},
+           {'day_of_week': ['Samedi', 'Dimanche'], 'weather': ['Rain', 'Fog']},
+           {'hour': (17, 19), 'route_id': ['R001', 'R003']}]
+
+
+def _select(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for dim, wanted in (filters or {}).items():
+        mask &= df[dim].between(*wanted) if isinstance(wanted, tuple) else df[dim].isin(wanted)
+    return df[mask]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_cube_matches_pandas(frame, filters):
+    cube = FilterCube.from_frame(frame)
+    selected = _select(frame, filters)
+    assert len(selected) > 0
+
+    summary = cube.summary(filters)
+    assert summary['count'] == len(selected)
+    for col in MEASURES:
+        assert summary['mean'][col] == pytest.approx(selected[col].mean(), rel=1e-9)
+    np.testing.assert_allclose(cube.corr(filters), selected[MEASURES].corr(), atol=1e-9)
+    for dim in ['hour', 'day_of_week']:
+        expected = selected.groupby(dim, sort=False)['traffic_density'].mean()
+        result = cube.group_mean(dim, 'traffic_density', filters)
+        pd.testing.assert_series_equal(result.sort_index(), expected.sort_index(),
+                                       check_names=False, check_index_type=False, rtol=1e-9)
+
+
+def test_days_keep_week_order(frame):
+    cube = FilterCube.from_frame(frame)
+    assert cube.labels['day_of_week'] == DAY_NAMES
+    assert list(cube.group_mean('day_of_week', 'speed_kmh').index) == DAY_NAMES
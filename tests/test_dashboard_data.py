@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from db_connector import save_to_existing_table
+from dashboard_cube import FilterCube
+from dashboard_data import (build_filter_query, query_filtered, query_cube, query_map_cells,
+                            clear_query_cache, CUBE_DIMENSIONS)
+from map_grid import precompute_cells
+
+
+@pytest.fixture
+def engine(processed, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mobility.db'}")
+    save_to_existing_table(processed, engine=engine, mode='upsert', verbose=False)
+    clear_query_cache()
+    yield engine
+    clear_query_cache()
+
+
+def test_build_filter_query_binds_filters():
+    query, params = build_filter_query({'weather': ['Rain', 'Fog'], 'hour': (7, 9), 'month': None},
+                                       columns=('hour', 'speed_kmh'), limit=10, sample=True)
+    sql = str(query)
+    assert sql.startswith("SELECT hour, speed_kmh FROM mobility_processed WHERE ")
+    assert "hour BETWEEN :hour_min AND :hour_max" in sql
+    assert "weather IN" in sql and "month" not in sql
+    assert sql.index("ORDER BY") < sql.index("LIMIT 10")
+    assert params == {'hour_min': 7, 'hour_max': 9, 'weather_values': ['Fog', 'Rain']}
+
+
+def test_query_filtered_pushes_filters(engine, processed):
+    filters = {'hour': (7, 9), 'day_of_week': ['Lundi', 'Samedi'], 'weather': ['Rain']}
+    df = query_filtered(filters, columns=('hour', 'day_of_week', 'weather'), engine=engine)
+    expected = processed[processed['hour'].between(7, 9) & processed['day_of_week'].isin([0, 5])
+                         & (processed['weather'] == 'Rain')]
+    assert len(df) == len(expected) > 0
+    assert set(df['day_of_week']) <= {'Lundi', 'Samedi'}
+
+
+def test_sample_is_stable_and_spread(engine, processed):
+    first = query_filtered(columns=('timestamp',), engine=engine, limit=200, sample=True)
+    clear_query_cache()
+    second = query_filtered(columns=('timestamp',), engine=engine, limit=200, sample=True)
+    assert first['timestamp'].tolist() == second['timestamp'].tolist()
+    # Pas les 200 premières lignes insérées
+    head = query_filtered(columns=('timestamp',), engine=engine, limit=200)
+    assert set(first['timestamp']) != set(head['timestamp'])
+
+
+def test_query_cube_matches_cube_on_rows(engine):
+    rows = query_filtered(columns=CUBE_DIMENSIONS + ('speed_kmh', 'traffic_density',
+                                                     'air_quality_index'), engine=engine)
+    expected = FilterCube.from_frame(rows)
+    cube = query_cube(engine=engine)
+
+    assert cube.labels == expected.labels
+    np.testing.assert_array_equal(cube.count, expected.count)
+    filters = {'hour': (7, 9), 'weather': ['Rain', 'Fog']}
+    np.testing.assert_allclose(cube.corr(filters), expected.corr(filters), atol=1e-9)
+    pd.testing.assert_series_equal(cube.group_mean('hour', 'speed_kmh', filters),
+                                   expected.group_mean('hour', 'speed_kmh', filters))
+
+
+def test_query_map_cells_matches_precompute_cells(engine):
+    rows = query_filtered(columns=('latitude', 'longitude', 'speed_kmh', 'traffic_density',
+                                   'air_quality_index', 'hour', 'day_of_week', 'weather'),
+                          engine=engine)
+    keys = ['lat_idx', 'lon_idx', 'hour', 'day_of_week', 'weather']
+    expected = precompute_cells(rows).sort_values(keys).reset_index(drop=True)
+    cells = query_map_cells(engine=engine).sort_values(keys).reset_index(drop=True)
+
+    assert cells[keys].astype(str).equals(expected[keys].astype(str))
+    for col in ['count', 'critical']:
+        np.testing.assert_array_equal(cells[col], expected[col])
+    for col in ['lat_sum', 'lon_sum', 'traffic_sum', 'aqi_sum']:
+        np.testing.assert_allclose(cells[col], expected[col], rtol=1e-9)
@@ -0,0 +1,87 @@
+import io
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from db_connector import COLUMN_MAPPING, prepare_rows, save_to_existing_table, _write_load_data_file
+from schema import enforce_schema
+
+
+def _processed_rows():
+    """Deux lectures traitées, aux types du schéma (booléens numpy, float32, catégories)"""
+    df = pd.DataFrame({
+        'route_id': ['R1', 'R2'],
+        'timestamp': pd.to_datetime(['2024-01-01 08:00', '2024-01-01 09:00']),
+        'latitude': [48.8566, 48.8606],
+        'longitude': [2.3522, 2.3376],
+        'speed_kmh': [33.24, np.nan],
+        'traffic_density': [0.7, 0.2],
+        'air_quality_index': [120.0, 45.0],
+        'weather': ['Pluie', 'Ensoleillé'],
+        'hour': [8, 9],
+        'day_of_week': [0, 0],
+        'month': [1, 1],
+        'is_weekend': [False, False],
+        'aqi_category': ['Mauvais', 'Bon'],
+        'speed_category': ['Normale', 'Lente'],
+        'traffic_category': ['Dense', 'Fluide'],
+        'weather_encoded': [2, 0],
+        'speed_traffic_product': [23.268, 0.0],
+        'traffic_aqi_flag': [True, False],
+        'is_rush_hour': [True, False],
+        'time_of_day': ['Matin', 'Matin']
+    })
+    enforce_schema(df)
+    return df
+
+
+def test_load_data_file_writes_booleans_as_integers():
+    df = _processed_rows()
+    assert df['is_rush_hour'].dtype == bool
+
+    f = io.StringIO()
+    _write_load_data_file(prepare_rows(df), f)
+    lines = [line.split('\t') for line in f.getvalue().splitlines()]
+
+    assert len(lines) == 2
+    assert 'True' not in f.getvalue() and 'False' not in f.getvalue()
+    columns = list(COLUMN_MAPPING.values())
+    first = dict(zip(columns, lines[0]))
+    second = dict(zip(columns, lines[1]))
+    assert (first['is_weekend'], first['traffic_aqi_flag'], first['is_rush_hour']) == ('0', '1', '1')
+    assert (second['is_weekend'], second['traffic_aqi_flag'], second['is_rush_hour']) == ('0', '0', '0')
+    # float32 arrondi à l'échelle SQL, NULL au format LOAD DATA
+    assert first['speed_kmh'] == '33.24' and second['speed_kmh'] == '\\N'
+    assert first['timestamp'] == '2024-01-01 08:00:00'
+
+
+def test_prepare_rows_keeps_missing_booleans_null():
+    df = _processed_rows()
+    df['is_rush_hour'] = pd.array([True, None], dtype='boolean')
+
+    f = io.StringIO()
+    _write_load_data_file(prepare_rows(df), f)
+    values = [dict(zip(COLUMN_MAPPING.values(), line.split('\t')))['is_rush_hour']
+              for line in f.getvalue().splitlines()]
+    assert values == ['1', '\\N']
+
+
+def test_load_data_file_escapes_separators():
+    df = _processed_rows()
+    df['route_id'] = df['route_id'].cat.rename_categories(['R\t1', 'R\\2'])
+
+    f = io.StringIO()
+    _write_load_data_file(prepare_rows(df), f)
+    assert [line.split('\t')[0] for line in f.getvalue().splitlines()] == ['R\\t1', 'R\\\\2']
+
+
+def test_upsert_save_can_be_rerun(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mobility.db'}")
+    df = _processed_rows()
+
+    # Comme main.py : relancer le chargement ne duplique ni ne rejette rien
+    first = save_to_existing_table(df, engine=engine, mode='upsert', verbose=False)
+    second = save_to_existing_table(df, engine=engine, mode='upsert', verbose=False)
+
+    assert (first['inserted'], second['inserted'], second['skipped']) == (2, 0, 2)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM mobility_processed").scalar() == 2
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+import db_schema
+from db_schema import apply_migrations, schema_version, ensure_month_partitions, MIGRATIONS
+
+
+def test_unique_key_migration_removes_existing_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mobility.db'}")
+    # Table créée avant la clé naturelle, avec des lectures en double
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE mobility_processed ("
+                                   "id INTEGER PRIMARY KEY AUTOINCREMENT, route_id VARCHAR(10), "
+                                   "timestamp DATETIME, speed_kmh DECIMAL(5,2))")
+        for route_id, speed in [('R1', 10), ('R1', 20), ('R1', 30), ('R2', 5), (None, 1), (None, 2)]:
+            connection.exec_driver_sql("INSERT INTO mobility_processed (route_id, timestamp, speed_kmh) "
+                                       "VALUES (?, '2024-01-01 08:00:00', ?)", (route_id, speed))
+
+    apply_migrations(engine)
+
+    assert schema_version(engine) == MIGRATIONS[-1][0]
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql("SELECT route_id, speed_kmh FROM mobility_processed "
+                                          "ORDER BY id").fetchall()
+    # Dernière insertion conservée ; les clés NULL ne sont pas des doublons
+    assert [tuple(row) for row in rows] == [('R1', 30), ('R2', 5), (None, 1), (None, 2)]
+
+
+class _MySQLStub:
+    """Moteur MySQL factice : enregistre le SQL exécuté"""
+
+    class dialect:
+        name = 'mysql'
+
+    def __init__(self, min_timestamp=None):
+        self.min_timestamp = min_timestamp
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def exec_driver_sql(self, sql, params=None):
+        self.statements.append(sql)
+        return SimpleNamespace(scalar=lambda: self.min_timestamp)
+
+
+@pytest.mark.parametrize('partitions, min_timestamp, expected', [
+    ({'p202401', 'p202402', 'pmax'}, None, ['p202403', 'p202404']),
+    ({'p202401', 'p202404', 'pmax'}, None, []),
+    ({'pmax'}, '2024-02-10 08:00:00', ['p202402', 'p202403', 'p202404']),
+    ({'pmax'}, None, ['p202404']),
+])
+def test_ensure_month_partitions(monkeypatch, partitions, min_timestamp, expected):
+    monkeypatch.setattr(db_schema, '_existing_partitions', lambda connection, table: partitions)
+    engine = _MySQLStub(min_timestamp)
+
+    assert ensure_month_partitions(engine, 'mobility_processed', '2024-04-15') == expected
+    reorganize = [sql for sql in engine.statements if 'REORGANIZE' in sql]
+    assert len(reorganize) == (1 if expected else 0)
+    if expected:
+        assert f"PARTITION {expected[-1]} VALUES LESS THAN ('2024-05-01')" in reorganize[0]
+        assert reorganize[0].endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE))")
@@ -0,0 +1,18 @@
+import pandas as pd
+from pipeline import export_results
+from columnar_export import read_results
+
+FLAGS = ['is_weekend', 'traffic_aqi_flag', 'is_rush_hour']
+
+
+def test_csv_export_writes_flags_as_integers(processed, tmp_path):
+    path = tmp_path / 'out.csv'
+    export_results(processed, str(path), verbose=False)
+
+    raw = pd.read_csv(path)
+    for col in FLAGS:
+        assert processed[col].dtype == bool
+        assert set(raw[col].unique()) <= {0, 1}
+        assert raw[col].tolist() == processed[col].astype(int).tolist()
+    # Relu avec les types du schéma
+    assert (read_results(str(path))[FLAGS].dtypes == bool).all()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from instrumentation import StageRecorder, current_rss_mb, max_rss_mb
+
+pytest.importorskip('resource')
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="/proc/self/statm indisponible")
+def test_stage_reports_its_own_rss_delta():
+    recorder = StageRecorder()
+    with recorder.stage('alloc'):
+        block = np.ones(64 * 2**20 // 8)  # 64 Mo, pages touchées
+    with recorder.stage('release'):
+        del block
+    with recorder.stage('idle'):
+        pass
+
+    alloc, release, idle = recorder.records
+    assert alloc['rss_delta_mb'] > 50
+    assert release['rss_delta_mb'] < -50
+    assert abs(idle['rss_delta_mb']) < 5
+    # Le pic du processus ne redescend pas : il n'est pas propre à l'étape
+    assert idle['process_peak_rss_mb'] >= alloc['process_peak_rss_mb'] - 1e-9
+    assert idle['process_peak_rss_mb'] == pytest.approx(max_rss_mb(), abs=1)
+
+    summary = recorder.summary()
+    assert summary.loc['alloc', 'rss_delta_mb'] == pytest.approx(alloc['rss_delta_mb'])
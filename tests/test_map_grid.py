@@ -0,0 +1,32 @@
+import numpy as np
+from map_grid import (STATUS_CRITICAL, flag_status, precompute_cells, filter_cells,
+                      aggregate_cells)
+
+
+def test_flag_status_on_pipeline_scale(processed):
+    status = flag_status(processed)
+    critical = (processed['traffic_density'] > 0.7) & (processed['speed_kmh'] < 20)
+    assert critical.any()
+    assert ((status == STATUS_CRITICAL) == critical).all()
+
+
+def test_cells_preserve_counts_and_sums(processed):
+    cells = precompute_cells(processed)
+    assert cells['count'].sum() == len(processed)
+    assert cells['critical'].sum() == (flag_status(processed) == STATUS_CRITICAL).sum()
+    np.testing.assert_allclose(cells['traffic_sum'].sum(),
+                               processed['traffic_density'].astype('float64').sum(), rtol=1e-6)
+
+    filters = {'hour': (7, 9), 'weather': ['Rain']}
+    selected = processed[processed['hour'].between(7, 9) & (processed['weather'] == 'Rain')]
+    points = aggregate_cells(filter_cells(cells, filters), zoom=13)
+    assert points['count'].sum() == len(selected)
+    np.testing.assert_allclose((points['traffic_density'] * points['count']).sum(),
+                               selected['traffic_density'].astype('float64').sum(), rtol=1e-6)
+
+
+def test_aggregate_cells_is_bounded(processed):
+    cells = precompute_cells(processed)
+    points = aggregate_cells(cells, zoom=18, max_cells=10)
+    assert len(points) <= 10
+    assert points['count'].sum() == len(processed)
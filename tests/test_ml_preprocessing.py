@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from ml_preprocessing import FittedPreprocessor, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+
+def _sklearn_transform(preprocessor, df):
+    frame = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES].astype(
+        {col: object for col in CATEGORICAL_FEATURES})
+    out = preprocessor.transformer.transform(frame)
+    return out.toarray() if sparse.issparse(out) else np.asarray(out)
+
+
+def _dense(out):
+    return out.toarray() if sparse.issparse(out) else out
+
+
+@pytest.fixture(scope='module')
+def batch(processed):
+    """Lot à scorer : valeurs manquantes et modalité inconnue de l'entraînement"""
+    df = processed.iloc[:500].copy()
+    df.loc[df.index[:5], 'speed_kmh'] = np.nan
+    df.loc[df.index[5:10], 'weather'] = np.nan
+    df['time_of_day'] = df['time_of_day'].cat.add_categories(['Inconnu'])
+    df.loc[df.index[10:15], 'time_of_day'] = 'Inconnu'
+    return df
+
+
+@pytest.mark.parametrize('encoding, sparse_output, outlier_robust', [
+    ('onehot', True, True), ('onehot', False, False), ('ordinal', False, True)])
+def test_transform_matches_sklearn(processed, batch, encoding, sparse_output, outlier_robust):
+    fitted = FittedPreprocessor.fit(processed, outlier_robust=outlier_robust, encoding=encoding,
+                                    sparse_output=sparse_output)
+    out = fitted.transform(batch)
+    assert sparse.issparse(out) == (encoding == 'onehot' and sparse_output)
+    assert out.shape[1] == len(fitted.feature_names)
+    np.testing.assert_allclose(_dense(out), _sklearn_transform(fitted, batch), rtol=1e-5, atol=1e-5)
+
+    # Mêmes résultats depuis des colonnes objet (hors schéma) et ligne par ligne
+    objects = batch.astype({col: object for col in CATEGORICAL_FEATURES})
+    np.testing.assert_array_equal(_dense(fitted.transform(objects)), _dense(out))
+    np.testing.assert_array_equal(_dense(fitted.transform(batch.iloc[[7]])), _dense(out)[[7]])
+
+
+def test_saved_preprocessor_reloads_without_sklearn_state(processed, batch, tmp_path):
+    fitted = FittedPreprocessor.fit(processed).save(tmp_path / 'preprocessor.json')
+    restored = FittedPreprocessor.load(tmp_path / 'preprocessor.json')
+    assert restored.transformer is None
+    assert restored.feature_names == fitted.feature_names
+    np.testing.assert_array_equal(restored.transform(batch).toarray(),
+                                  fitted.transform(batch).toarray())
+
+
+def test_load_rejects_unknown_version(processed, tmp_path):
+    path = tmp_path / 'preprocessor.json'
+    FittedPreprocessor.fit(processed).save(path)
+    path.write_text(path.read_text().replace('"version": 1', '"version": 99'))
+    with pytest.raises(ValueError):
+        FittedPreprocessor.load(path)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pipeline import (run_parallel_stages, partition_rows, validate_data_types, clean_data,
+                      transform_data, create_features)
+from synthetic_data import generate_mobility_data
+
+
+@pytest.fixture(scope='module')
+def raw():
+    df = generate_mobility_data(3_000, n_routes=8, seed=1)
+    # Doublons exacts : leur suppression doit rester exacte partition par partition
+    return validate_data_types(pd.concat([df, df.iloc[:50]], ignore_index=True), verbose=False)
+
+
+@pytest.mark.parametrize('partition_by', ['route_id', 'time'])
+def test_parallel_matches_sequential(raw, partition_by):
+    sequential = create_features(transform_data(clean_data(raw, verbose=False)))
+    parallel = run_parallel_stages(raw, n_workers=2, partition_by=partition_by, verbose=False)
+
+    assert list(parallel.index) == list(sequential.index)
+    assert list(parallel.columns) == list(sequential.columns)
+    for col in sequential.columns:
+        if pd.api.types.is_float_dtype(sequential[col]):
+            np.testing.assert_allclose(parallel[col].to_numpy('float64'),
+                                       sequential[col].to_numpy('float64'), rtol=1e-6, err_msg=col)
+        else:
+            assert (parallel[col].astype(str) == sequential[col].astype(str)).all(), col
+
+
+@pytest.mark.parametrize('partition_by', ['route_id', 'time'])
+def test_partitions_cover_rows_once(raw, partition_by):
+    partitions = partition_rows(raw, 5, partition_by=partition_by)
+    positions = np.concatenate(partitions)
+    assert np.array_equal(np.sort(positions), np.arange(len(raw)))
+
+    # Deux lignes identiques tombent dans la même partition
+    partition_of_row = np.empty(len(raw), dtype='int64')
+    for i, part in enumerate(partitions):
+        partition_of_row[part] = i
+    duplicated = raw.duplicated(keep=False).to_numpy()
+    groups = raw[duplicated].groupby(list(raw.columns), observed=True).indices
+    for rows in groups.values():
+        assert len(set(partition_of_row[np.flatnonzero(duplicated)[rows]])) == 1
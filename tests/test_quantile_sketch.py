@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from quantile_sketch import KLLSketch, merge_sketches, sketch_columns
+from pipeline import compute_global_stats
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def _rank_errors(sketch, values):
+    """Écart entre le rang normalisé du quantile approché et le rang visé"""
+    values = np.sort(values)
+    estimates = sketch.quantiles(QS)
+    low = np.searchsorted(values, estimates, side='left') / len(values)
+    high = np.searchsorted(values, estimates, side='right') / len(values)
+    # Rang atteint le plus proche de q parmi les valeurs égales à l'estimation
+    return np.maximum(0, np.maximum(low - QS, np.array(QS) - high))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rank_error_within_bound(seed):
+    rng = np.random.default_rng(seed)
+    values = np.concatenate([rng.lognormal(3, 1, 150_000), rng.normal(0, 1, 50_000)])
+    sketch = KLLSketch(k=200, seed=seed)
+    for chunk in np.array_split(rng.permutation(values), 40):
+        sketch.update(chunk)
+
+    assert not sketch.is_exact()
+    assert sketch.n == len(values)
+    assert _rank_errors(sketch, values).max() <= sketch.normalized_rank_error()
+    # Mémoire bornée : O(k) valeurs conservées
+    assert sum(len(buf) for buf in sketch.levels) < 4 * sketch.k
+
+
+def test_merged_sketches_keep_the_bound():
+    rng = np.random.default_rng(7)
+    parts = [rng.gamma(2.0, 10.0, 40_000) for _ in range(6)]
+    # Un sketch par lot (fichier ou worker), fusionnés
+    merged = merge_sketches([sketch_columns(pd.DataFrame({'x': part}), ['x']) for part in parts])
+    sketch = merged['x']
+    values = np.concatenate(parts)
+    assert sketch.n == len(values)
+    assert _rank_errors(sketch, values).max() <= sketch.normalized_rank_error()
+
+
+def test_small_streams_are_exact():
+    values = np.random.default_rng(0).normal(size=150)
+    sketch = KLLSketch(k=200).update(values)
+    assert sketch.is_exact() and sketch.normalized_rank_error() == 0
+    np.testing.assert_allclose(sketch.quantiles(QS), np.quantile(values, QS))
+
+
+def test_round_trip_through_dict():
+    sketch = KLLSketch(k=50, seed=1).update(np.arange(10_000, dtype='float64'))
+    restored = KLLSketch.from_dict(sketch.to_dict())
+    np.testing.assert_array_equal(restored.quantiles(QS), sketch.quantiles(QS))
+
+
+def test_sketch_backend_bounds_within_rank_error(processed):
+    exact = compute_global_stats(processed, chunk_size=500)
+    sketch = compute_global_stats(processed, chunk_size=500, quantile_backend='sketch', sketch_k=50)
+    error = 2.296 / 50 ** 0.9723
+    for col, (low, high) in sketch['outlier_bounds'].items():
+        values = processed[col].dropna().to_numpy('float64')
+        exact_low, exact_high = exact['outlier_bounds'][col]
+        assert abs((values < low).mean() - (values < exact_low).mean()) <= error
+        assert abs((values <= high).mean() - (values <= exact_high).mean()) <= error
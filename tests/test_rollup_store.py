@@ -0,0 +1,42 @@
+import pandas as pd
+from rollup_store import RollupStore
+
+
+def _readings(route_ids, timestamps, speeds):
+    return pd.DataFrame({'route_id': route_ids, 'timestamp': pd.to_datetime(timestamps),
+                         'speed_kmh': speeds, 'traffic_density': 0.5, 'air_quality_index': 50.0})
+
+
+def _hourly_sums(df):
+    return df.groupby(['route_id', df['timestamp'].dt.floor('h')])['speed_kmh'].agg(['count', 'sum'])
+
+
+def test_late_readings_are_counted_when_skipped(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups'))
+    first = _readings(['R1', 'R1'], ['2024-01-01 08:00', '2024-01-01 10:00'], [10.0, 20.0])
+    assert store.update(first) == 2
+
+    # Relecture du même lot plus une lecture en retard : rien n'est ajouté, tout est compté
+    late = _readings(['R1'], ['2024-01-01 09:00'], [30.0])
+    assert store.update(pd.concat([first, late])) == 0
+    assert store.skipped == 3
+    assert RollupStore(str(tmp_path / 'rollups')).manifest['skipped'] == 3
+
+
+def test_merged_late_readings_match_groupby(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups'))
+    first = _readings(['R1', 'R2'], ['2024-01-01 10:00', '2024-01-01 10:00'], [10.0, 20.0])
+    # En retard (heure nouvelle et heure déjà agrégée), et autre route au même instant
+    late = _readings(['R1', 'R1', 'R3'], ['2024-01-01 09:00', '2024-01-01 10:30', '2024-01-01 10:00'],
+                     [30.0, 40.0, 50.0])
+    store.update(first)
+    assert store.update(late, late='merge') == 3
+    assert store.skipped == 0
+
+    means = store.means('hour').set_index(['route_id', 'bucket'])
+    expected = _hourly_sums(pd.concat([first, late]))
+    assert means['speed_kmh_count'].sort_index().tolist() == expected['count'].tolist()
+    assert (means['speed_kmh_mean'] * means['speed_kmh_count']).sort_index().tolist() \
+        == expected['sum'].tolist()
+    # Le watermark ne recule pas
+    assert store.manifest['watermarks']['R1'] == '2024-01-01T10:30:00'
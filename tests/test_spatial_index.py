@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from spatial_index import SpatialIndex, EARTH_RADIUS_M
+
+
+def _haversine_m(df, latitude, longitude):
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.radians(df['latitude'].to_numpy('float64'))
+    lon2 = np.radians(df['longitude'].to_numpy('float64'))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture(scope='module')
+def index(processed):
+    # Lots de tailles variées : plusieurs fusions de segments
+    idx = SpatialIndex()
+    for part in np.array_split(np.arange(len(processed)), [100, 150, 900, 1000, 2500]):
+        idx.add(processed.iloc[part])
+    return idx
+
+
+def test_segments_stay_logarithmic(index, processed):
+    assert len(index) == len(processed)
+    sizes = [len(segment['rows']) for segment in index.segments]
+    assert len(sizes) <= np.log2(len(processed)) + 1
+    assert all(a > 2 * b for a, b in zip(sizes, sizes[1:]))
+
+
+@pytest.mark.parametrize('radius_m', [200, 1_000, 3_000])
+def test_query_radius_matches_brute_force(index, processed, radius_m):
+    center = processed.iloc[42]
+    latitude, longitude = float(center['latitude']), float(center['longitude'])
+    start, end = processed['timestamp'].quantile([0.2, 0.8])
+
+    distances = _haversine_m(processed, latitude, longitude)
+    in_window = processed['timestamp'].between(start, end).to_numpy()
+    expected = np.sort(distances[(distances <= radius_m) & in_window])
+
+    result = index.query_radius(latitude, longitude, radius_m, start=start, end=end)
+    assert len(result) == len(expected) > 0
+    np.testing.assert_allclose(result['distance_m'], expected, atol=1e-3)
+    assert result['timestamp'].between(start, end).all()
+
+
+def test_top_cells_match_groupby(index, processed):
+    start, end = processed['timestamp'].quantile([0.1, 0.6]).dt.floor('h')
+    top = index.top_cells('air_quality_index', n=5, start=start, end=end)
+
+    window = processed[processed['timestamp'].between(start, end + pd.Timedelta('59min59s'))]
+    cells = pd.DataFrame({'cell_lat': np.floor(window['latitude'] / index.cell_deg).astype('int64'),
+                          'cell_lon': np.floor(window['longitude'] / index.cell_deg).astype('int64'),
+                          'aqi': window['air_quality_index'].astype('float64')})
+    expected = cells.groupby(['cell_lat', 'cell_lon'])['aqi'].mean().nlargest(5)
+    np.testing.assert_allclose(top['mean_air_quality_index'], expected.to_numpy(), rtol=1e-9)
+    assert list(zip(top['cell_lat'], top['cell_lon'])) == list(expected.index)
+
+
+def test_save_and_load(index, tmp_path, processed):
+    path = tmp_path / 'index.pkl'
+    index.save(path)
+    restored = SpatialIndex.load(path)
+    center = processed.iloc[0]
+    pd.testing.assert_frame_equal(restored.query_radius(center['latitude'], center['longitude'], 500),
+                                  index.query_radius(center['latitude'], center['longitude'], 500))
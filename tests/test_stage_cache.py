@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from instrumentation import StageRecorder
+from pipeline import run_full_pipeline
+from stage_cache import StageCache
+from synthetic_data import write_synthetic
+
+
+@pytest.fixture
+def source(tmp_path):
+    return str(write_synthetic(str(tmp_path / 'readings.xlsx'), 800, seed=5, n_routes=4))
+
+
+def _run(source, cache, outlier_method='winsorize'):
+    recorder = StageRecorder()
+    df, _ = run_full_pipeline(source, outlier_method=outlier_method, use_cache=False,
+                              verbose=False, diagnostics='off', stage_cache=cache,
+                              instrumentation=recorder)
+    return df, {record['stage']: record.get('cache') for record in recorder.records}
+
+
+def test_rerun_is_served_from_cache(source, tmp_path):
+    cache = StageCache(str(tmp_path / 'stages'))
+    first, stages = _run(source, cache)
+    assert set(stages.values()) == {'miss'}
+
+    # Nouveau processus (manifeste relu) : reprise à la dernière étape, sans rien recalculer
+    second, stages = _run(source, StageCache(str(tmp_path / 'stages')))
+    assert stages == {'validate': 'hit'}
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_changed_params_or_source_invalidate(source, tmp_path):
+    cache = StageCache(str(tmp_path / 'stages'))
+    _run(source, cache)
+
+    # Autre méthode : le chargement est réutilisé, le nettoyage recalculé
+    capped, stages = _run(source, cache, outlier_method='cap')
+    assert (stages['load'], stages['clean']) == ('hit', 'miss')
+    expected, _ = _run(source, None, outlier_method='cap')
+    pd.testing.assert_frame_equal(capped, expected)
+
+    # Source modifiée : tout est recalculé
+    write_synthetic(source, 800, seed=6, n_routes=4)
+    _, stages = _run(source, cache)
+    assert set(stages.values()) == {'miss'}
+
+
+def test_lru_eviction_keeps_size_bounded(tmp_path):
+    cache = StageCache(str(tmp_path / 'stages'), max_bytes=3_000)
+    frames = {cache.key('s', str(i)): pd.DataFrame({'x': range(100 * (i + 1))}) for i in range(4)}
+    for key, frame in frames.items():
+        cache.put(key, frame, stage='s')
+    assert cache.info()['bytes'] <= 3_000 or cache.info()['entries'] == 1
+    # La dernière entrée est toujours gardée ; la plus ancienne est évincée
+    last, first = list(frames)[-1], list(frames)[0]
+    assert last in cache and first not in cache
+    pd.testing.assert_frame_equal(cache.get(last), frames[last])